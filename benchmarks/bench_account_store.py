@@ -0,0 +1,59 @@
+"""
+Benchmarks the account feature store at PaySim scale.
+
+Usage:
+    python -m benchmarks.bench_account_store --rows 6362620 --history 8
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import bench_path
+from benchmarks.synthetic import PAYSIM_ROWS, generate_paysim
+
+PAYSIM_ACCOUNTS = 9_000_000
+
+def main():
+    """Builds the store in batch, then times incremental updates and snapshots."""
+    # pylint: disable=import-outside-toplevel
+    from src.account_store import AccountFeatureStore
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=PAYSIM_ROWS)
+    parser.add_argument('--history', type=int, default=8)
+    parser.add_argument('--updates', type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = generate_paysim(args.rows)
+    store = AccountFeatureStore(history=args.history)
+
+    start = time.perf_counter()
+    store.fit_transform(data)
+    batch = time.perf_counter() - start
+
+    per_account = store.nbytes / store.num_accounts
+    print(f"batch: {args.rows} rows in {batch:.1f}s, {store.num_accounts} accounts, "
+          f"{store.nbytes / 2**20:.0f} MB, {per_account:.0f} B/account, "
+          f"~{per_account * PAYSIM_ACCOUNTS / 2**20:.0f} MB at {PAYSIM_ACCOUNTS} accounts")
+
+    replay = generate_paysim(args.updates, seed=1)
+    rows = list(zip(replay['nameOrig'], replay['nameDest'], replay['step'] + 743,
+                    replay['amount']))
+    start = time.perf_counter()
+    for name_orig, name_dest, step, amount in rows:
+        store.update(name_orig, name_dest, step, amount)
+    incremental = time.perf_counter() - start
+    print(f"incremental: {incremental / len(rows) * 1e6:.1f} us/event")
+
+    path = bench_path('accounts.npz')
+    start = time.perf_counter()
+    store.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    AccountFeatureStore.load(path)
+    loaded = time.perf_counter() - start
+    print(f"snapshot: {os.path.getsize(path) / 2**20:.0f} MB, save {saved:.1f}s, "
+          f"load {loaded:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Cold-start time and memory of pickle vs directory (memory-mapped) model artifacts.
+
+For each format, ``--workers`` processes load the model concurrently and
+score one transaction. Each reports its load time, resident set (RSS) and
+proportional set (PSS, which splits shared pages between the processes that
+map them).
+
+Usage:
+    python -m benchmarks.bench_artifact --model_type rf --rows 1000000 --label_noise 0.01
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import bench_model
+
+def _memory_mb():
+    """Returns (RSS, PSS) of this process in MB."""
+    rss = pss = 0.0
+    with open('/proc/self/status', encoding='utf-8') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1]) / 1024
+    if os.path.exists('/proc/self/smaps_rollup'):
+        with open('/proc/self/smaps_rollup', encoding='utf-8') as rollup:
+            for line in rollup:
+                if line.startswith('Pss:'):
+                    pss = int(line.split()[1]) / 1024
+    return round(rss, 1), round(pss, 1)
+
+def child(model_path, hold):
+    """Loads ``model_path``, scores one record and prints timings and memory as JSON."""
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.synthetic import generate_paysim
+    from src.model import FraudDetector
+    record = generate_paysim(1, seed=1).to_dict('records')[0]
+    baseline_rss, _ = _memory_mb()
+
+    start = time.perf_counter()
+    detector = FraudDetector()
+    detector.load_model(model_path)
+    loaded = time.perf_counter()
+    detector.score_one(record)
+    scored = time.perf_counter()
+
+    # Stay alive so concurrent workers overlap when PSS is sampled
+    time.sleep(hold)
+    rss, pss = _memory_mb()
+    print(json.dumps({
+        'load_ms': round((loaded - start) * 1000, 1),
+        'first_score_ms': round((scored - loaded) * 1000, 1),
+        'model_rss_mb': round(rss - baseline_rss, 1), 'rss_mb': rss, 'pss_mb': pss
+    }))
+
+def run_workers(model_path, workers, hold):
+    """Starts ``workers`` concurrent children and returns their reports."""
+    procs = [
+        subprocess.Popen( # pylint: disable=consider-using-with
+            [sys.executable, '-m', 'benchmarks.bench_artifact', '--child', model_path,
+             '--hold', str(hold)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ) for _ in range(workers)
+    ]
+    return [json.loads(proc.communicate()[0].strip().splitlines()[-1]) for proc in procs]
+
+def main():
+    """Builds both artifact formats for one model and compares their cold starts."""
+    # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='rf')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--label_noise', type=float, default=0.0,
+                        help='Flip this fraction of training labels to grow larger trees')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--hold', type=float, default=2.0)
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.hold)
+        return
+
+    from src.model import FraudDetector
+    pickle_path = bench_model(args.model_type, rows=args.rows, label_noise=args.label_noise)
+    artifact_path = pickle_path[:-len('.pkl')]
+    if not os.path.exists(artifact_path):
+        detector = FraudDetector()
+        detector.load_model(pickle_path)
+        detector.save_model(artifact_path)
+
+    for name, path in (('pickle', pickle_path), ('artifact', artifact_path)):
+        # One warm-up load so both formats are read from the page cache
+        run_workers(path, 1, 0)
+        reports = run_workers(path, args.workers, args.hold)
+        mean = lambda key, reps=reports: round(sum(r[key] for r in reps) / len(reps), 1)
+        print(f"{name:8s} load={mean('load_ms')}ms first_score={mean('first_score_ms')}ms "
+              f"model_rss={mean('model_rss_mb')}MB/process "
+              f"pss_total={round(sum(r['pss_mb'] for r in reports), 1)}MB "
+              f"({args.workers} workers)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Scoring throughput with per-decision auditing off, through the asynchronous
+audit writer, and through a synchronous JSON FileHandler (one log call and
+write per decision in the scoring thread, as the audit log used to work).
+
+Usage:
+    python -m benchmarks.bench_audit --rows 1000000 --calls 20000
+
+Two paths are measured: score_file over a synthetic CSV of ``rows`` rows,
+and ``calls`` single-transaction score_one calls each audited on its own,
+as a server answering one request at a time would. Each mode runs in a
+fresh interpreter.
+"""
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import time
+
+from benchmarks.common import bench_csv, bench_model, bench_path
+
+MODES = ['off', 'async', 'sync']
+
+def run_mode(mode, path, model_path, calls):
+    """Scores ``path`` and ``calls`` single records with auditing in ``mode``."""
+    # pylint: disable=import-outside-toplevel
+    import tempfile
+    from benchmarks.synthetic import generate_paysim
+    from src.audit import audit_decisions, JsonFormatter
+    from src import scoring
+    from src.model import FraudDetector
+    from src.utils import setup_logging
+
+    log_dir = tempfile.mkdtemp(prefix='cfd_audit_', dir=bench_path(''))
+    audit = mode != 'off'
+    if mode == 'sync':
+        decision_log = logging.getLogger('bench_audit_sync')
+        decision_log.setLevel(logging.INFO)
+        decision_log.propagate = False
+        handler = logging.FileHandler(f"{log_dir}/sync.json")
+        handler.setFormatter(JsonFormatter())
+        decision_log.addHandler(handler)
+
+        def record_decisions(source, ids, probs, labels):
+            for i, p, label in zip(ids, probs, labels):
+                decision_log.info("decision", extra={'span': {
+                    'source': source, 'id': int(i), 'p': float(p), 'label': int(label)
+                }})
+        # score_file audits through src.audit; route it to the synchronous handler
+        scoring.audit_decisions = record_decisions
+    else:
+        setup_logging(log_dir)
+        record_decisions = audit_decisions
+    logging.getLogger('CreditCardFraud').setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    rows = scoring.score_file(model_path, path, f"{log_dir}/scores.csv", audit=audit)
+    file_seconds = time.perf_counter() - start
+
+    detector = FraudDetector()
+    detector.load_model(model_path)
+    records = generate_paysim(calls, seed=9).to_dict('records')
+    for record in records[:50]:
+        detector.score_one(record)
+    start = time.perf_counter()
+    for i, record in enumerate(records):
+        p = detector.score_one(record)
+        if audit:
+            record_decisions('serve', [i], [p], [int(p >= 0.5)])
+    single_seconds = time.perf_counter() - start
+
+    # Time until the audit trail is complete on disk
+    start = time.perf_counter()
+    dropped = 0
+    if mode == 'async':
+        writer = logging.getLogger('CreditCardFraud').handlers[0].writer
+        writer.close()
+        dropped = writer.stats['dropped']
+    drain_seconds = time.perf_counter() - start
+    return {
+        'mode': mode,
+        'dropped': dropped,
+        'score_file_rows_per_s': round(rows / file_seconds),
+        'score_one_calls_per_s': round(calls / single_seconds),
+        'drain_seconds': round(drain_seconds, 3)
+    }
+
+def main():
+    """Runs every mode in a fresh interpreter and prints the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--calls', type=int, default=20_000)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='xgb')
+    parser.add_argument('--mode', choices=MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--path', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--model_path', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.path, args.model_path, args.calls)))
+        return
+
+    path = bench_csv(args.rows)
+    model_path = bench_model(args.model_type)
+    print(f"model={args.model_type} rows={args.rows} calls={args.calls}")
+    for mode in MODES:
+        command = [sys.executable, '-m', 'benchmarks.bench_audit', '--mode', mode,
+                   '--path', path, '--model_path', model_path, '--calls', str(args.calls)]
+        out = subprocess.run(command, check=True, capture_output=True, text=True)
+        print(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmarks a cold load (parse, clean, featurize, store) against a cache hit.
+
+Usage:
+    python -m benchmarks.bench_cache --rows 6362620
+"""
+import argparse
+import os
+import shutil
+import time
+
+from benchmarks.common import bench_path
+from benchmarks.synthetic import PAYSIM_ROWS, write_paysim_csv
+
+def main():
+    """Times a cache miss followed by a cache hit."""
+    # pylint: disable=import-outside-toplevel
+    from src.cache import DatasetCache
+    from src.data_loader import load_data, clean_data
+    from src.features import feature_engineering
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=PAYSIM_ROWS)
+    args = parser.parse_args()
+
+    path = bench_path(f'synthetic_{args.rows}.csv')
+    if not os.path.exists(path):
+        write_paysim_csv(path, args.rows)
+    cache_dir = bench_path('dataset_cache')
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    cache = DatasetCache(cache_dir)
+
+    start = time.perf_counter()
+    data = feature_engineering(clean_data(load_data(path, chunksize=500_000, skip_names=True)))
+    build = time.perf_counter() - start
+    cache.store(path, data)
+    store = time.perf_counter() - start - build
+    del data
+
+    start = time.perf_counter()
+    cached = cache.load(path)
+    hit = time.perf_counter() - start
+    fingerprint = time.perf_counter()
+    cache.fingerprint(path, verify=True)
+    rehash = time.perf_counter() - fingerprint
+
+    print(f"rows={len(cached)} build={build:.2f}s store={store:.2f}s "
+          f"hit={hit * 1000:.1f}ms full_rehash={rehash:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Scoring throughput with and without the pre-filter cascade.
+
+The detector is trained on a synthetic sample, the cascade is learned from
+its training split, and a fresh synthetic sample is scored through
+predict_proba (plain and compiled) and score_many.
+
+Usage:
+    python -m benchmarks.bench_cascade --model_type rf --train_rows 200000 --rows 1000000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import generate_paysim
+
+def _rows_per_second(score, rows):
+    start = time.perf_counter()
+    score()
+    return rows / (time.perf_counter() - start)
+
+def main():
+    """Prints pass-through, fraud passed and throughput of every scoring path."""
+    # pylint: disable=import-outside-toplevel
+    from src.cascade import Cascade
+    from src.data_loader import clean_data
+    from src.features import feature_frame
+    from src.model import FraudDetector
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='rf')
+    parser.add_argument('--train_rows', type=int, default=200_000)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--records', type=int, default=20_000)
+    args = parser.parse_args()
+
+    detector = FraudDetector(model_type=args.model_type)
+    data = feature_frame(clean_data(generate_paysim(args.train_rows, seed=42, fraud_rate=0.01)))
+    # pylint: disable=unbalanced-tuple-unpacking
+    train_features, _, train_labels, _ = detector.prepare_data(data)
+    detector.train(train_features, train_labels)
+    cascade = detector.fit_cascade(train_features, train_labels)
+
+    sample = generate_paysim(args.rows, seed=5)
+    features = feature_frame(clean_data(sample))
+    labels = features.pop('isFraud').to_numpy()
+    records = sample.iloc[:args.records].to_dict('records')
+    passing = cascade.passes(features.to_numpy())
+    rule_only = Cascade(cascade.feature_names, cascade.blocked_types).passes(features.to_numpy())
+    print(f"model={args.model_type} blocked={cascade.blocked_types} "
+          f"pass_through={passing.mean():.2%} (type rule alone {rule_only.mean():.2%}) "
+          f"fraud_passed={passing[labels == 1].mean():.2%}")
+
+    for compiled in (False, True):
+        detector.compiled = detector.compile() if compiled else None
+        results = {}
+        for name, stage in (('without', None), ('with', cascade)):
+            detector.cascade = stage
+            results[name] = (
+                _rows_per_second(lambda: detector.predict_proba(features), args.rows),
+                _rows_per_second(lambda: detector.score_many(records), args.records)
+            )
+        label = 'compiled' if compiled else 'estimator'
+        for index, path in enumerate(('predict_proba', 'score_many')):
+            without, with_cascade = results['without'][index], results['with'][index]
+            print(f"{label:9s} {path:13s} {without:12,.0f} -> {with_cascade:12,.0f} rows/s "
+                  f"(x{with_cascade / without:.2f})")
+
+if __name__ == "__main__":
+    main()
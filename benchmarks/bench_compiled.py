@@ -0,0 +1,61 @@
+"""
+Compiled tree evaluator against the sklearn/XGBoost predict_proba path.
+
+Batch throughput is measured on a featurized synthetic sample, single-row
+latency on score_one with and without the compiled evaluator.
+
+Usage:
+    python -m benchmarks.bench_compiled --model_type rf --rows 1000000 --calls 2000
+"""
+import argparse
+import time
+import numpy as np
+
+from benchmarks.bench_latency import measure, percentiles
+from benchmarks.common import bench_model
+from benchmarks.synthetic import generate_paysim
+
+def main():
+    """Prints batch throughput, agreement and single-row latency of both paths."""
+    # pylint: disable=import-outside-toplevel
+    from src.data_loader import clean_data
+    from src.features import feature_frame
+    from src.model import FraudDetector
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='rf')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    detector = FraudDetector()
+    detector.load_model(bench_model(args.model_type))
+    features = feature_frame(clean_data(generate_paysim(args.rows, seed=5)))
+    features = features.drop(columns=['isFraud'])
+    records = generate_paysim(args.calls, seed=6).to_dict('records')
+
+    start = time.perf_counter()
+    reference = detector.predict_proba(features)[:, 1]
+    original = time.perf_counter() - start
+    reference_latency = measure(detector.score_one, records)
+
+    start = time.perf_counter()
+    compiled = detector.compile()
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probs = detector.predict_proba(features)[:, 1]
+    folded = time.perf_counter() - start
+    measure(detector.score_one, records[:20])
+    compiled_latency = measure(detector.score_one, records)
+
+    print(f"model={args.model_type} trees={compiled.n_trees} nodes={compiled.n_nodes} "
+          f"compile={compile_time:.2f}s")
+    print(f"batch predict_proba: {args.rows / original:,.0f} rows/s")
+    print(f"batch compiled:      {args.rows / folded:,.0f} rows/s "
+          f"(max abs diff {np.abs(probs - reference).max():.2e})")
+    print(f"score_one:           {percentiles(reference_latency)}")
+    print(f"score_one compiled:  {percentiles(compiled_latency)}")
+
+if __name__ == "__main__":
+    main()
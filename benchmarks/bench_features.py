@@ -0,0 +1,71 @@
+"""
+Benchmarks feature_matrix against feature_engineering.
+
+Usage:
+    python -m benchmarks.bench_features --rows 6362620
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+
+from benchmarks.synthetic import PAYSIM_ROWS, generate_paysim
+
+def best_of(func, repeat):
+    """Returns the fastest of ``repeat`` timed calls in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def traced_peak_mb(func, data):
+    """Returns the peak memory allocated while ``func(data)`` runs, in MB."""
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (peak - base) / 2**20
+
+def main():
+    """Times both implementations on a single row and on a full batch."""
+    # pylint: disable=import-outside-toplevel
+    from src.data_loader import RAW_DTYPES, clean_data
+    from src.features import feature_engineering, feature_matrix, FEATURE_COLUMNS
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=PAYSIM_ROWS)
+    args = parser.parse_args()
+
+    raw = generate_paysim(args.rows).astype({
+        col: dtype for col, dtype in RAW_DTYPES.items() if col not in ('nameOrig', 'nameDest')
+    })
+    data = clean_data(raw)
+    del raw
+    row = data.iloc[[0]]
+    out = np.empty((1, 13), dtype=np.float32)
+
+    single_old = best_of(lambda: feature_engineering(row.copy()), 200)
+    single_new = best_of(lambda: feature_matrix(row, out=out), 200)
+    print(f"1 row: feature_engineering={single_old * 1e6:.0f}us "
+          f"feature_matrix={single_new * 1e6:.0f}us")
+
+    def model_ready(frame):
+        # What StandardScaler.transform converts the frame into before scaling
+        return feature_engineering(frame.copy(deep=False))[FEATURE_COLUMNS].to_numpy(np.float64)
+
+    batch_frame = best_of(lambda: feature_engineering(data.copy(deep=False)), 3)
+    batch_old = best_of(lambda: model_ready(data), 3)
+    batch_new = best_of(lambda: feature_matrix(data), 3)
+    print(f"{len(data)} rows: feature_engineering={batch_frame:.2f}s "
+          f"feature_engineering+to_numpy={batch_old:.2f}s feature_matrix={batch_new:.2f}s")
+
+    sample = data.iloc[:1_000_000]
+    print(f"peak allocation per 1M rows: "
+          f"feature_engineering+to_numpy={traced_peak_mb(model_ready, sample):.0f}MB "
+          f"feature_matrix={traced_peak_mb(feature_matrix, sample):.0f}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Single-transaction latency of score_one against the pandas predict_proba path.
+
+Usage:
+    python -m benchmarks.bench_latency --model_type rf --calls 2000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import bench_model
+from benchmarks.synthetic import generate_paysim
+
+def percentiles(timings):
+    """Formats p50/p99 of ``timings`` (seconds) in microseconds."""
+    p50, p99 = np.percentile(np.asarray(timings) * 1e6, [50, 99])
+    return f"p50={p50:,.0f}us p99={p99:,.0f}us"
+
+def measure(func, records):
+    """Times ``func`` on each record separately."""
+    timings = []
+    for record in records:
+        start = time.perf_counter()
+        func(record)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    """Prints latency percentiles for each single-row scoring path."""
+    # pylint: disable=import-outside-toplevel
+    from src.data_loader import clean_data
+    from src.features import feature_engineering
+    from src.model import FraudDetector
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='rf')
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    detector = FraudDetector()
+    detector.load_model(bench_model(args.model_type))
+    records = generate_paysim(args.calls, seed=5).to_dict('records')
+
+    def pandas_path(record):
+        frame = feature_engineering(clean_data(pd.DataFrame([record])))
+        return detector.predict_proba(frame.drop(columns=['isFraud']))
+
+    # Warm up both paths
+    measure(pandas_path, records[:20])
+    measure(detector.score_one, records[:20])
+
+    print(f"model={args.model_type} calls={args.calls}")
+    print(f"predict_proba (DataFrame path): {percentiles(measure(pandas_path, records))}")
+    print(f"score_one:                      {percentiles(measure(detector.score_one, records))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmarks the eager, typed and streaming loaders on a PaySim-sized file.
+
+Usage:
+    python -m benchmarks.bench_loader --rows 6362620 --chunksize 500000
+
+Each mode runs in a fresh interpreter so that peak RSS is not shared.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import bench_path, peak_rss_mb
+from benchmarks.synthetic import PAYSIM_ROWS, write_paysim_csv
+
+MODES = ['eager', 'typed', 'stream']
+
+def run_mode(mode, path, chunksize):
+    """Loads ``path`` with ``mode`` and returns wall time and peak RSS."""
+    # pylint: disable=import-outside-toplevel
+    from src.data_loader import load_data, clean_data, iter_clean_chunks
+
+    start = time.perf_counter()
+    if mode == 'eager':
+        rows = len(clean_data(load_data(path)))
+    elif mode == 'typed':
+        rows = len(clean_data(load_data(path, chunksize=chunksize, skip_names=True)))
+    else:
+        rows = sum(len(chunk) for chunk in iter_clean_chunks(path, chunksize, skip_names=True))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'rows': rows,
+        'seconds': round(elapsed, 2),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def main():
+    """Generates the input file if needed and benchmarks every mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=PAYSIM_ROWS)
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    parser.add_argument('--path', type=str, default=None)
+    parser.add_argument('--mode', choices=MODES, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    path = args.path or bench_path(f'synthetic_{args.rows}.csv')
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, path, args.chunksize)))
+        return
+
+    if not os.path.exists(path):
+        print(f"Generating {args.rows} rows into {path}...")
+        write_paysim_csv(path, args.rows)
+
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_loader', '--mode', mode, '--path', path,
+             '--chunksize', str(args.chunksize)],
+            check=True, capture_output=True, text=True
+        )
+        print(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
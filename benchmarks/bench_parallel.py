@@ -0,0 +1,82 @@
+"""
+Scaling of parallel featurization (src.parallel) from 1 to N workers, and
+the cost of handing chunks to scoring workers by pickling them versus
+scoring slices of the shared matrix in place.
+
+Usage:
+    python -m benchmarks.bench_parallel --rows 2000000 --max_workers 8
+
+The serial baseline is the in-memory train path: load_data, clean_data
+and feature_frame. Speedups are relative to featurize_parallel with one
+worker. Timings are the best of ``repeat`` runs on a warm page cache.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+from benchmarks.common import bench_csv, bench_model
+
+def best_of(func, repeat):
+    """Returns the fastest of ``repeat`` timed calls in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    """Times serial and parallel featurization, then both scoring handoffs."""
+    # pylint: disable=import-outside-toplevel
+    from src.data_loader import clean_data, load_data
+    from src.features import feature_frame
+    from src.parallel import featurize_parallel
+    from src.scoring import score_file
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--max_workers', type=int, default=os.cpu_count())
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='xgb')
+    args = parser.parse_args()
+    logging.getLogger('CreditCardFraud').setLevel(logging.WARNING)
+
+    path = bench_csv(args.rows)
+    print(f"rows={args.rows} cpus={os.cpu_count()}")
+
+    def serial():
+        feature_frame(clean_data(load_data(path, chunksize=500_000, skip_names=True)))
+
+    def parallel(workers):
+        with featurize_parallel(path, workers) as shared:
+            return shared.rows
+
+    serial_seconds = best_of(serial, args.repeat)
+    print(json.dumps({'featurize': 'serial', 'seconds': round(serial_seconds, 3)}))
+    one_worker = None
+    for workers in range(1, args.max_workers + 1):
+        seconds = best_of(lambda w=workers: parallel(w), args.repeat)
+        one_worker = one_worker or seconds
+        print(json.dumps({
+            'featurize': 'parallel', 'workers': workers, 'seconds': round(seconds, 3),
+            'rows_per_s': round(args.rows / seconds), 'speedup': round(one_worker / seconds, 2),
+            'vs_serial': round(serial_seconds / seconds, 2)
+        }))
+
+    model_path = bench_model(args.model_type)
+    output = path + '.scores.csv'
+    workers = max(args.max_workers, 2)
+    for shared in (False, True):
+        seconds = best_of(lambda s=shared: score_file(
+            model_path, path, output, workers=workers, shared=s
+        ), args.repeat)
+        print(json.dumps({
+            'score_file': 'shared' if shared else 'pickled', 'workers': workers,
+            'seconds': round(seconds, 3), 'rows_per_s': round(args.rows / seconds)
+        }))
+    os.remove(output)
+
+if __name__ == "__main__":
+    main()
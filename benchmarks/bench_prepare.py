@@ -0,0 +1,79 @@
+"""
+Peak memory and time of prepare_data against prepare_data_lean.
+
+Usage:
+    python -m benchmarks.bench_prepare --rows 6362620
+    python -m benchmarks.bench_prepare --rows 6362620 --train xgb
+
+Each mode runs in a fresh interpreter so that peak RSS is not shared. The
+featurized frame is built first; ``loaded_rss_mb`` is the peak up to there.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.common import bench_csv, peak_rss_mb
+from benchmarks.synthetic import PAYSIM_ROWS
+
+MODES = ['prepare_data', 'lean', 'lean_unscaled']
+
+def run_mode(mode, path, train):
+    """Splits (and optionally trains on) ``path`` with ``mode``."""
+    # pylint: disable=import-outside-toplevel
+    from src.data_loader import load_data, clean_data
+    from src.features import feature_frame
+    from src.model import FraudDetector
+
+    data = feature_frame(clean_data(load_data(path, chunksize=500_000, skip_names=True)))
+    loaded_rss = peak_rss_mb()
+
+    detector = FraudDetector(model_type=train or 'rf')
+    start = time.perf_counter()
+    if mode == 'prepare_data':
+        train_features, _, train_labels, _ = detector.prepare_data(data)
+    else:
+        train_features, _, train_labels, _ = detector.prepare_data_lean(
+            data, scale=mode == 'lean'
+        )
+    prepared = time.perf_counter()
+    prepare_rss = peak_rss_mb()
+
+    report = {
+        'mode': mode,
+        'prepare_seconds': round(prepared - start, 2),
+        'loaded_rss_mb': loaded_rss,
+        'prepare_peak_rss_mb': prepare_rss
+    }
+    if train:
+        del data
+        detector.train(train_features, train_labels)
+        report['train_seconds'] = round(time.perf_counter() - prepared, 1)
+        report['train_peak_rss_mb'] = peak_rss_mb()
+    return report
+
+def main():
+    """Generates the input file if needed and benchmarks every mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=PAYSIM_ROWS)
+    parser.add_argument('--train', choices=['rf', 'xgb'], default=None,
+                        help='Also train this model type on the prepared split')
+    parser.add_argument('--mode', choices=MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--path', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.path, args.train)))
+        return
+
+    path = bench_csv(args.rows)
+    for mode in MODES:
+        command = [sys.executable, '-m', 'benchmarks.bench_prepare', '--mode', mode, '--path', path]
+        if args.train:
+            command += ['--train', args.train]
+        out = subprocess.run(command, check=True, capture_output=True, text=True)
+        print(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
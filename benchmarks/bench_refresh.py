@@ -0,0 +1,88 @@
+"""
+Daily model refresh: FraudDetector.update on each new day against a full
+retrain on the whole history, over several simulated days of ``step``s.
+
+Usage:
+    python -m benchmarks.bench_refresh --model_type xgb --rows 1000000 --days 5
+    python -m benchmarks.bench_refresh --model_type rf --max_tree_age 96 --label_noise 0.001
+
+A model is trained on every step before the first simulated day. Each day
+(24 steps) the incremental model is updated with that day's rows only,
+while the full model is retrained on every row so far. Both are then scored
+on the following day. The synthetic fraud pattern is nearly deterministic;
+``label_noise`` flips that fraction of labels so the AUCs can differ.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import bench_csv
+
+STEPS_PER_DAY = 24
+
+def main():
+    """Refreshes both models day by day and prints their timings and AUCs."""
+    # pylint: disable=import-outside-toplevel
+    from sklearn.metrics import roc_auc_score
+    from src.data_loader import clean_data, load_data
+    from src.features import feature_frame
+    from src.model import FraudDetector
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='xgb')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--update_trees', type=int, default=None)
+    parser.add_argument('--max_tree_age', type=int, default=None)
+    parser.add_argument('--label_noise', type=float, default=0.0)
+    args = parser.parse_args()
+
+    data = feature_frame(clean_data(load_data(bench_csv(args.rows), skip_names=True)))
+    if args.label_noise:
+        flip = np.random.default_rng(0).random(len(data)) < args.label_noise
+        data['isFraud'] = np.where(flip, 1 - data['isFraud'], data['isFraud'])
+    features = data.drop(columns=['isFraud'])
+    labels = data['isFraud'].to_numpy()
+    steps = data['step'].to_numpy()
+    # The last day is only scored
+    first_day = int(steps.max()) + 1 - (args.days + 1) * STEPS_PER_DAY
+    print(f"model={args.model_type} rows={len(data)} first_day_step={first_day}")
+
+    def train_full(stop):
+        detector = FraudDetector(model_type=args.model_type,
+                                 params={'verbose': 0} if args.model_type == 'rf' else None)
+        history = steps < stop
+        start = time.perf_counter()
+        detector.feature_names = list(features.columns)
+        scaled = detector.scaler.fit_transform(features[history])
+        detector.train(scaled, labels[history])
+        return detector, time.perf_counter() - start
+
+    incremental, seconds = train_full(first_day)
+    print(json.dumps({'initial_train_s': round(seconds, 2),
+                      'rows': int(np.count_nonzero(steps < first_day))}))
+    for day in range(args.days):
+        low = first_day + day * STEPS_PER_DAY
+        window = (steps >= low) & (steps < low + STEPS_PER_DAY)
+        scored = (steps >= low + STEPS_PER_DAY) & (steps < low + 2 * STEPS_PER_DAY)
+
+        start = time.perf_counter()
+        incremental.update(features[window], labels[window], n_estimators=args.update_trees,
+                           max_tree_age=args.max_tree_age)
+        update_seconds = time.perf_counter() - start
+        full, full_seconds = train_full(low + STEPS_PER_DAY)
+
+        row = {'day': day + 1, 'window_rows': int(np.count_nonzero(window)),
+               'update_s': round(update_seconds, 2), 'retrain_s': round(full_seconds, 2),
+               'speedup': round(full_seconds / update_seconds, 1)}
+        for name, detector in (('update', incremental), ('retrain', full)):
+            probabilities = detector.predict_proba(features[scored])[:, 1]
+            row[f'{name}_auc'] = round(roc_auc_score(labels[scored], probabilities), 5)
+        row['scaler_updated'] = incremental.refresh['history'][-1]['scaler_updated']
+        row['trees'] = incremental.refresh['history'][-1]['trees']
+        print(json.dumps(row))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Measures batch scoring throughput against the number of worker processes.
+
+Usage:
+    python -m benchmarks.bench_score --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import bench_csv, bench_model, bench_path
+
+def main():
+    """Scores the same file with each worker count and prints rows/sec."""
+    # pylint: disable=import-outside-toplevel
+    from src.scoring import score_file
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='rf')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    model_path = bench_model(args.model_type)
+    input_path = bench_csv(args.rows)
+    print(f"cpus={os.cpu_count()} rows={args.rows} model={args.model_type}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        rows = score_file(model_path, input_path, bench_path('scores.csv'),
+                          chunksize=args.chunksize, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"workers={workers}: {rows / elapsed:,.0f} rows/s ({elapsed:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Peak memory and time of in-memory against out-of-core training.
+
+Usage:
+    python -m benchmarks.bench_training --model_type xgb --rows 2000000
+    python -m benchmarks.bench_training --model_type rf --rows 1000000 --max_rows 250000
+
+Each mode runs in a fresh interpreter so that peak RSS is not shared.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.common import bench_csv, peak_rss_mb
+
+MODES = ['in_memory', 'out_of_core']
+
+def run_mode(mode, path, model_type, chunksize, max_rows):
+    """Trains on ``path`` with ``mode`` and returns wall time, peak RSS and test AUC."""
+    # pylint: disable=import-outside-toplevel
+    from sklearn.metrics import roc_auc_score
+    from src.data_loader import load_data, clean_data
+    from src.features import feature_frame
+    from src.model import FraudDetector
+    from src.training import train_out_of_core
+
+    start = time.perf_counter()
+    if mode == 'in_memory':
+        data = feature_frame(clean_data(load_data(path, chunksize=chunksize, skip_names=True)))
+        detector = FraudDetector(model_type=model_type)
+        # pylint: disable=unbalanced-tuple-unpacking
+        train_features, test_features, train_labels, test_labels = detector.prepare_data(data)
+        del data
+        detector.train(train_features, train_labels)
+    else:
+        detector, test_features, test_labels = train_out_of_core(
+            path, model_type=model_type, chunksize=chunksize, max_rows=max_rows
+        )
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'seconds': round(elapsed, 1),
+        'peak_rss_mb': peak_rss_mb(),
+        'test_auc': round(roc_auc_score(
+            test_labels, detector.model.predict_proba(test_features)[:, 1]
+        ), 4)
+    }
+
+def main():
+    """Generates the input file if needed and benchmarks both modes."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='xgb')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    parser.add_argument('--max_rows', type=int, default=2_000_000)
+    parser.add_argument('--mode', choices=MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--path', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.path, args.model_type, args.chunksize,
+                                  args.max_rows)))
+        return
+
+    path = bench_csv(args.rows)
+    print(f"model={args.model_type} rows={args.rows} max_rows={args.max_rows}")
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_training', '--mode', mode, '--path', path,
+             '--model_type', args.model_type, '--chunksize', str(args.chunksize),
+             '--max_rows', str(args.max_rows)],
+            check=True, capture_output=True, text=True
+        )
+        print(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import os
+import resource
+import numpy as np
+
+BENCH_DIR = os.environ.get('CFD_BENCH_DIR', os.path.join('/tmp', 'cfd_bench'))
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB.
+
+    ``VmHWM`` is read from ``/proc`` where available because ``ru_maxrss``
+    survives ``exec`` and would report the parent's peak in a fresh child.
+    """
+    try:
+        with open('/proc/self/status', encoding='utf-8') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def bench_path(name):
+    """Returns a path under the benchmark scratch directory, creating it if needed."""
+    if not os.path.exists(BENCH_DIR):
+        os.makedirs(BENCH_DIR)
+    return os.path.join(BENCH_DIR, name)
+
+def bench_csv(rows, seed=0):
+    """Returns a synthetic CSV of ``rows`` transactions, generating it once."""
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.synthetic import write_paysim_csv
+    path = bench_path(f'synthetic_{rows}.csv' if seed == 0 else f'synthetic_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        write_paysim_csv(path, rows, seed=seed)
+    return path
+
+def bench_model(model_type='rf', rows=200_000, label_noise=0.0):
+    """
+    Returns the path of a model trained on ``rows`` synthetic rows, training it once.
+
+    ``label_noise`` flips that fraction of labels; the synthetic fraud pattern is
+    nearly deterministic, so this is what grows trees to a realistic size.
+    """
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.synthetic import generate_paysim
+    from src.data_loader import clean_data
+    from src.features import feature_frame
+    from src.model import FraudDetector
+
+    name = f'model_{model_type}_{rows}' + (f'_noise{label_noise}' if label_noise else '')
+    path = bench_path(f'{name}.pkl')
+    if not os.path.exists(path):
+        data = feature_frame(clean_data(generate_paysim(rows, seed=42, fraud_rate=0.01)))
+        if label_noise:
+            flip = np.random.default_rng(0).random(len(data)) < label_noise
+            data['isFraud'] = np.where(flip, 1 - data['isFraud'], data['isFraud'])
+        detector = FraudDetector(model_type=model_type)
+        train_features, _, train_labels, _ = detector.prepare_data(data)
+        detector.train(train_features, train_labels)
+        detector.save_model(path)
+    return path
@@ -0,0 +1,119 @@
+"""
+Load test for the micro-batching scoring server.
+
+Starts ``main.py --mode serve`` on a benchmark model (or targets a running
+server with --port) and, for each concurrency level, keeps that many
+keep-alive clients sending single-transaction requests for --duration
+seconds. Reports throughput, latency percentiles and shed (503) requests.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 1 8 32 128 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+
+from benchmarks.common import bench_model
+from benchmarks.synthetic import generate_paysim
+
+async def _client(port, bodies, stop_at, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = 0
+    try:
+        while time.perf_counter() < stop_at:
+            body = bodies[i % len(bodies)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(b"POST /score HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s"
+                         % (len(body), body))
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses.append(status)
+            if status == 503:
+                await asyncio.sleep(0.001)
+    finally:
+        writer.close()
+
+async def run_level(port, bodies, concurrency, duration):
+    """Runs one concurrency level and returns its summary."""
+    latencies, statuses = [], []
+    stop_at = time.perf_counter() + duration
+    await asyncio.gather(*[
+        _client(port, bodies[i::concurrency] or bodies, stop_at, latencies, statuses)
+        for i in range(concurrency)
+    ])
+    statuses = np.asarray(statuses)
+    ok = np.asarray(latencies)[statuses == 200] * 1000
+    p50, p99, p999 = np.percentile(ok, [50, 99, 99.9]) if len(ok) else (0, 0, 0)
+    return {
+        'concurrency': concurrency,
+        'throughput_rps': round(len(ok) / duration, 1),
+        'p50_ms': round(p50, 2), 'p99_ms': round(p99, 2), 'p999_ms': round(p999, 2),
+        'shed': int((statuses == 503).sum())
+    }
+
+async def _wait_healthy(port, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            await reader.read()
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError("Scoring server did not become healthy")
+
+def main():
+    """Runs every concurrency level and prints one JSON line per level."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=None, help='Target a running server')
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='rf')
+    parser.add_argument('--max_batch', type=int, default=256)
+    parser.add_argument('--max_wait_ms', type=float, default=2.0)
+    parser.add_argument('--max_queue', type=int, default=1024)
+    args = parser.parse_args()
+
+    bodies = [
+        json.dumps(record).encode('utf-8')
+        for record in json.loads(generate_paysim(2000, seed=9).to_json(orient='records'))
+    ]
+
+    server = None
+    port = args.port
+    if port is None:
+        port = 18080
+        server = subprocess.Popen([ # pylint: disable=consider-using-with
+            sys.executable, 'main.py', '--mode', 'serve', '--port', str(port),
+            '--model_path', bench_model(args.model_type), '--max_batch', str(args.max_batch),
+            '--max_wait_ms', str(args.max_wait_ms), '--max_queue', str(args.max_queue)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        asyncio.run(_wait_healthy(port))
+        for concurrency in args.concurrency:
+            print(json.dumps(asyncio.run(run_level(port, bodies, concurrency, args.duration))))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+End-to-end benchmark suite on seeded synthetic PaySim data, with a stored
+baseline so that regressions fail.
+
+Usage:
+    python -m benchmarks.suite --rows 200000
+    python -m benchmarks.suite --rows 200000 --save_baseline
+    python -m benchmarks.suite --rows 1000000 --model_type xgb --baseline /tmp/xgb_1m.json
+
+Every stage of the pipeline is timed in order: load_data, clean_data,
+feature_engineering, prepare_data, train, load_model, batch predict_proba
+over the held-out split and single-row score_one. Each records seconds,
+rows per second and peak RSS; peak RSS is the process high-water mark at
+the end of the stage, so it only grows from one stage to the next. score_one
+also records latency percentiles.
+
+Results are written to --output as JSON. When the baseline file was recorded
+with the same configuration, a stage slower than its baseline by more than
+--tolerance, or with peak RSS above it by more than --rss_tolerance, is a
+regression: it is printed and the exit status is 1. Stages faster than
+--min_seconds in the baseline are too noisy to compare on time.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import bench_csv, bench_path, peak_rss_mb
+from benchmarks.synthetic import generate_paysim
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Metrics compared against the baseline (larger is worse for all of them)
+TIME_METRICS = ['seconds', 'p50_us', 'p99_us']
+RSS_METRIC = 'peak_rss_mb'
+
+def _percentiles(timings):
+    """p50/p95/p99 of ``timings`` (seconds) in microseconds."""
+    p50, p95, p99 = np.percentile(np.asarray(timings) * 1e6, [50, 95, 99])
+    return {'p50_us': round(p50, 1), 'p95_us': round(p95, 1), 'p99_us': round(p99, 1)}
+
+def run_suite(rows, model_type='rf', calls=1000, seed=0, model_format='pickle'):
+    """
+    Runs every stage on a synthetic CSV of ``rows`` transactions and returns
+    {'config': ..., 'stages': {stage: metrics}}.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pandas as pd
+    from src.data_loader import load_data, clean_data
+    from src.features import feature_engineering
+    from src.model import FraudDetector
+
+    path = bench_csv(rows, seed=seed)
+    stages = {}
+
+    def timed(stage, func, n_rows):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        stages[stage] = {
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(n_rows / seconds) if n_rows and seconds else None,
+            RSS_METRIC: peak_rss_mb()
+        }
+        return result
+
+    data = timed('load_data', lambda: load_data(path), rows)
+    data = timed('clean_data', lambda: clean_data(data), rows)
+    data = timed('feature_engineering', lambda: feature_engineering(data), len(data))
+
+    detector = FraudDetector(model_type=model_type)
+    # pylint: disable=unbalanced-tuple-unpacking
+    train_features, test_features, train_labels, _ = timed(
+        'prepare_data', lambda: detector.prepare_data(data), len(data)
+    )
+    del data
+    timed('train', lambda: detector.train(train_features, train_labels), len(train_labels))
+    del train_features
+
+    suffix = '.pkl' if model_format == 'pickle' else ''
+    model_path = bench_path(f'suite_{model_type}_{rows}{suffix}')
+    detector.save_model(model_path)
+    loaded = FraudDetector()
+    timed('load_model', lambda: loaded.load_model(model_path), None)
+
+    # The held-out split is scaled; score it as raw features like callers do
+    frame = pd.DataFrame(detector.scaler.inverse_transform(test_features),
+                         columns=detector.feature_names)
+    timed('predict_proba', lambda: loaded.predict_proba(frame), len(frame))
+
+    records = generate_paysim(calls, seed=seed + 1).to_dict('records')
+    for record in records[:20]:
+        loaded.score_one(record)
+    timings = []
+    start = time.perf_counter()
+    for record in records:
+        began = time.perf_counter()
+        loaded.score_one(record)
+        timings.append(time.perf_counter() - began)
+    seconds = time.perf_counter() - start
+    stages['score_one'] = {
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(calls / seconds),
+        **_percentiles(timings),
+        RSS_METRIC: peak_rss_mb()
+    }
+
+    return {
+        'config': {'rows': rows, 'model_type': model_type, 'calls': calls, 'seed': seed,
+                   'model_format': model_format},
+        'stages': stages
+    }
+
+def compare(results, baseline, tolerance=0.5, rss_tolerance=0.10, min_seconds=0.05):
+    """
+    Returns a description of every regression of ``results`` against
+    ``baseline``. Raises ValueError if they were run with different configurations.
+    """
+    if results['config'] != baseline['config']:
+        raise ValueError(f"Baseline configuration {baseline['config']} does not match "
+                         f"{results['config']}")
+    regressions = []
+    for stage, before in baseline['stages'].items():
+        after = results['stages'].get(stage)
+        if after is None:
+            regressions.append(f"{stage}: missing from results")
+            continue
+        if before['seconds'] >= min_seconds:
+            for metric in TIME_METRICS:
+                if metric in before and after[metric] > before[metric] * (1 + tolerance):
+                    regressions.append(f"{stage}: {metric} {after[metric]} vs {before[metric]}")
+        if after[RSS_METRIC] > before[RSS_METRIC] * (1 + rss_tolerance):
+            regressions.append(
+                f"{stage}: {RSS_METRIC} {after[RSS_METRIC]} vs {before[RSS_METRIC]}"
+            )
+    return regressions
+
+def _print_table(results, baseline):
+    print(f"config: {results['config']}")
+    for stage, metrics in results['stages'].items():
+        before = (baseline or {}).get('stages', {}).get(stage, {})
+        change = ''
+        if before.get('seconds'):
+            change = f" ({metrics['seconds'] / before['seconds'] - 1:+.0%} vs baseline)"
+        latency = (f" p50={metrics['p50_us']}us p99={metrics['p99_us']}us"
+                   if 'p50_us' in metrics else '')
+        throughput = metrics['rows_per_second']
+        throughput = '-' if throughput is None else f"{throughput:,}"
+        print(f"{stage:20s} {metrics['seconds']:9.3f}s{change:22s} {throughput:>12s} rows/s "
+              f"rss={metrics[RSS_METRIC]:.0f}MB{latency}")
+
+def main():
+    """Runs the suite, writes the results and checks them against the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--model_type', choices=['rf', 'xgb'], default='rf')
+    parser.add_argument('--model_format', choices=['pickle', 'artifact'], default='pickle')
+    parser.add_argument('--calls', type=int, default=1000, help='score_one calls')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None,
+                        help='Results JSON (default: under the benchmark scratch directory)')
+    parser.add_argument('--baseline', type=str, default=BASELINE_PATH)
+    parser.add_argument('--save_baseline', action='store_true',
+                        help='Overwrite --baseline with these results instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--rss_tolerance', type=float, default=0.10)
+    parser.add_argument('--min_seconds', type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = run_suite(args.rows, model_type=args.model_type, calls=args.calls,
+                        seed=args.seed, model_format=args.model_format)
+    output = args.output or bench_path(f'suite_{args.model_type}_{args.rows}.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        _print_table(results, None)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['config'] != results['config']:
+            print(f"Baseline {args.baseline} has a different configuration; not comparing")
+            baseline = None
+    _print_table(results, baseline)
+    print(f"Results written to {output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, tolerance=args.tolerance,
+                              rss_tolerance=args.rss_tolerance, min_seconds=args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Seeded generator for PaySim-schema transaction data.
+
+The real dataset is not redistributable, so benchmarks run against synthetic
+data with the same columns, a similar transaction type mix and a similar
+fraud rate.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+PAYSIM_ROWS = 6_362_620
+
+# Approximate type mix of the PaySim log.
+TYPE_MIX = {
+    'CASH_OUT': 0.3517,
+    'PAYMENT': 0.3381,
+    'CASH_IN': 0.2199,
+    'TRANSFER': 0.0838,
+    'DEBIT': 0.0065
+}
+
+# In PaySim fraud only occurs on TRANSFER and CASH_OUT.
+FRAUD_RATE = 0.00129
+FRAUD_TYPES = ['TRANSFER', 'CASH_OUT']
+
+COLUMNS = [
+    'step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig',
+    'nameDest', 'oldbalanceDest', 'newbalanceDest', 'isFraud', 'isFlaggedFraud'
+]
+
+def generate_paysim(n_rows, seed=0, start_row=0, total_rows=None, fraud_rate=FRAUD_RATE):
+    """
+    Generates ``n_rows`` PaySim-like transactions as a DataFrame.
+
+    ``start_row``/``total_rows`` place the rows within a larger file so that
+    chunks generated separately keep ``step`` non-decreasing across the file.
+    ``fraud_rate`` can be raised to get enough positives in small samples.
+    """
+    rng = np.random.default_rng([seed, start_row])
+    total_rows = total_rows or n_rows
+
+    # Steps are hours over ~31 days, in order like the original log.
+    steps = 1 + ((start_row + np.arange(n_rows)) * 743) // max(total_rows, 1)
+
+    types = rng.choice(list(TYPE_MIX), size=n_rows, p=list(TYPE_MIX.values()))
+    amount = np.round(rng.lognormal(mean=11.0, sigma=1.4, size=n_rows), 2)
+    old_orig = np.round(rng.lognormal(mean=10.0, sigma=2.5, size=n_rows), 2)
+    old_orig[rng.random(n_rows) < 0.33] = 0.0
+
+    incoming = types == 'CASH_IN'
+    new_orig = np.where(incoming, old_orig + amount, np.maximum(old_orig - amount, 0.0))
+
+    old_dest = np.round(rng.lognormal(mean=12.0, sigma=2.0, size=n_rows), 2)
+    merchant = types == 'PAYMENT'
+    old_dest[merchant] = 0.0
+    new_dest = np.where(merchant, 0.0, old_dest + amount)
+
+    # Fraud empties the origin account and often leaves the destination untouched.
+    fraud_candidates = np.isin(types, FRAUD_TYPES)
+    is_fraud = fraud_candidates & (rng.random(n_rows) < fraud_rate / 0.4355)
+    amount = np.where(is_fraud, np.maximum(old_orig, amount), amount)
+    old_orig = np.where(is_fraud, amount, old_orig)
+    new_orig = np.where(is_fraud, 0.0, new_orig)
+    hidden = is_fraud & (rng.random(n_rows) < 0.5)
+    old_dest = np.where(hidden, 0.0, old_dest)
+    new_dest = np.where(hidden, 0.0, new_dest)
+
+    flagged = is_fraud & (types == 'TRANSFER') & (amount > 200_000) & (rng.random(n_rows) < 0.01)
+
+    orig_ids = rng.integers(1_000_000_000, 2_000_000_000, size=n_rows)
+    # Destinations repeat far more often than origins in PaySim.
+    dest_ids = rng.integers(1_000_000_000, 1_000_000_000 + max(n_rows // 3, 1), size=n_rows)
+    dest_prefix = np.where(merchant, 'M', 'C')
+
+    return pd.DataFrame({
+        'step': steps,
+        'type': types,
+        'amount': amount,
+        'nameOrig': np.char.add('C', orig_ids.astype(str)),
+        'oldbalanceOrg': old_orig,
+        'newbalanceOrig': np.round(new_orig, 2),
+        'nameDest': np.char.add(dest_prefix, dest_ids.astype(str)),
+        'oldbalanceDest': old_dest,
+        'newbalanceDest': np.round(new_dest, 2),
+        'isFraud': is_fraud.astype(int),
+        'isFlaggedFraud': flagged.astype(int)
+    }, columns=COLUMNS)
+
+def write_paysim_csv(path, n_rows, seed=0, chunk_rows=1_000_000):
+    """
+    Writes ``n_rows`` synthetic transactions to ``path`` in bounded-memory chunks.
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        for start in range(0, n_rows, chunk_rows):
+            chunk = generate_paysim(
+                min(chunk_rows, n_rows - start), seed=seed, start_row=start, total_rows=n_rows
+            )
+            chunk.to_csv(handle, header=start == 0, index=False)
+    return path
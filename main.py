@@ -5,66 +5,185 @@ Main execution script for the Credit Card Fraud Detection System.
 import argparse
 import sys
 import os
-from src.data_loader import load_data, clean_data
-from src.features import feature_engineering
+from src.data_loader import load_data, clean_data, DEFAULT_CHUNKSIZE
+from src.features import feature_frame
+from src.audit import DEFAULT_MAX_QUEUE as DEFAULT_AUDIT_QUEUE, POLICIES as AUDIT_POLICIES
+from src.cache import DatasetCache, file_fingerprint
 from src.model import FraudDetector
-from src.evaluation import evaluate_model
-from src.utils import logger
+from src.monitoring import write_drift_report
+from src.profiling import enable_profiling, span, traced, PROFILE_MODES
+from src.registry import ModelRegistry, DEFAULT_REGISTRY
+from src.utils import logger, setup_logging
 
-def run_training(args):
+# Mode-specific modules (src.evaluation with its plotting stack, src.scoring,
+# src.server, src.replay) are imported inside the run_* function that uses them, so the
+# predict and scoring paths start without them.
+
+@traced('load_dataset')
+def load_dataset(args):
     """
-    Executes the training pipeline.
+    Loads, cleans and featurizes the dataset, going through the dataset cache
+    unless it is disabled.
     """
-    logger.info("Starting training pipeline...")
+    cache = None if args.no_cache else DatasetCache(args.cache_dir)
+    fingerprint = None
+    if cache is not None:
+        if args.rebuild_cache:
+            cache.invalidate(args.data)
+        else:
+            fingerprint = cache.fingerprint(args.data)
+            data = cache.load(args.data, fingerprint=fingerprint)
+            if data is not None:
+                return data
+
+    if args.shared_features:
+        # 1-3. Load, clean and featurize row shards in a process pool, into
+        # shared memory that the frame wraps without copying
+        # pylint: disable=import-outside-toplevel
+        from src.parallel import featurize_parallel
+        with span('featurize_parallel') as stage:
+            with featurize_parallel(args.data, args.workers,
+                                    chunksize=args.chunksize or DEFAULT_CHUNKSIZE,
+                                    directory=args.scratch_dir) as shared:
+                data = shared.frame()
+            stage.rows_out = len(data)
+    else:
+        # 1. Load Data
+        with span('load_data') as stage:
+            data = load_data(args.data, chunksize=args.chunksize or None, skip_names=True)
+            stage.rows_out = len(data)
+
+        # 2. Clean Data
+        with span('clean_data', rows_in=len(data)) as stage:
+            data = clean_data(data)
+            stage.rows_out = len(data)
+
+        # 3. Feature Engineering
+        with span('feature_engineering', rows_in=len(data)) as stage:
+            data = feature_frame(data)
+            stage.rows_out = len(data)
+
+    if cache is not None:
+        cache.store(args.data, data, fingerprint=fingerprint)
+    return data
+
+def model_source(args):
+    """
+    The model to load: --model_version (or CURRENT) of --registry if given,
+    otherwise --model_path. Exits if there is none.
+    """
+    if args.registry:
+        try:
+            return ModelRegistry(args.registry).model_path(args.model_version)
+        except ValueError as exc:
+            logger.error("%s. Train with --registry first.", exc)
+            sys.exit(1)
+    if not os.path.exists(args.model_path):
+        logger.error("Model path %s does not exist. Train first.", args.model_path)
+        sys.exit(1)
+    return args.model_path
 
-    # 1. Load Data
-    data = load_data(args.data)
+def save_detector(args, detector, metrics):
+    """
+    Saves a trained or updated model to --model_path, or registers it as a
+    new version of --registry (with its metrics and the fingerprint of
+    --data) and promotes it.
+    """
+    if not args.registry:
+        detector.save_model(args.model_path)
+        return
+    if args.no_cache or args.out_of_core:
+        fingerprint = file_fingerprint(args.data)
+    else:
+        fingerprint = DatasetCache(args.cache_dir).fingerprint(args.data)
+    ModelRegistry(args.registry).register(
+        detector, metrics={'auc': metrics['auc'], 'operating_point': metrics['operating_point']},
+        data_fingerprint=fingerprint, data=args.data, mode=args.mode
+    )
 
-    # 2. Clean Data
-    data = clean_data(data)
+@traced('run_training')
+def run_training(args, data=None, params=None):
+    """
+    Executes the training pipeline, on the featurized ``data`` if given and
+    with the estimator ``params`` if given (tune mode passes both).
+    """
+    # pylint: disable=import-outside-toplevel
+    from src.evaluation import evaluate_model, evaluate_cascade, DetectorScorer
+    logger.info("Starting training pipeline...")
 
-    # 3. Feature Engineering
-    data = feature_engineering(data)
+    if args.out_of_core:
+        # 1-6. Stream, featurize, spill and train with bounded memory
+        # pylint: disable=import-outside-toplevel
+        from src.training import train_out_of_core, parse_negative_rate
+        with span('train_out_of_core') as stage:
+            detector, test_features, test_labels = train_out_of_core(
+                args.data, model_type=args.model_type,
+                chunksize=args.chunksize or DEFAULT_CHUNKSIZE, max_rows=args.max_train_rows,
+                negative_rate=(parse_negative_rate(args.negative_rate)
+                               if args.negative_rate else None)
+            )
+            stage.rows_out = len(test_labels)
+    else:
+        # 1-3. Load, clean and featurize data
+        if data is None:
+            data = load_dataset(args)
 
-    # 4. Initialize Model
-    detector = FraudDetector(model_type=args.model_type)
+        # 4. Initialize Model
+        detector = FraudDetector(model_type=args.model_type, params=params)
 
-    # 5. Prepare Data
-    # pylint: disable=unbalanced-tuple-unpacking
-    train_features, test_features, train_labels, test_labels = detector.prepare_data(data)
+        # 5. Prepare Data
+        # pylint: disable=unbalanced-tuple-unpacking
+        if args.lean:
+            train_features, test_features, train_labels, test_labels = \
+                detector.prepare_data_lean(data, scale=not args.no_scaling)
+        else:
+            train_features, test_features, train_labels, test_labels = detector.prepare_data(data)
+        del data
 
-    # 6. Train Model
-    detector.train(train_features, train_labels)
+        # 6. Train Model
+        detector.train(train_features, train_labels)
+        if args.cascade:
+            detector.fit_cascade(train_features, train_labels)
 
-    # 7. Evaluate Model
-    evaluate_model(detector.model, test_features, test_labels)
+    # 7. Evaluate Model (through the cascade if there is one, so the stored
+    # operating point holds for the scores the saved model produces)
+    with span('evaluate', rows_in=len(test_labels)):
+        metrics = evaluate_model(
+            detector.model if detector.cascade is None else DetectorScorer(detector),
+            test_features, test_labels, threshold=detector.threshold,
+            plots=not args.no_plots, costs={'fp': args.cost_fp, 'fn': args.cost_fn}
+        )
+    if args.tune_threshold:
+        detector.threshold = metrics['operating_point']['threshold']
+        logger.info("Storing operating point threshold %.6f with the model.", detector.threshold)
+    if detector.cascade is not None:
+        evaluate_cascade(detector, test_features, test_labels)
+    # Feature and score distributions that served traffic is compared against
+    detector.fit_reference(test_features)
 
-    # 8. Save Model
-    detector.save_model(args.model_path)
+    # 8. Save Model (optionally with the compiled evaluator)
+    if args.compile:
+        detector.compile()
+    save_detector(args, detector, metrics)
 
     logger.info("Training pipeline completed successfully.")
 
+@traced('run_prediction')
 def run_prediction(args):
     """
     Executes the prediction pipeline.
     """
     logger.info("Starting prediction pipeline...")
 
-    if not os.path.exists(args.model_path):
-        logger.error("Model path %s does not exist. Train first.", args.model_path)
-        sys.exit(1)
-
     # Load model
     detector = FraudDetector()
-    detector.load_model(args.model_path)
+    detector.load_model(model_source(args))
 
     # For prediction, we usually expect a file or single inputs.
     # For this demo, we load data, process it, and run prediction on a sample
     
     logger.info("Loading data from %s for prediction simulation...", args.data)
-    data = load_data(args.data)
-    data = clean_data(data)
-    data = feature_engineering(data)
+    data = load_dataset(args)
 
     # Let's take a sample of 10 records
     sample = data.sample(10)
@@ -81,6 +200,146 @@ def run_prediction(args):
             index, pred, prob[1], true_val
         )
 
+@traced('run_scoring')
+def run_scoring(args):
+    """
+    Scores every transaction in --data and writes the results to --output.
+    """
+    from src.scoring import score_file # pylint: disable=import-outside-toplevel
+    logger.info("Starting batch scoring pipeline...")
+    model_path = model_source(args)
+    # Loaded once here; score_file reuses it for the threshold and serial scoring
+    detector = FraudDetector()
+    detector.load_model(model_path)
+
+    monitor = None
+    if args.monitor:
+        monitor = detector.start_monitoring()
+        # score_file updates the monitor per chunk; scoring must not count rows twice
+        detector.monitor = None
+
+    score_file(
+        model_path, args.data, args.output,
+        chunksize=args.chunksize or DEFAULT_CHUNKSIZE, workers=args.workers,
+        audit=args.audit_decisions, monitor=monitor, shared=args.shared_features,
+        scratch_dir=args.scratch_dir, detector=detector
+    )
+    if monitor is not None:
+        write_drift_report(monitor.report(), args.drift_report)
+
+@traced('run_update')
+def run_update(args):
+    """
+    Extends the model at --model_path (or the current --registry version)
+    with the rows of --data (the new window) instead of retraining it, then
+    evaluates it on a held-out split of the window and saves it back to
+    --model_path (or registers it as a new version).
+    """
+    # pylint: disable=import-outside-toplevel
+    from sklearn.model_selection import train_test_split
+    from src.evaluation import evaluate_model
+    model_path = model_source(args)
+    logger.info("Starting incremental update...")
+    detector = FraudDetector()
+    detector.load_model(model_path)
+    data = load_dataset(args)
+
+    # Same stratified split as prepare_data, without refitting the scaler
+    features = data.drop(columns=['isFraud'])
+    train_features, test_features, train_labels, test_labels = train_test_split(
+        features, data['isFraud'], test_size=0.2, stratify=data['isFraud'], random_state=42
+    )
+    del data, features
+    detector.update(train_features, train_labels, n_estimators=args.update_trees or None,
+                    max_tree_age=args.max_tree_age or None)
+
+    test_features = detector.scaler.transform(test_features[detector.feature_names])
+    with span('evaluate', rows_in=len(test_labels)):
+        metrics = evaluate_model(
+            detector.model, test_features, test_labels, threshold=detector.threshold,
+            plots=not args.no_plots, costs={'fp': args.cost_fp, 'fn': args.cost_fn}
+        )
+    if args.tune_threshold:
+        detector.threshold = metrics['operating_point']['threshold']
+        logger.info("Storing operating point threshold %.6f with the model.", detector.threshold)
+    # The drift reference follows the most recent window
+    detector.fit_reference(test_features)
+    if args.compile and detector.compiled is None:
+        detector.compile()
+    save_detector(args, detector, metrics)
+    logger.info("Incremental update completed successfully.")
+
+@traced('run_validation')
+def run_validation(args):
+    """
+    Walk-forward validates --model_type over time-ordered folds of --data.
+    """
+    from src.validation import walk_forward # pylint: disable=import-outside-toplevel
+    logger.info("Starting walk-forward validation...")
+    data = load_dataset(args)
+    walk_forward(
+        data, [{'model_type': args.model_type}], n_folds=args.folds,
+        train_window=args.train_window or None, gap=args.gap, workers=args.workers,
+        cache_dir=args.cache_dir, costs={'fp': args.cost_fp, 'fn': args.cost_fn}
+    )
+
+@traced('run_tuning')
+def run_tuning(args):
+    """
+    Searches --model_type parameters by successive halving on walk-forward
+    folds of --data, then trains the winner on the whole dataset and saves
+    it to --model_path like train mode.
+    """
+    from src.tuning import successive_halving # pylint: disable=import-outside-toplevel
+    logger.info("Starting hyperparameter search...")
+    data = load_dataset(args)
+    report = successive_halving(
+        data, args.model_type, n_trials=args.tune_trials, eta=args.tune_eta,
+        n_folds=args.folds, train_window=args.train_window or None,
+        cpu_budget=args.cpu_budget, trial_jobs=args.trial_jobs,
+        journal_path=args.tune_journal, cache_dir=args.cache_dir,
+        costs={'fp': args.cost_fp, 'fn': args.cost_fn}
+    )
+    run_training(args, data=data, params=report['best']['params'])
+
+def run_server(args):
+    """
+    Serves the model over local HTTP (or a Unix socket) with micro-batching.
+    """
+    from src.server import serve # pylint: disable=import-outside-toplevel
+    detector = FraudDetector()
+    detector.load_model(model_source(args))
+    if args.monitor:
+        detector.start_monitoring()
+    registry = ModelRegistry(args.registry) if args.registry else None
+    serve(
+        detector, host=args.host, port=args.port, unix_socket=args.socket,
+        max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, max_queue=args.max_queue,
+        audit=args.audit_decisions, registry=registry,
+        version=(args.model_version or registry.current()) if registry else None,
+        watch_interval=args.watch_registry or None,
+        swap_options={'shadow_rows': args.shadow_rows,
+                      'max_disagreement': args.max_disagreement}
+    )
+
+def run_replay(args):
+    """
+    Replays --data in step order through the online scoring path (server
+    request handling, micro-batching, score_many and the audit log) and
+    reports latency histograms, throughput over time and backpressure.
+    """
+    from src.replay import replay # pylint: disable=import-outside-toplevel
+    detector = FraudDetector()
+    detector.load_model(model_source(args))
+    if args.monitor:
+        detector.start_monitoring()
+    replay(
+        detector, args.data, report_path=args.replay_report, speed=args.replay_speed,
+        in_flight=args.replay_in_flight, interval=args.replay_interval,
+        max_rows=args.replay_rows or None, chunksize=args.chunksize or DEFAULT_CHUNKSIZE,
+        max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, max_queue=args.max_queue
+    )
+
 def main():
     """
     Main entry point.
@@ -91,8 +350,14 @@ def main():
         help='Path to dataset'
     )
     parser.add_argument(
-        '--mode', type=str, choices=['train', 'predict'], default='train',
-        help='Mode: train or predict'
+        '--mode', type=str,
+        choices=['train', 'predict', 'score', 'serve', 'validate', 'tune', 'update', 'replay'],
+        default='train',
+        help='Mode: train, predict, score (score every row of --data), serve (HTTP server), '
+             'validate (walk-forward validation by step), tune (hyperparameter search, '
+             'then train mode with the winner), update (extend --model_path with the '
+             'new rows in --data) or replay (load test the online path with --data in '
+             'step order)'
     )
     parser.add_argument(
         '--model_type', type=str, choices=['rf', 'xgb'], default='rf',
@@ -100,16 +365,266 @@ def main():
     )
     parser.add_argument(
         '--model_path', type=str, default='models/fraud_model.pkl',
-        help='Path to save/load model'
+        help='Path to save/load model (.pkl/.joblib pickle, '
+             'otherwise a memory-mapped artifact directory)'
+    )
+    parser.add_argument(
+        '--registry', type=str, nargs='?', const=DEFAULT_REGISTRY, default=None,
+        help='Use a model registry directory instead of --model_path: train/tune/update '
+             'modes register and promote a new version, the others load --model_version '
+             f'(default: {DEFAULT_REGISTRY})'
+    )
+    parser.add_argument(
+        '--model_version', type=str, default=None,
+        help='Registry version to load, e.g. v0003 (default: the current one)'
+    )
+    parser.add_argument(
+        '--compile', action='store_true',
+        help='Train/update modes: store a compiled evaluator (scaler folded into the trees) '
+             'with the model'
+    )
+    parser.add_argument(
+        '--cascade', action='store_true',
+        help='Train mode: learn a rule/first-stage pre-filter that skips rows that cannot be fraud'
+    )
+    parser.add_argument(
+        '--lean', action='store_true',
+        help='Train mode: split and scale into float32 arrays without intermediate copies'
+    )
+    parser.add_argument(
+        '--no_scaling', action='store_true',
+        help='Lean train mode: skip feature scaling (tree models do not need it)'
+    )
+    parser.add_argument(
+        '--out_of_core', action='store_true',
+        help='Train mode: stream and spill the data instead of loading it (bypasses the cache)'
+    )
+    parser.add_argument(
+        '--max_train_rows', type=int, default=2_000_000,
+        help='Out-of-core mode: uniform sample size for random forests and for evaluation'
+    )
+    parser.add_argument(
+        '--folds', type=int, default=4,
+        help='Validate/tune modes: number of walk-forward folds'
+    )
+    parser.add_argument(
+        '--train_window', type=int, default=0,
+        help='Validate/tune modes: steps of history each fold trains on (0: all earlier steps)'
+    )
+    parser.add_argument(
+        '--gap', type=int, default=0,
+        help='Validate mode: steps left out between each training and validation window'
+    )
+    parser.add_argument(
+        '--tune_trials', type=int, default=27,
+        help='Tune mode: parameter sets drawn for the first successive halving rung'
+    )
+    parser.add_argument(
+        '--tune_eta', type=int, default=3,
+        help='Tune mode: each rung keeps 1/eta of the trials and trains on eta times more rows'
+    )
+    parser.add_argument(
+        '--cpu_budget', type=int, default=None,
+        help='Tune mode: cores shared by all trials (default: every core)'
+    )
+    parser.add_argument(
+        '--trial_jobs', type=int, default=1,
+        help='Tune mode: threads per trial; cpu_budget // trial_jobs trials run at once'
+    )
+    parser.add_argument(
+        '--tune_journal', type=str, default='reports/tune_journal.jsonl',
+        help='Tune mode: journal of finished trials; rerunning the same search resumes it'
+    )
+    parser.add_argument(
+        '--update_trees', type=int, default=0,
+        help='Update mode: random forest trees or XGBoost rounds to add '
+             '(0: 20 trees or 50 rounds)'
+    )
+    parser.add_argument(
+        '--max_tree_age', type=int, default=0,
+        help='Update mode: retire random forest trees whose training data ended more than '
+             'this many steps before the newest row (0: keep every tree)'
+    )
+    parser.add_argument(
+        '--negative_rate', type=str, default=None,
+        help="Out-of-core mode: keep training negatives at this rate, e.g. '0.1' or "
+             "'0.02,TRANSFER=1,CASH_OUT=0.5' per type; probabilities are corrected for it"
+    )
+    parser.add_argument(
+        '--cost_fp', type=float, default=1.0,
+        help='Train mode: cost of flagging a legitimate transaction, for the operating point'
+    )
+    parser.add_argument(
+        '--cost_fn', type=float, default=100.0,
+        help='Train mode: cost of missing a fraudulent transaction, for the operating point'
+    )
+    parser.add_argument(
+        '--tune_threshold', action='store_true',
+        help='Train/update modes: store the cost-optimal threshold with the model; predict, score '
+             'and serve label with it instead of 0.5'
+    )
+    parser.add_argument(
+        '--no_plots', action='store_true',
+        help='Train mode: skip the confusion matrix and ROC curve images'
+    )
+    parser.add_argument(
+        '--audit_decisions', action='store_true',
+        help='Score/serve modes: record every scoring decision in the audit log (replay mode '
+             'always does)'
+    )
+    parser.add_argument(
+        '--audit_policy', type=str, choices=AUDIT_POLICIES, default='block',
+        help='When the audit queue is full: block until there is room (no decision is lost) '
+             'or drop entries (counted in WARNING entries)'
+    )
+    parser.add_argument(
+        '--audit_queue', type=int, default=DEFAULT_AUDIT_QUEUE,
+        help='Maximum audit entries (decision batches or log records) waiting to be written'
+    )
+    parser.add_argument(
+        '--monitor', action='store_true',
+        help='Score/serve/replay modes: track feature and score drift against the training '
+             'reference (serve mode reports it at GET /drift)'
+    )
+    parser.add_argument(
+        '--drift_report', type=str, default='reports/drift_report.json',
+        help='Score mode with --monitor: where to write the drift report'
+    )
+    parser.add_argument(
+        '--profile', type=str, nargs='+', default=None, metavar='STAGE',
+        help="Profile these stages (e.g. train prepare_data, or 'all'); "
+             "results go to reports/profiles"
+    )
+    parser.add_argument(
+        '--profile_mode', type=str, choices=PROFILE_MODES, default='cprofile',
+        help='Profiler for --profile: cprofile (CPU) or tracemalloc (allocations)'
+    )
+    parser.add_argument(
+        '--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+        help='Rows per chunk when parsing the CSV (0 reads the whole file at once)'
+    )
+    parser.add_argument(
+        '--cache_dir', type=str, default='cache',
+        help='Directory of the featurized dataset cache'
+    )
+    parser.add_argument(
+        '--no_cache', action='store_true',
+        help='Bypass the dataset cache'
+    )
+    parser.add_argument(
+        '--rebuild_cache', action='store_true',
+        help='Invalidate and rebuild the cache entry for --data'
+    )
+    parser.add_argument(
+        '--output', type=str, default='reports/scores.csv',
+        help='Output of score mode (.csv or .parquet)'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='Worker processes for score and validate modes (and train mode with '
+             '--shared_features)'
+    )
+    parser.add_argument(
+        '--shared_features', action='store_true',
+        help='Train/score modes: featurize the whole file across --workers processes into '
+             'one shared memory-mapped matrix that training and scoring use in place'
+    )
+    parser.add_argument(
+        '--scratch_dir', type=str, default=None,
+        help='Directory for the --shared_features matrix (default: /dev/shm when it has '
+             'room, else the system temporary directory)'
+    )
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Serve mode bind address')
+    parser.add_argument('--port', type=int, default=8080, help='Serve mode port')
+    parser.add_argument(
+        '--socket', type=str, default=None,
+        help='Serve mode Unix socket path (instead of host/port)'
+    )
+    parser.add_argument(
+        '--max_batch', type=int, default=256,
+        help='Serve/replay modes: maximum transactions per micro-batch'
+    )
+    parser.add_argument(
+        '--max_wait_ms', type=float, default=2.0,
+        help='Serve/replay modes: maximum time to wait for a micro-batch to fill'
+    )
+    parser.add_argument(
+        '--max_queue', type=int, default=1024,
+        help='Serve/replay modes: queued requests beyond this are shed with 503'
+    )
+    parser.add_argument(
+        '--replay_speed', type=float, default=0,
+        help='Replay mode: simulated time multiplier, e.g. 3600 plays one step (an hour) '
+             'per second (0: as fast as the stack scores)'
+    )
+    parser.add_argument(
+        '--replay_in_flight', type=int, default=1024,
+        help='Replay mode: maximum transactions awaiting a score; at maximum speed this '
+             'many are kept outstanding'
+    )
+    parser.add_argument(
+        '--replay_rows', type=int, default=0,
+        help='Replay mode: stop after this many transactions (0: the whole file)'
+    )
+    parser.add_argument(
+        '--replay_interval', type=float, default=1.0,
+        help='Replay mode: seconds per throughput/latency window in the report'
+    )
+    parser.add_argument(
+        '--replay_report', type=str, default='reports/replay.json',
+        help='Replay mode: report path; the latency histogram goes next to it (.hgrm)'
+    )
+    parser.add_argument(
+        '--watch_registry', type=float, default=0,
+        help='Serve mode with --registry: check the current version every this many seconds '
+             'and hot swap to it (0: only swap on POST /model)'
+    )
+    parser.add_argument(
+        '--shadow_rows', type=int, default=2000,
+        help='Serve mode: live rows a new model scores in shadow before it is swapped in'
+    )
+    parser.add_argument(
+        '--max_disagreement', type=float, default=None,
+        help='Serve mode: reject a new model whose labels disagree with the serving model '
+             'on more than this fraction of shadow rows'
     )
 
     args = parser.parse_args()
+    if args.cascade and args.out_of_core:
+        parser.error("--cascade is learned from the in-memory training split")
+    if args.tune_threshold and args.negative_rate:
+        # Evaluation scores the bare model, before the sampling correction
+        parser.error("--tune_threshold cannot be combined with --negative_rate")
+    if args.shared_features and args.out_of_core:
+        parser.error("--shared_features holds the featurized file in memory; "
+                     "--out_of_core streams it")
+    if args.mode in ('tune', 'update') and args.out_of_core:
+        parser.error(f"{args.mode} mode works on the in-memory dataset")
+    if (args.model_version or args.watch_registry) and not args.registry:
+        parser.error("--model_version and --watch_registry require --registry")
+    if args.negative_rate and not args.out_of_core:
+        parser.error("--negative_rate downsamples while streaming and requires --out_of_core")
+    setup_logging(policy=args.audit_policy, max_queue=args.audit_queue)
+    if args.profile:
+        enable_profiling(args.profile, mode=args.profile_mode)
 
     try:
         if args.mode == 'train':
             run_training(args)
         elif args.mode == 'predict':
             run_prediction(args)
+        elif args.mode == 'score':
+            run_scoring(args)
+        elif args.mode == 'serve':
+            run_server(args)
+        elif args.mode == 'validate':
+            run_validation(args)
+        elif args.mode == 'tune':
+            run_tuning(args)
+        elif args.mode == 'update':
+            run_update(args)
+        elif args.mode == 'replay':
+            run_replay(args)
 
     except Exception as exc: # pylint: disable=broad-except
         logger.error("An error occurred: %s", exc)
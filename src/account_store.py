@@ -0,0 +1,297 @@
+"""
+Per-account behavioural (velocity) features for nameOrig/nameDest.
+
+Account IDs are interned to int64 keys and mapped to rows of fixed-size
+NumPy ring buffers holding each account's most recent (step, amount) events,
+so the store costs a few dozen bytes per account instead of a Python object
+per account. Features can be computed in batch over the full history
+(vectorized) or incrementally per transaction at scoring time; both give
+the same values for time-ordered input.
+"""
+import hashlib
+import re
+import numpy as np
+import pandas as pd
+from src.utils import logger
+
+ACCOUNT_FEATURES = [
+    'orig_txn_count', 'orig_amount_sum', 'dest_txn_count', 'dest_amount_sum',
+    'dest_steps_since_first_seen'
+]
+
+SNAPSHOT_VERSION = 1
+
+_DIGITS_SHIFT = 40
+
+# IDs interned exactly: an ASCII character followed by up to 12 ASCII digits
+# without a leading zero, so that distinct IDs never share a number
+# ('C1' and 'C01', or 'C123' and the same number in another script's digits)
+_EXACT_ID = re.compile(r'[\x00-\x7f](?:[1-9][0-9]{0,11}|0)')
+
+def account_key(name):
+    """
+    Interns an account ID such as 'C1231006815' to an int64 key.
+
+    PaySim IDs (see _EXACT_ID) map exactly; other IDs fall back to a 63-bit
+    hash stored as a negative key.
+    """
+    if _EXACT_ID.fullmatch(name):
+        return (ord(name[0]) << _DIGITS_SHIFT) | int(name[1:])
+    digest = hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest()
+    return -1 - (int.from_bytes(digest, 'little') >> 1)
+
+def account_keys(names):
+    """Vectorized account_key over an array-like of IDs (same keys, same rule)."""
+    names = pd.Series(np.asarray(names, dtype=object))
+    numeric = names.str.fullmatch(_EXACT_ID, na=False).to_numpy(dtype=bool)
+
+    keys = np.empty(len(names), dtype=np.int64)
+    prefix = names[numeric].str[0].map(ord).to_numpy(dtype=np.int64)
+    keys[numeric] = (prefix << _DIGITS_SHIFT) | names[numeric].str[1:].astype(np.int64).to_numpy()
+    keys[~numeric] = [account_key(name) for name in names[~numeric]]
+    return keys
+
+class _RingTable:
+    """
+    Interned account keys mapped to ring buffers of their last ``history`` events.
+
+    Keys loaded in bulk live in a sorted array; accounts first seen
+    incrementally go to an overflow dict until the next snapshot. A lookup
+    is therefore a binary search, O(log n) rather than O(1): about 23 probes
+    at PaySim's 9M accounts, traded for 8 bytes per key where a dict or a
+    NumPy hash index would need several times that.
+    """
+    def __init__(self, history, capacity=1024):
+        self.history = history
+        self.base_keys = np.empty(0, dtype=np.int64)
+        self.overflow = {}
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.steps = np.zeros((capacity, self.history), dtype=np.int32)
+        self.amounts = np.zeros((capacity, self.history), dtype=np.float32)
+        self.events = np.zeros(capacity, dtype=np.int32)
+        self.first_step = np.full(capacity, -1, dtype=np.int32)
+
+    def _grow(self):
+        capacity = max(1024, int(len(self.events) * 1.5))
+        old = (self.steps, self.amounts, self.events, self.first_step)
+        self._allocate(capacity)
+        for new, prev in zip((self.steps, self.amounts, self.events, self.first_step), old):
+            new[:len(prev)] = prev
+
+    @property
+    def nbytes(self):
+        """Bytes used by the arrays backing this table."""
+        return (self.base_keys.nbytes + self.steps.nbytes + self.amounts.nbytes
+                + self.events.nbytes + self.first_step.nbytes)
+
+    def slot(self, key, create=False):
+        """Returns the slot of ``key`` (-1 if unknown and ``create`` is False)."""
+        i = int(self.base_keys.searchsorted(key))
+        if i < len(self.base_keys) and self.base_keys[i] == key:
+            return i
+        found = self.overflow.get(key, -1)
+        if found >= 0 or not create:
+            return found
+        if self.size == len(self.events):
+            self._grow()
+        self.overflow[key] = self.size
+        self.size += 1
+        return self.size - 1
+
+    def window(self, slot, step, window_steps):
+        """Returns (count, amount sum) of events with step > ``step - window_steps``."""
+        if slot < 0:
+            return 0, 0.0
+        filled = min(int(self.events[slot]), self.history)
+        cutoff = step - window_steps
+        count, total = 0, 0.0
+        # Plain Python over a handful of entries beats NumPy's per-call overhead
+        for event_step, amount in zip(self.steps[slot, :filled].tolist(),
+                                      self.amounts[slot, :filled].tolist()):
+            if event_step > cutoff:
+                count += 1
+                total += amount
+        return count, total
+
+    def push(self, slot, step, amount):
+        """Appends an event to the ring of ``slot``."""
+        i = self.events[slot] % self.history
+        self.steps[slot, i] = step
+        self.amounts[slot, i] = amount
+        self.events[slot] += 1
+        if self.first_step[slot] < 0:
+            self.first_step[slot] = step
+
+    def bulk(self, keys, steps, amounts, window_steps):
+        """
+        Resets the table to the given event history and returns, per event, the
+        (count, amount sum, first step) computed from the events before it.
+        """
+        n = len(keys)
+        uniq, inverse = np.unique(keys, return_inverse=True)
+
+        # Group by account, then by step, keeping file order for ties
+        order = np.lexsort((np.arange(n), steps, inverse))
+        group = inverse[order]
+        step = steps[order].astype(np.int64)
+        pos = np.arange(n)
+        group_start = np.searchsorted(group, np.arange(len(uniq)))[group]
+
+        span = int(step.max() - step.min()) + window_steps + 2 if n else 1
+        composite = group.astype(np.int64) * span + (step - step.min() if n else step)
+        low = np.searchsorted(composite, composite - window_steps, side='right')
+        low = np.maximum(np.maximum(low, group_start), pos - self.history)
+
+        cumulative = np.concatenate(([0.0], np.cumsum(amounts[order], dtype=np.float64)))
+        counts = np.empty(n, dtype=np.float32)
+        sums = np.empty(n, dtype=np.float32)
+        firsts = np.empty(n, dtype=np.int64)
+        counts[order] = pos - low
+        sums[order] = cumulative[pos] - cumulative[low]
+        firsts[order] = np.where(pos > group_start, step[group_start], -1)
+
+        # Leave the rings holding each account's last ``history`` events
+        self.base_keys = uniq
+        self.overflow = {}
+        self.size = len(uniq)
+        self._allocate(max(self.size, 1))
+        rank = pos - group_start
+        sizes = np.bincount(group, minlength=len(uniq))
+        keep = rank >= sizes[group] - self.history
+        self.steps[group[keep], rank[keep] % self.history] = step[keep]
+        self.amounts[group[keep], rank[keep] % self.history] = amounts[order][keep]
+        self.events[:self.size] = sizes
+        self.first_step[:self.size] = step[np.searchsorted(group, np.arange(len(uniq)))]
+        return counts, sums, firsts
+
+    def arrays(self):
+        """Returns the table as key-sorted arrays for snapshotting."""
+        keys = np.empty(self.size, dtype=np.int64)
+        keys[:len(self.base_keys)] = self.base_keys
+        for key, slot in self.overflow.items():
+            keys[slot] = key
+        order = np.argsort(keys, kind='stable')
+        return {
+            'keys': keys[order],
+            'steps': self.steps[order],
+            'amounts': self.amounts[order],
+            'events': self.events[order],
+            'first_step': self.first_step[order]
+        }
+
+    def restore(self, arrays):
+        """Restores the table from ``arrays()`` output."""
+        self.base_keys = arrays['keys']
+        self.overflow = {}
+        self.size = len(self.base_keys)
+        self.history = arrays['steps'].shape[1]
+        self.steps = arrays['steps']
+        self.amounts = arrays['amounts']
+        self.events = arrays['events']
+        self.first_step = arrays['first_step']
+
+class AccountFeatureStore:
+    """
+    Velocity features over trailing windows of ``step``.
+
+    For each transaction the store reports, from the events *before* it:
+      - orig_txn_count / orig_amount_sum: transactions sent by nameOrig
+        within the last ``window_steps`` steps
+      - dest_txn_count / dest_amount_sum: the same for nameDest as receiver
+      - dest_steps_since_first_seen: steps since nameDest was first seen as a
+        destination (-1 if never)
+
+    Only the last ``history`` events per account are kept, so window counts
+    saturate at ``history``. Updates are O(history) = O(1) per event.
+    """
+    def __init__(self, window_steps=24, history=8):
+        self.window_steps = window_steps
+        self.history = history
+        self.orig = _RingTable(history)
+        self.dest = _RingTable(history)
+
+    @property
+    def num_accounts(self):
+        """Number of interned (account, role) entries."""
+        return self.orig.size + self.dest.size
+
+    @property
+    def nbytes(self):
+        """Bytes used by the arrays backing the store."""
+        return self.orig.nbytes + self.dest.nbytes
+
+    def fit_transform(self, data):
+        """
+        Computes ACCOUNT_FEATURES for every row of ``data`` over the full
+        history and leaves the store ready for incremental updates.
+
+        ``data`` needs nameOrig, nameDest, step and amount columns and is
+        assumed to be in time order.
+        """
+        logger.info("Building account feature store from %s transactions...", len(data))
+        steps = data['step'].to_numpy(dtype=np.int32)
+        amounts = data['amount'].to_numpy(dtype=np.float32)
+
+        orig_counts, orig_sums, _ = self.orig.bulk(
+            account_keys(data['nameOrig']), steps, amounts, self.window_steps
+        )
+        dest_counts, dest_sums, dest_first = self.dest.bulk(
+            account_keys(data['nameDest']), steps, amounts, self.window_steps
+        )
+        since = np.where(dest_first >= 0, steps - dest_first, -1)
+
+        logger.info("Account feature store built. Accounts: %s, Memory: %.1f MB",
+                    self.num_accounts, self.nbytes / 2**20)
+        return pd.DataFrame({
+            'orig_txn_count': orig_counts,
+            'orig_amount_sum': orig_sums,
+            'dest_txn_count': dest_counts,
+            'dest_amount_sum': dest_sums,
+            'dest_steps_since_first_seen': since.astype(np.float32)
+        }, index=data.index)
+
+    def update(self, name_orig, name_dest, step, amount):
+        """
+        Returns ACCOUNT_FEATURES for one transaction (from prior events) and
+        then records it.
+        """
+        orig_slot = self.orig.slot(account_key(name_orig), create=True)
+        dest_slot = self.dest.slot(account_key(name_dest), create=True)
+        orig_count, orig_sum = self.orig.window(orig_slot, step, self.window_steps)
+        dest_count, dest_sum = self.dest.window(dest_slot, step, self.window_steps)
+        first = self.dest.first_step[dest_slot]
+        features = np.array([
+            orig_count, orig_sum, dest_count, dest_sum, step - first if first >= 0 else -1
+        ], dtype=np.float32)
+
+        self.orig.push(orig_slot, step, amount)
+        self.dest.push(dest_slot, step, amount)
+        return features
+
+    def save(self, filepath):
+        """Snapshots the store to an ``.npz`` file."""
+        arrays = {'meta': np.array([SNAPSHOT_VERSION, self.window_steps, self.history])}
+        for role, table in (('orig', self.orig), ('dest', self.dest)):
+            arrays.update({f"{role}_{k}": v for k, v in table.arrays().items()})
+        with open(filepath, 'wb') as f:
+            np.savez(f, **arrays)
+        logger.info("Account feature store saved to %s", filepath)
+
+    @classmethod
+    def load(cls, filepath):
+        """Restores a store written by ``save``."""
+        with np.load(filepath) as snapshot:
+            version, window_steps, history = (int(v) for v in snapshot['meta'])
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported account store snapshot version: {version}")
+            store = cls(window_steps=window_steps, history=history)
+            for role, table in (('orig', store.orig), ('dest', store.dest)):
+                prefix = f"{role}_"
+                table.restore({
+                    k[len(prefix):]: snapshot[k] for k in snapshot.files if k.startswith(prefix)
+                })
+        logger.info("Account feature store loaded from %s", filepath)
+        return store
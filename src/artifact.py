@@ -0,0 +1,137 @@
+"""
+Directory model artifacts with memory-mapped arrays.
+
+An artifact directory holds a small ``manifest.json`` (schema version,
+model type, feature names, scaler parameters, and the negative sampling
+rates, cascade definition, drift reference and refresh history if any),
+one ``.npy`` file per array of the compiled evaluator and the fitted
+estimator pickled separately.
+Arrays are memory-mapped on load, so processes on the same host share their
+pages and start without deserializing any trees; the estimator pickle is
+only read when something needs the original model.
+"""
+import json
+import os
+import shutil
+import joblib
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from src.compiled import CompiledEnsemble
+from src.features import FEATURE_VERSION
+from src.utils import logger
+
+ARTIFACT_VERSION = 1
+
+MANIFEST = 'manifest.json'
+ESTIMATOR = 'estimator.joblib'
+
+COMPILED_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+_SCALER_ARRAYS = ['mean_', 'scale_', 'var_']
+
+def is_artifact_dir(path):
+    """True for paths that use the directory format rather than a joblib pickle."""
+    return not path.endswith(('.pkl', '.joblib'))
+
+def _scaler_state(scaler):
+    state = {name: getattr(scaler, name, None) for name in _SCALER_ARRAYS}
+    state = {name: None if value is None else np.asarray(value).tolist()
+             for name, value in state.items()}
+    state['n_samples_seen_'] = int(np.max(getattr(scaler, 'n_samples_seen_', 0)))
+    state['params'] = scaler.get_params()
+    return state
+
+def _restore_scaler(state, feature_names):
+    scaler = StandardScaler(**state['params'])
+    for name in _SCALER_ARRAYS:
+        if state[name] is not None:
+            setattr(scaler, name, np.asarray(state[name], dtype=np.float64))
+    # A NumPy integer, as fit leaves it (partial_fit relies on it)
+    scaler.n_samples_seen_ = np.int64(state['n_samples_seen_'])
+    if state['mean_'] is not None or state['scale_'] is not None:
+        scaler.n_features_in_ = len(state['mean_'] or state['scale_'])
+    if feature_names is not None:
+        scaler.feature_names_in_ = np.asarray(feature_names, dtype=object)
+    return scaler
+
+def write_artifact(path, model, scaler, model_type, feature_names, compiled, sampling=None,
+                   cascade=None, threshold=None, reference=None, refresh=None):
+    """
+    Writes a model artifact directory at ``path``, replacing any existing one.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(parent):
+        os.makedirs(parent)
+
+    # Write into a temporary directory and rename so readers never see a
+    # partially written artifact.
+    tmp_dir = f"{path.rstrip(os.sep)}.tmp{os.getpid()}"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    state = compiled.to_dict()
+    for name in COMPILED_ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), state[name])
+    joblib.dump(model, os.path.join(tmp_dir, ESTIMATOR))
+
+    manifest = {
+        'schema_version': ARTIFACT_VERSION,
+        'feature_version': FEATURE_VERSION,
+        'model_type': model_type,
+        'feature_names': feature_names,
+        'scaler': _scaler_state(scaler),
+        'compiled': {name: state[name] for name in ('n_features', 'kind', 'base_margin')},
+        'sampling': sampling,
+        'cascade': cascade,
+        'threshold': threshold,
+        'reference': reference,
+        'refresh': refresh,
+        'arrays': COMPILED_ARRAYS,
+        'estimator': ESTIMATOR
+    }
+    with open(os.path.join(tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_dir, path)
+
+def read_manifest(path):
+    """The manifest of an artifact directory, without loading any array or estimator."""
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+def read_artifact(path):
+    """
+    Reads a model artifact directory. Returns the same payload keys as the
+    joblib format, except that 'model' is replaced by 'model_path', the
+    estimator pickle to load when the fitted model is needed.
+    """
+    manifest = read_manifest(path)
+    version = manifest.get('schema_version')
+    if version != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact schema version {version} in {path} "
+            f"(expected {ARTIFACT_VERSION})"
+        )
+    if manifest.get('feature_version') != FEATURE_VERSION:
+        logger.warning("Artifact %s was built with feature version %s (current: %s).",
+                       path, manifest.get('feature_version'), FEATURE_VERSION)
+
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        for name in manifest['arrays']
+    }
+    return {
+        'model_path': os.path.join(path, manifest['estimator']),
+        'scaler': _restore_scaler(manifest['scaler'], manifest['feature_names']),
+        'type': manifest['model_type'],
+        'feature_names': manifest['feature_names'],
+        'sampling': manifest.get('sampling'),
+        'cascade': manifest.get('cascade'),
+        'threshold': manifest.get('threshold'),
+        'reference': manifest.get('reference'),
+        'refresh': manifest.get('refresh'),
+        'compiled': CompiledEnsemble(**arrays, **manifest['compiled'])
+    }
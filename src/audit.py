@@ -0,0 +1,354 @@
+"""
+Asynchronous, batched audit log.
+
+Callers only enqueue: log records (through AsyncAuditHandler) and scoring
+decisions (through audit_decisions) go onto a bounded queue, and a single
+background thread serializes them to JSON lines and writes them in batches,
+flushing at most every ``flush_interval`` seconds. When the queue is full
+the ``policy`` decides: 'block' (the default, so no decision goes
+unrecorded) waits for room, 'drop' discards the item and counts it; the
+count is written to the audit file and stderr as a WARNING entry at the
+next flush.
+
+Files are named ``audit_<timestamp>.json`` in the log directory and rotate
+to a new file once they reach ``max_bytes`` or are ``rotate_seconds`` old.
+
+A process forked while a writer runs (the multiprocessing pools of score,
+validate, tune and shared featurization) inherits the queue but not the
+thread. In the child the writer switches to writing each item
+synchronously to a file of its own (``audit_<timestamp>_pid<pid>.json``),
+so worker records reach disk even when the pool terminates its workers.
+
+Scoring decisions are enqueued per batch as a DecisionBatch and written as
+one compact line per decision::
+
+    {"ts":1700000000.123456,"event":"decision","source":"score","id":42,"p":0.012345,"label":0}
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+DEFAULT_ROTATE_SECONDS = 24 * 3600
+DEFAULT_MAX_QUEUE = 10_000
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_FLUSH_INTERVAL = 0.5
+# Writer thread sleep when the queue is empty
+DEFAULT_LINGER = 0.01
+POLICIES = ('block', 'drop')
+
+_STOP = object()
+
+# Writer that audit_decisions enqueues to, set by start_writer
+_ACTIVE = {'writer': None}
+
+# Every open writer, reset in forked children
+_WRITERS = weakref.WeakSet()
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as single-line JSON audit entries."""
+    def format(self, record):
+        log_record = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno
+        }
+        # Structured fields of src.profiling spans
+        if hasattr(record, 'span'):
+            log_record["span"] = record.span
+        if record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_record["exception"] = record.exc_text
+        return json.dumps(log_record)
+
+class DecisionBatch:
+    """Scoring decisions of one batch, serialized in the writer thread."""
+    __slots__ = ('timestamp', 'source', 'ids', 'probabilities', 'labels')
+
+    def __init__(self, source, ids, probabilities, labels):
+        self.timestamp = time.time()
+        self.source = source
+        self.ids = ids
+        self.probabilities = probabilities
+        self.labels = labels
+
+    def lines(self):
+        """One compact JSON line per decision."""
+        head = f'{{"ts":{self.timestamp:.6f},"event":"decision","source":"{self.source}","id":'
+        ids = range(len(self.probabilities)) if self.ids is None else _tolist(self.ids)
+        if not all(isinstance(i, int) for i in ids):
+            ids = [i if isinstance(i, int) else json.dumps(i) for i in ids]
+        # %-formatting of (id, probability, label) tuples is the fastest pure
+        # Python route; %s keeps integer ids and the JSON of any other id.
+        template = head + '%s,"p":%.6f,"label":%d}\n'
+        return ''.join(map(template.__mod__, zip(ids, _tolist(self.probabilities),
+                                                  _tolist(self.labels))))
+
+def _tolist(values):
+    """Arrays as lists of Python scalars (much faster to format than NumPy scalars)."""
+    return values.tolist() if hasattr(values, 'tolist') else values
+
+class _Flush:
+    """Queue marker that is acknowledged once everything before it is on disk."""
+    __slots__ = ('done',)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+class AuditWriter:
+    """
+    Background thread writing queued log records and decision batches to
+    rotating JSON-lines files under ``log_dir``.
+    """
+    def __init__(self, log_dir='logs', max_bytes=DEFAULT_MAX_BYTES,
+                 rotate_seconds=DEFAULT_ROTATE_SECONDS, max_queue=DEFAULT_MAX_QUEUE,
+                 policy='block', batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, linger=DEFAULT_LINGER):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown audit queue policy {policy}; expected one of {POLICIES}")
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.policy = policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.linger = linger
+        self.formatter = JsonFormatter()
+        self.stats = {'records': 0, 'dropped': 0, 'batches': 0, 'files': 0}
+        self.path = None
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._opened = 0.0
+        # Characters written to the current file (its size: entries are ASCII
+        # JSON); tell() would flush the write buffer on every batch
+        self._written = 0
+        # Dropped entries already reported in a WARNING entry
+        self._reported_drops = 0
+        self._closed = False
+        # Set in forked children, which write synchronously under this lock
+        self._sync_lock = None
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        self._open()
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        _WRITERS.add(self)
+
+    def put(self, item):
+        """Enqueues a log record or DecisionBatch; returns False if it was dropped."""
+        if self._closed:
+            return False
+        if self._sync_lock is not None:
+            with self._sync_lock:
+                self._rotate_if_due()
+                self._write(self._format(item))
+                self._file.flush()
+                self.stats['batches'] += 1
+            return True
+        if self.policy == 'block':
+            self._queue.put(item)
+            return True
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def flush(self, timeout=None):
+        """Waits until everything enqueued so far is written and flushed."""
+        if self._closed or self._sync_lock is not None:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self):
+        """Writes out the queue, stops the thread and closes the file."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._sync_lock is not None:
+            with self._sync_lock:
+                self._file.close()
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _after_fork(self):
+        """
+        Runs in a forked child: drops the parent's queue, thread and file
+        buffer and switches to synchronous writes to a file of the child's.
+        """
+        if self._closed:
+            return
+        # The inherited buffer holds the parent's unwritten lines; send it
+        # to /dev/null instead of the shared file when it is closed
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            os.dup2(devnull, self._file.fileno())
+        finally:
+            os.close(devnull)
+        self._file.close()
+        # The queue's mutex may have been held by the writer thread at fork
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._thread = None
+        self._sync_lock = threading.Lock()
+        self.stats = {'records': 0, 'dropped': 0, 'batches': 0, 'files': 0}
+        self._open()
+
+    def _open(self):
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if self._sync_lock is not None:
+            stamp += f"_pid{os.getpid()}"
+        path = os.path.join(self.log_dir, f"audit_{stamp}.json")
+        suffix = 1
+        while True:
+            try:
+                # Exclusive create: concurrent processes never share a file
+                # pylint: disable=consider-using-with
+                self._file = open(path, 'x', encoding='utf-8', buffering=1 << 20)
+                break
+            except FileExistsError:
+                path = os.path.join(self.log_dir, f"audit_{stamp}_{suffix}.json")
+                suffix += 1
+        self._opened = time.monotonic()
+        self._written = 0
+        self.path = path
+        self.stats['files'] += 1
+
+    def _rotate_if_due(self):
+        if (self._written >= self.max_bytes or
+                (self.rotate_seconds and time.monotonic() - self._opened >= self.rotate_seconds)):
+            self._file.close()
+            self._open()
+
+    def _write(self, text):
+        self._file.write(text)
+        self._written += len(text)
+
+    def _report_drops(self):
+        """Writes a WARNING entry (also to stderr) with the entries dropped so far."""
+        if self.stats['dropped'] == self._reported_drops:
+            return
+        message = (f"Audit queue full: dropped {self.stats['dropped']} entries "
+                   f"({self.stats['dropped'] - self._reported_drops} since the last report)")
+        self._reported_drops = self.stats['dropped']
+        self._write(json.dumps({
+            "timestamp": datetime.now().isoformat(), "level": "WARNING",
+            "message": message, "audit": dict(self.stats)
+        }) + '\n')
+        print(f"WARNING - {message}", file=sys.stderr)
+
+    def _format(self, item):
+        if isinstance(item, DecisionBatch):
+            self.stats['records'] += len(item.probabilities)
+            return item.lines()
+        self.stats['records'] += 1
+        return self.formatter.format(item) + '\n'
+
+    def _run(self):
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            items = []
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not items:
+                # Poll rather than block on the queue: a blocked consumer is
+                # woken by every put, a thread switch per audited decision.
+                time.sleep(self.linger)
+
+            markers = []
+            text = []
+            for item in items:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    text.append(self._format(item))
+            if text:
+                self._rotate_if_due()
+                self._write(''.join(text))
+                self.stats['batches'] += 1
+
+            now = time.monotonic()
+            if markers or stopping or now - last_flush >= self.flush_interval:
+                self._report_drops()
+                self._file.flush()
+                last_flush = now
+            for marker in markers:
+                marker.done.set()
+
+        self._file.close()
+
+class AsyncAuditHandler(logging.Handler):
+    """Logging handler that hands records to an AuditWriter."""
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record):
+        # Resolve the message and traceback now: arguments may change and
+        # tracebacks pin frames once the caller moves on.
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = self.writer.formatter.formatException(record.exc_info)
+                record.exc_info = None
+            self.writer.put(record)
+        except Exception: # pylint: disable=broad-except
+            self.handleError(record)
+
+    def flush(self):
+        self.writer.flush()
+
+def _after_fork_in_child():
+    for writer in list(_WRITERS):
+        writer._after_fork() # pylint: disable=protected-access
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def start_writer(log_dir='logs', **options):
+    """
+    Starts the process-wide AuditWriter (see AuditWriter for ``options``);
+    it is closed, and its queue written out, at interpreter exit.
+    """
+    writer = AuditWriter(log_dir, **options)
+    _ACTIVE['writer'] = writer
+    atexit.register(writer.close)
+    return writer
+
+def active_writer():
+    """The AuditWriter started by start_writer, or None."""
+    return _ACTIVE['writer']
+
+def audit_decisions(source, ids, probabilities, labels):
+    """
+    Enqueues one audit event per scoring decision. ``ids`` may be None
+    (decisions are then numbered within the batch). The arrays are read by the
+    writer thread later and must not be modified afterwards. Returns False if
+    no writer is running or the batch was dropped.
+    """
+    writer = _ACTIVE['writer']
+    if writer is None:
+        return False
+    return writer.put(DecisionBatch(source, ids, probabilities, labels))
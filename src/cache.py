@@ -0,0 +1,196 @@
+"""
+Binary columnar cache for cleaned and featurized datasets.
+
+Each entry is a directory holding one ``.npy`` file per column plus a
+``manifest.json``. Columns are memory-mapped on load, so a cache hit builds
+the DataFrame without parsing or copying the data.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from src.features import FEATURE_VERSION
+from src.utils import logger
+
+CACHE_FORMAT_VERSION = 1
+
+MANIFEST = 'manifest.json'
+
+def file_fingerprint(filepath, block_size=1 << 20):
+    """
+    Returns the size, mtime and content hash of ``filepath``.
+    """
+    stat = os.stat(filepath)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+
+    return {
+        'path': os.path.abspath(filepath),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'content_hash': digest.hexdigest()
+    }
+
+class DatasetCache:
+    """
+    File-based cache of featurized frames keyed on the source file fingerprint
+    and ``FEATURE_VERSION``.
+
+    Entries are evicted least-recently-used first once there are more than
+    ``max_entries`` of them or their total size exceeds ``max_bytes``.
+    """
+    def __init__(self, cache_dir='cache', max_entries=3, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(fingerprint, feature_version=FEATURE_VERSION):
+        """Builds the cache key for a source fingerprint."""
+        raw = json.dumps([
+            CACHE_FORMAT_VERSION, feature_version, fingerprint['size'],
+            fingerprint['mtime_ns'], fingerprint['content_hash']
+        ])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def _entries(self):
+        """Yields (entry_dir, manifest) for every valid entry."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            manifest_path = os.path.join(entry_dir, MANIFEST)
+            if not os.path.isfile(manifest_path):
+                continue
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    yield entry_dir, json.load(f)
+            except (OSError, ValueError):
+                logger.warning("Ignoring unreadable cache entry %s", entry_dir)
+
+    def fingerprint(self, filepath, verify=False):
+        """
+        Fingerprints ``filepath``, reusing a content hash recorded in the cache
+        when size and mtime are unchanged (unless ``verify`` forces a rehash).
+        """
+        if not verify:
+            stat = os.stat(filepath)
+            path = os.path.abspath(filepath)
+            for _, manifest in self._entries():
+                source = manifest['source']
+                if (source['path'] == path and source['size'] == stat.st_size
+                        and source['mtime_ns'] == stat.st_mtime_ns):
+                    return source
+        return file_fingerprint(filepath)
+
+    def load(self, filepath, fingerprint=None):
+        """
+        Returns the cached frame for ``filepath`` or None on a miss.
+        """
+        fingerprint = fingerprint or self.fingerprint(filepath)
+        key = self.make_key(fingerprint)
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry_dir, MANIFEST)
+        if not os.path.isfile(manifest_path):
+            logger.info("Dataset cache miss for %s", filepath)
+            return None
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        columns = {
+            name: np.load(os.path.join(entry_dir, f"{i}.npy"), mmap_mode='r')
+            for i, name in enumerate(manifest['columns'])
+        }
+        data = pd.DataFrame(columns, columns=manifest['columns'], copy=False)
+
+        # Mark as recently used for LRU eviction
+        os.utime(entry_dir)
+        logger.info("Dataset cache hit for %s (%s rows)", filepath, manifest['rows'])
+        return data
+
+    def store(self, filepath, data, fingerprint=None):
+        """
+        Writes ``data`` to the cache as the entry for ``filepath``.
+        """
+        non_numeric = [c for c in data.columns if not (
+            pd.api.types.is_numeric_dtype(data[c]) or pd.api.types.is_bool_dtype(data[c])
+        )]
+        if non_numeric:
+            raise TypeError(f"Cannot cache non-numeric columns: {non_numeric}")
+
+        fingerprint = fingerprint or file_fingerprint(filepath)
+        key = self.make_key(fingerprint)
+        entry_dir = os.path.join(self.cache_dir, key)
+
+        # Write into a temporary directory and rename so readers never see a
+        # partially written entry.
+        tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+
+        for i, name in enumerate(data.columns):
+            column = np.ascontiguousarray(data[name].to_numpy())
+            np.save(os.path.join(tmp_dir, f"{i}.npy"), column)
+
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'feature_version': FEATURE_VERSION,
+            'source': fingerprint,
+            'columns': [str(c) for c in data.columns],
+            'rows': len(data),
+            'created': time.time()
+        }
+        with open(os.path.join(tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.replace(tmp_dir, entry_dir)
+        logger.info("Dataset cached at %s", entry_dir)
+
+        self.evict()
+        return entry_dir
+
+    def invalidate(self, filepath=None):
+        """
+        Removes cache entries built from ``filepath`` (all entries if None).
+        """
+        path = os.path.abspath(filepath) if filepath else None
+        removed = 0
+        for entry_dir, manifest in list(self._entries()):
+            if path is None or manifest['source']['path'] == path:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info("Invalidated %s dataset cache entries", removed)
+        return removed
+
+    def evict(self):
+        """
+        Drops least-recently-used entries beyond ``max_entries``/``max_bytes``
+        and entries written by another feature version.
+        """
+        entries = []
+        for entry_dir, manifest in self._entries():
+            if manifest.get('feature_version') != FEATURE_VERSION:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(entry_dir))
+            entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+
+        entries.sort(reverse=True)
+        total = 0
+        for i, (_, size, entry_dir) in enumerate(entries):
+            total += size
+            over_count = self.max_entries is not None and i >= self.max_entries
+            over_size = self.max_bytes is not None and total > self.max_bytes and i > 0
+            if over_count or over_size:
+                logger.info("Evicting dataset cache entry %s", entry_dir)
+                shutil.rmtree(entry_dir, ignore_errors=True)
@@ -0,0 +1,134 @@
+"""
+Rule-based pre-filter in front of the fraud model.
+
+A Cascade short-circuits rows that cannot be fraud before they reach the
+(expensive) model; they score 0. Two stages, both learned from the training
+data:
+
+1. Type rule: transaction types with no fraud among at least
+   ``min_support`` training rows are blocked (in PaySim everything except
+   TRANSFER and CASH_OUT).
+2. Optional first-stage model: one shallow decision tree fitted on the rows
+   the rule lets through. Rows landing in a leaf without any training fraud
+   are blocked, so no training fraud is ever short-circuited.
+
+Both stages work on raw (unscaled) features in the model's column order: the
+type is read from the one-hot type columns and the tree is compiled with the
+scaler folded into its thresholds (see src.compiled).
+"""
+import numpy as np
+from src.compiled import compile_model, CompiledEnsemble
+from src.data_loader import TRANSACTION_TYPES
+from src.utils import logger
+
+def _type_columns(feature_names):
+    """(type code, column index) of the one-hot type columns; CASH_IN is the reference."""
+    columns = []
+    for code, name in enumerate(TRANSACTION_TYPES[1:], start=1):
+        column = f'type_{name}'
+        if column not in feature_names:
+            raise ValueError(f"A cascade needs the one-hot type column {column}")
+        columns.append((code, feature_names.index(column)))
+    return columns
+
+class Cascade:
+    """
+    Blocks rows of ``blocked_types`` and, with a ``stage_one`` CompiledEnsemble,
+    rows whose stage-one fraud probability is not above ``threshold``.
+    """
+    def __init__(self, feature_names, blocked_types=(), stage_one=None, threshold=0.0):
+        self.feature_names = list(feature_names)
+        self.blocked_types = [name for name in TRANSACTION_TYPES if name in blocked_types]
+        self.stage_one = stage_one
+        self.threshold = float(threshold)
+
+        self._type_columns = _type_columns(self.feature_names)
+        # Indexed by type code; the last entry covers rows without a known type
+        self._blocked = np.array(
+            [name in self.blocked_types for name in TRANSACTION_TYPES] + [False]
+        )
+
+    def type_codes(self, features):
+        """TRANSACTION_TYPES codes of the rows of a raw feature matrix."""
+        codes = np.zeros(len(features), dtype=np.intp)
+        for code, column in self._type_columns:
+            codes[features[:, column] > 0.5] = code
+        return codes
+
+    def passes(self, features):
+        """Boolean mask of the rows of a raw feature matrix that need the model."""
+        passing = ~self._blocked[self.type_codes(features)]
+        if self.stage_one is not None and passing.any():
+            rows = np.flatnonzero(passing)
+            passing[rows] = self.stage_one.positive_proba(features[rows]) > self.threshold
+        return passing
+
+    def to_dict(self):
+        """Returns a JSON-serializable description of the cascade."""
+        stage_one = None
+        if self.stage_one is not None:
+            stage_one = {key: value.tolist() if isinstance(value, np.ndarray) else value
+                         for key, value in self.stage_one.to_dict().items()}
+        return {
+            'feature_names': self.feature_names,
+            'blocked_types': self.blocked_types,
+            'stage_one': stage_one,
+            'threshold': self.threshold
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a cascade from ``to_dict`` output."""
+        stage_one = data.get('stage_one')
+        return cls(
+            data['feature_names'], data['blocked_types'],
+            stage_one=None if stage_one is None else CompiledEnsemble.from_dict(stage_one),
+            threshold=data.get('threshold', 0.0)
+        )
+
+def fit_cascade(X_train, y_train, scaler, feature_names, min_support=1000, stage_one=True,
+                max_depth=3, min_samples_leaf=1000):
+    """
+    Learns a Cascade from the scaled training matrix the model was fitted on.
+
+    ``scaler`` maps raw features to ``X_train``'s scale; it is used to read
+    the one-hot type columns and is folded into the first-stage tree so that
+    the cascade runs on raw features.
+    """
+    feature_names = list(feature_names)
+    X_train = np.asarray(X_train)
+    y = np.asarray(y_train)
+    type_columns = _type_columns(feature_names)
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+
+    codes = np.zeros(len(y), dtype=np.intp)
+    for code, column in type_columns:
+        raw = np.asarray(X_train[:, column], dtype=np.float64)
+        if scale is not None:
+            raw = raw * scale[column]
+        if mean is not None:
+            raw = raw + mean[column]
+        codes[raw > 0.5] = code
+
+    rows = np.bincount(codes, minlength=len(TRANSACTION_TYPES))
+    frauds = np.bincount(codes, weights=y, minlength=len(TRANSACTION_TYPES))
+    blocked = [name for name, count, fraud in zip(TRANSACTION_TYPES, rows, frauds)
+               if count >= min_support and fraud == 0]
+    logger.info("Cascade blocks fraud-free types %s.", blocked)
+
+    cascade = Cascade(feature_names, blocked)
+    passing = ~cascade._blocked[codes] # pylint: disable=protected-access
+    if stage_one and passing.any() and y[passing].any():
+        # pylint: disable=import-outside-toplevel
+        from sklearn.ensemble import RandomForestClassifier
+        # A one-tree forest without bootstrap is a plain decision tree that
+        # compile_model already handles.
+        tree = RandomForestClassifier(
+            n_estimators=1, bootstrap=False, max_features=None, max_depth=max_depth,
+            min_samples_leaf=min_samples_leaf, random_state=42
+        ).fit(X_train[passing], y[passing])
+        cascade.stage_one = compile_model(tree, scaler, 'rf', len(feature_names))
+        logger.info("Cascade first stage: depth %s tree with %s nodes.",
+                    max_depth, cascade.stage_one.n_nodes)
+    return cascade
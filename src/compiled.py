@@ -0,0 +1,374 @@
+"""
+Flat array-backed evaluator for trained tree ensembles.
+
+A fitted RandomForestClassifier or binary XGBClassifier is exported into
+parallel NumPy arrays (feature, threshold, left, right, leaf value) covering
+every node of every tree. The StandardScaler is folded into the split
+thresholds, so raw float32 features are scored without a scaling pass.
+
+Every split is normalised to "go right when x > threshold" on the raw
+float32 value. Folded thresholds are found by bisecting over float32 values
+with the exact arithmetic StandardScaler applies to float32 input, so
+routing matches the original model on finite float32 features. Nodes are
+numbered breadth first with siblings adjacent (right == left + 1), and
+leaves are self-loops with an infinite threshold, so one step of every tree
+is ``node = left[node] + (x > threshold[node])``.
+
+Large batches evaluate the top ``_TOP_LEVELS`` levels of each tree with
+dense column comparisons and lookup tables, then walk the remaining deeper
+paths; small batches walk all trees at once from the roots.
+"""
+import json
+import numpy as np
+
+_BLOCK_ROWS = 16_384
+# Batches smaller than this skip the per-tree dense levels (single-row latency)
+_DENSE_MIN_ROWS = 256
+# Per-tree walks stop once fewer than rows / _STRAGGLER_FRACTION paths remain
+_STRAGGLER_FRACTION = 32
+
+# Depths 0-2 are packed into one 7-bit code, depth 3 into an 8-bit code
+_TOP_LEVELS = 4
+_UPPER, _LOWER = 7, 8
+
+# float32 values ordered as integers: a non-negative float is its own bit
+# pattern, a negative one minus its magnitude bits. -inf and +inf bound the range.
+_ORDERED_MIN, _ORDERED_MAX = -0x7f800000, 0x7f800000
+
+def _from_ordered(keys):
+    """Returns the float32 values of ordered integer keys."""
+    bits = np.where(keys >= 0, keys, (-keys) | 0x80000000)
+    return bits.astype(np.uint32).view(np.float32)
+
+def fold_thresholds(thresholds, mean, scale, strict=False):
+    """
+    Returns raw-space float32 thresholds T such that, for any float32 x,
+    ``x <= T`` exactly when the scaled value ``(x - mean) / scale`` satisfies
+    ``<= threshold`` (or ``< threshold`` when ``strict``).
+
+    ``mean`` and ``scale`` are per-threshold and are applied in float32, as
+    StandardScaler.transform does for float32 input.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float32)
+    scale = np.asarray(scale, dtype=np.float32)
+
+    def goes_left(keys):
+        scaled = (_from_ordered(keys) - mean) / scale
+        return scaled < thresholds if strict else scaled <= thresholds
+
+    low = np.full(len(thresholds), _ORDERED_MIN, dtype=np.int64)
+    high = np.full(len(thresholds), _ORDERED_MAX, dtype=np.int64)
+    never = ~goes_left(low)
+    always = goes_left(high)
+
+    # Invariant: goes_left(low) and not goes_left(high)
+    for _ in range(32):
+        mid = (low + high) // 2
+        left = goes_left(mid)
+        low = np.where(left, mid, low)
+        high = np.where(left, high, mid)
+
+    folded = _from_ordered(low)
+    folded[never] = -np.inf
+    folded[always] = np.inf
+    return folded
+
+class CompiledEnsemble:
+    """
+    A tree ensemble stored as flat node arrays.
+
+    ``kind`` is 'mean' (random forest: average of leaf probabilities) or
+    'logistic' (gradient boosting: sigmoid of the summed leaf margins plus
+    ``base_margin``). Scoring is read-only and safe to share between threads.
+    """
+    def __init__(self, feature, threshold, left, right, value, roots, n_features,
+                 kind='mean', base_margin=0.0):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.intp)
+        self.right = np.ascontiguousarray(right, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.n_features = int(n_features)
+        self.kind = kind
+        self.base_margin = float(base_margin)
+
+        self.is_leaf = self.left == np.arange(self.n_nodes)
+        if not np.array_equal(self.right[~self.is_leaf], self.left[~self.is_leaf] + 1):
+            raise ValueError("Right children must directly follow their left sibling")
+        self._build_top()
+
+    @property
+    def n_trees(self):
+        """Number of trees in the ensemble."""
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        """Total number of nodes over all trees."""
+        return len(self.feature)
+
+    def to_dict(self):
+        """Returns the arrays and metadata needed to rebuild the ensemble."""
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left,
+            'right': self.right, 'value': self.value, 'roots': self.roots,
+            'n_features': self.n_features, 'kind': self.kind, 'base_margin': self.base_margin
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds an ensemble from ``to_dict`` output."""
+        return cls(**data)
+
+    def _build_top(self):
+        """
+        Expands the top ``_TOP_LEVELS`` levels of every tree into complete
+        binary heaps (a leaf stands in for its own children) and tabulates
+        where each combination of split outcomes lands.
+        """
+        heaps = [self.roots.reshape(-1, 1)]
+        for _ in range(_TOP_LEVELS):
+            parent = heaps[-1]
+            heaps.append(np.stack([self.left[parent], self.right[parent]], axis=-1)
+                         .reshape(self.n_trees, -1))
+        heap = np.concatenate(heaps[:-1], axis=1)
+
+        # (is upper code, column, threshold, bit weight) per real split; padded
+        # leaves keep their bit at 0
+        positions = np.arange(heap.shape[1])
+        is_upper = (positions < _UPPER).tolist()
+        weights = [np.uint8(1 << bit) for bit in np.where(positions < _UPPER, positions,
+                                                            positions - _UPPER)]
+        splits = ~self.is_leaf[heap]
+        features = self.feature[heap].tolist()
+        thresholds = self.threshold[heap]
+        self._top_splits = [
+            [(is_upper[p], features[tree][p], thresholds[tree, p], weights[p])
+             for p in np.flatnonzero(splits[tree]).tolist()]
+            for tree in range(self.n_trees)
+        ]
+
+        # 7-bit code of depths 0-2 (bit set = went right) -> heap position at depth 3
+        codes = np.arange(1 << _UPPER)
+        position = np.zeros(len(codes), dtype=np.int64)
+        for _ in range(_TOP_LEVELS - 1):
+            position = 2 * position + 1 + ((codes >> position) & 1)
+        self._upper_table = (position - _UPPER).astype(np.uint8)
+
+        # (depth-3 position, 8-bit code of depth 3) -> node at depth 4
+        index = np.arange(8 << _LOWER)
+        position, codes = index >> _LOWER, index & 0xff
+        exits = 2 * position + ((codes >> position) & 1)
+        self._lower_table = np.ascontiguousarray(heaps[-1][:, exits])
+
+    def _walk(self, columns, column_start, node, row, sums, min_paths=1):
+        """
+        Advances unfinished paths (node, row), adding each leaf value reached to
+        ``sums[row]``, until fewer than ``min_paths`` paths remain. Returns the
+        remaining (node, row) paths.
+
+        ``columns`` is the block flattened column-major and ``column_start``
+        the offset of each node's split column within it.
+        """
+        while len(node) >= min_paths:
+            index = column_start.take(node)
+            index += row
+            right = columns.take(index) > self.threshold.take(node)
+            node = self.left.take(node)
+            node += right
+
+            # Finished paths loop on their leaf; retire them once enough have piled up.
+            # flatnonzero + take is several times faster than boolean indexing here.
+            done = self.is_leaf.take(node)
+            if np.count_nonzero(done) * 4 >= len(node):
+                retired = np.flatnonzero(done)
+                sums += np.bincount(row.take(retired), minlength=len(sums),
+                                    weights=self.value.take(node.take(retired)))
+                keep = np.flatnonzero(~done)
+                node, row = node.take(keep), row.take(keep)
+        return node, row
+
+    def _dense_top(self, columns):
+        """
+        Routes every row of a column-major block through the top levels of one
+        tree at a time, yielding the node each row reaches in that tree. The
+        yielded buffer is reused for the next tree.
+        """
+        rows = columns.shape[1]
+        upper = np.empty(rows, dtype=np.uint8)
+        lower = np.empty(rows, dtype=np.uint8)
+        went_right = np.empty(rows, dtype=bool)
+        weighted = np.empty(rows, dtype=np.uint8)
+        index = np.empty(rows, dtype=np.uint16)
+        nodes = np.empty(rows, dtype=np.intp)
+
+        for tree, splits in enumerate(self._top_splits):
+            upper.fill(0)
+            lower.fill(0)
+            for is_upper, feature, threshold, weight in splits:
+                code = upper if is_upper else lower
+                np.greater(columns[feature], threshold, out=went_right)
+                np.multiply(went_right.view(np.uint8), weight, out=weighted)
+                np.bitwise_or(code, weighted, out=code)
+            np.multiply(self._upper_table.take(upper), 1 << _LOWER, out=index, dtype=np.uint16)
+            np.bitwise_or(index, lower, out=index)
+            self._lower_table[tree].take(index, out=nodes)
+            yield nodes
+
+    def _block_sums(self, block, sums):
+        """Writes the summed leaf values over all trees for each row of ``block`` into ``sums``."""
+        rows = len(block)
+        columns = np.ascontiguousarray(block.T)
+        flat = columns.ravel()
+        column_start = self.feature * rows
+        if rows < _DENSE_MIN_ROWS:
+            # Few rows: walk all trees together from their roots
+            nodes = np.repeat(self.roots, rows)
+            self.value.take(nodes).reshape(self.n_trees, rows).sum(axis=0, out=sums)
+            slots = np.flatnonzero(~self.is_leaf.take(nodes))
+            self._walk(flat, column_start, nodes.take(slots), slots % rows, sums)
+            return
+
+        # Many rows: one tree at a time keeps the walk's working set in cache.
+        # Internal nodes carry a zero value, so unfinished paths add nothing here.
+        # The few long paths left over from each tree are walked together at the end.
+        sums.fill(0.0)
+        pending_nodes, pending_rows = [], []
+        for nodes in self._dense_top(columns):
+            sums += self.value.take(nodes)
+            active = np.flatnonzero(~self.is_leaf.take(nodes))
+            node, row = self._walk(flat, column_start, nodes.take(active), active, sums,
+                                   min_paths=rows // _STRAGGLER_FRACTION)
+            pending_nodes.append(node)
+            pending_rows.append(row)
+        self._walk(flat, column_start, np.concatenate(pending_nodes),
+                   np.concatenate(pending_rows), sums)
+
+    def positive_proba(self, features):
+        """
+        Returns the positive-class probability for each row of a raw
+        (unscaled) feature matrix in the model's column order.
+        """
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.ndim != 2 or features.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected a matrix with {self.n_features} feature columns, got {features.shape}"
+            )
+
+        sums = np.empty(len(features), dtype=np.float64)
+        for start in range(0, len(features), _BLOCK_ROWS):
+            stop = start + _BLOCK_ROWS
+            self._block_sums(features[start:stop], sums[start:stop])
+
+        if self.kind == 'mean':
+            return sums / self.n_trees
+        return 1.0 / (1.0 + np.exp(-(sums + self.base_margin)))
+
+    def predict_proba(self, features):
+        """Returns (n_rows, 2) class probabilities like sklearn's predict_proba."""
+        positive = self.positive_proba(features)
+        return np.column_stack([1.0 - positive, positive])
+
+def _scaler_params(scaler, n_features):
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(n_features) if mean is None else mean
+    scale = np.ones(n_features) if scale is None else scale
+    return np.asarray(mean, dtype=np.float32), np.asarray(scale, dtype=np.float32)
+
+def _breadth_first(left, right):
+    """Returns the node order of one tree with each right child right after its left sibling."""
+    order = [np.zeros(1, dtype=np.intp)]
+    frontier = order[0]
+    while len(frontier):
+        split = frontier[left[frontier] >= 0]
+        frontier = np.stack([left[split], right[split]], axis=-1).ravel()
+        order.append(frontier)
+    return np.concatenate(order)
+
+def _assemble(trees, mean, scale, strict, n_features, kind, base_margin=0.0):
+    """
+    Renumbers and concatenates per-tree (feature, threshold, left, right,
+    value) arrays, with negative children marking leaves, into one
+    CompiledEnsemble.
+    """
+    features, thresholds, lefts, values, roots = [], [], [], [], []
+    offset = 0
+    for feature, threshold, left, right, value in trees:
+        order = _breadth_first(left, right)
+        renumbered = np.empty(len(order), dtype=np.intp)
+        renumbered[order] = np.arange(len(order)) + offset
+
+        feature, threshold = feature[order], threshold[order]
+        left, value = left[order], value[order]
+        leaf = left < 0
+
+        feature = np.where(leaf, 0, feature)
+        folded = np.full(len(order), np.inf, dtype=np.float32)
+        folded[~leaf] = fold_thresholds(
+            threshold[~leaf], mean[feature[~leaf]], scale[feature[~leaf]], strict=strict
+        )
+
+        features.append(feature)
+        thresholds.append(folded)
+        lefts.append(np.where(leaf, np.arange(len(order)) + offset, renumbered[left]))
+        values.append(np.where(leaf, value, 0.0))
+        roots.append(offset)
+        offset += len(order)
+
+    left = np.concatenate(lefts)
+    is_leaf = left == np.arange(offset)
+    return CompiledEnsemble(
+        np.concatenate(features), np.concatenate(thresholds), left,
+        np.where(is_leaf, left, left + 1), np.concatenate(values), np.array(roots),
+        n_features, kind=kind, base_margin=base_margin
+    )
+
+def compile_forest(model, scaler, n_features):
+    """Compiles a fitted RandomForestClassifier (sklearn splits: scaled x <= t)."""
+    mean, scale = _scaler_params(scaler, n_features)
+    positive = list(model.classes_).index(1)
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        counts = tree.value[:, 0, :]
+        totals = counts.sum(axis=1)
+        proba = counts[:, positive] / np.where(totals > 0, totals, 1.0)
+        trees.append((tree.feature, tree.threshold, tree.children_left,
+                      tree.children_right, proba))
+    return _assemble(trees, mean, scale, strict=False, n_features=n_features, kind='mean')
+
+def compile_xgboost(model, scaler, n_features):
+    """Compiles a fitted binary:logistic XGBClassifier (XGBoost splits: scaled x < t)."""
+    learner = json.loads(model.get_booster().save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Cannot compile XGBoost objective {objective}")
+
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    mean, scale = _scaler_params(scaler, n_features)
+    trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        trees.append((
+            np.asarray(tree['split_indices'], dtype=np.intp),
+            conditions,
+            np.asarray(tree['left_children'], dtype=np.intp),
+            np.asarray(tree['right_children'], dtype=np.intp),
+            # Leaf nodes keep their (learning-rate scaled) weight in split_conditions
+            conditions
+        ))
+    return _assemble(
+        trees, mean, scale, strict=True, n_features=n_features, kind='logistic',
+        base_margin=np.log(base_score / (1.0 - base_score))
+    )
+
+def compile_model(model, scaler, model_type, n_features):
+    """Compiles a fitted 'rf' or 'xgb' model with ``scaler`` folded into its thresholds."""
+    if model_type == 'rf':
+        return compile_forest(model, scaler, n_features)
+    if model_type == 'xgb':
+        return compile_xgboost(model, scaler, n_features)
+    raise ValueError(f"Cannot compile model type: {model_type}")
@@ -1,49 +1,169 @@
 """
 Data loading and cleaning module.
 """
+import io
 import os
 import pandas as pd
 from src.utils import logger
 
-def load_data(filepath):
-    """
-    Loads the credit card fraud dataset.
-    """
+# Transaction types that occur in PaySim. Fixing the category set keeps the
+# encoding identical across chunks and across files.
+TRANSACTION_TYPES = ['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
+
+NAME_COLUMNS = ['nameOrig', 'nameDest']
+
+# Explicit schema for the raw PaySim CSV. Amounts and balances fit float32
+# (cents are rounded away above ~100k, which the features tolerate) and halve
+# the memory of the default float64 inference.
+# Amounts and balances stay float64: at PaySim balances (up to ~3.5e8) float32
+# resolves only 1-32 units, too coarse for the balance error features, whose
+# signal is whether they are exactly zero
+RAW_DTYPES = {
+    'step': 'int32',
+    'type': pd.CategoricalDtype(TRANSACTION_TYPES),
+    'amount': 'float64',
+    'nameOrig': 'object',
+    'oldbalanceOrg': 'float64',
+    'newbalanceOrig': 'float64',
+    'nameDest': 'object',
+    'oldbalanceDest': 'float64',
+    'newbalanceDest': 'float64',
+    'isFraud': 'int8',
+    'isFlaggedFraud': 'int8'
+}
+
+# Standardized names for PaySim's inconsistently named balance columns
+RENAME_MAP = {
+    'oldbalanceOrg': 'oldBalanceOrig',
+    'newbalanceOrig': 'newBalanceOrig',
+    'oldbalanceDest': 'oldBalanceDest',
+    'newbalanceDest': 'newBalanceDest'
+}
+RAW_NAMES = {clean: raw for raw, clean in RENAME_MAP.items()}
+
+DEFAULT_CHUNKSIZE = 500_000
+
+def _check_exists(filepath):
     if not os.path.exists(filepath):
         logger.error("File not found: %s", filepath)
         raise FileNotFoundError(f"File not found: {filepath}")
 
+def _usecols(skip_names):
+    if not skip_names:
+        return None
+    return lambda col: col not in NAME_COLUMNS
+
+def load_data(filepath, chunksize=None, skip_names=False):
+    """
+    Loads the credit card fraud dataset.
+
+    With ``chunksize`` set the file is parsed in chunks with the explicit
+    ``RAW_DTYPES`` schema and concatenated, so the parser never holds more than
+    one chunk of inferred objects at a time. ``skip_names`` drops the
+    ``nameOrig``/``nameDest`` columns at parse time.
+    """
+    _check_exists(filepath)
+
     logger.info("Loading data from %s...", filepath)
     try:
-        data = pd.read_csv(filepath)
+        if chunksize is None:
+            data = pd.read_csv(filepath, usecols=_usecols(skip_names))
+        else:
+            data = pd.concat(
+                iter_chunks(filepath, chunksize=chunksize, skip_names=skip_names),
+                ignore_index=True
+            )
         logger.info("Data loaded successfully. Shape: %s", data.shape)
         return data
     except Exception as exc: # pylint: disable=broad-except
         logger.error("Error loading data: %s", exc)
         raise
 
+def iter_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE, skip_names=False):
+    """
+    Streams the raw dataset in chunks of ``chunksize`` rows using ``RAW_DTYPES``.
+    """
+    _check_exists(filepath)
+
+    with pd.read_csv(
+        filepath, dtype=RAW_DTYPES, usecols=_usecols(skip_names), chunksize=chunksize
+    ) as reader:
+        yield from reader
+
+def iter_clean_chunks(filepath, chunksize=DEFAULT_CHUNKSIZE, skip_names=False):
+    """
+    Streams cleaned chunks of the dataset.
+
+    Cleaning is applied per chunk, so peak memory is bounded by ``chunksize``
+    rather than by the size of the file.
+    """
+    logger.info("Streaming data from %s in chunks of %s rows...", filepath, chunksize)
+    rows = dropped = 0
+    for chunk in iter_chunks(filepath, chunksize=chunksize, skip_names=skip_names):
+        cleaned, nulls = _clean(chunk)
+        rows += len(cleaned)
+        dropped += nulls
+        yield cleaned
+
+    if dropped > 0:
+        logger.warning("Dropped %s rows with null values while streaming.", dropped)
+    logger.info("Streaming completed. Rows: %s", rows)
+
+def read_header(filepath):
+    """Returns the column names in the header line of a CSV file."""
+    _check_exists(filepath)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return f.readline().rstrip('\r\n').split(',')
+
+def iter_clean_range(filepath, start, stop, columns, chunksize=DEFAULT_CHUNKSIZE,
+                     skip_names=False):
+    """
+    Streams cleaned chunks of the rows stored in bytes [start, stop) of the
+    file, which must begin and end on line boundaries after the header.
+    ``columns`` are the header's column names (see read_header). The index
+    of each chunk counts rows from ``start``.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        block = io.BytesIO(f.read(stop - start))
+    with pd.read_csv(
+        block, header=None, names=columns, dtype=RAW_DTYPES, usecols=_usecols(skip_names),
+        chunksize=chunksize
+    ) as reader:
+        for chunk in reader:
+            yield _clean(chunk)[0]
+
+def _clean(data, nulls=None):
+    """
+    Drops null rows and standardizes column names. Returns (data, dropped
+    rows). ``nulls`` is ``data.isnull()`` if the caller already has it.
+    """
+    nulls = (data.isnull() if nulls is None else nulls).to_numpy()
+    dropped = 0
+    if nulls.any():
+        keep = ~nulls.any(axis=1)
+        dropped = len(data) - int(keep.sum())
+        data = data[keep]
+
+    # Rename columns for consistency if needed?
+    # The dataset has mixed naming: nameOrig, oldbalanceOrg (missing i), newbalanceOrig
+    # Let's clean that up.
+    data = data.rename(columns=RENAME_MAP)
+    return data, dropped
+
 def clean_data(data):
     """
     Basic data cleaning.
     """
     logger.info("Starting data cleaning...")
-    
+
     # Check for nulls
-    null_counts = data.isnull().sum().sum()
+    nulls = data.isnull()
+    null_counts = int(nulls.to_numpy().sum())
     if null_counts > 0:
         logger.warning("Found %s null values. Dropping...", null_counts)
-        data = data.dropna()
 
-    # Rename columns for consistency if needed?
-    # The dataset has mixed naming: nameOrig, oldbalanceOrg (missing i), newbalanceOrig
-    # Let's clean that up.
-    rename_map = {
-        'oldbalanceOrg': 'oldBalanceOrig',
-        'newbalanceOrig': 'newBalanceOrig',
-        'oldbalanceDest': 'oldBalanceDest',
-        'newbalanceDest': 'newBalanceDest'
-    }
-    data = data.rename(columns=rename_map)
+    data, _ = _clean(data, nulls)
 
     logger.info("Data cleaning completed.")
     return data
@@ -0,0 +1,23 @@
+"""
+The decision rule that turns fraud probabilities into labels.
+
+Every scoring path (FraudDetector.predict, evaluate_model, score_file,
+the server and the hot-swap shadow comparison) labels with decide(), so a
+stored operating point means the same thing everywhere. Only NumPy is
+imported, keeping this off the start-up cost of the scoring paths.
+"""
+import numpy as np
+
+# Labelling threshold when no operating point is stored with the model
+DEFAULT_THRESHOLD = 0.5
+
+def decision_threshold(threshold=None):
+    """``threshold``, or DEFAULT_THRESHOLD when no operating point is set."""
+    return DEFAULT_THRESHOLD if threshold is None else threshold
+
+def decide(probabilities, threshold=None, dtype=np.int64):
+    """
+    A transaction is fraud (1) when its fraud probability reaches the
+    threshold, so a probability equal to it is flagged.
+    """
+    return (np.asarray(probabilities) >= decision_threshold(threshold)).astype(dtype)
@@ -1,39 +1,207 @@
 """
 Model evaluation module.
 """
+import json
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import classification_report, confusion_matrix
+# Re-exported; the rule lives in src.decision, light enough for the scoring paths
+from src.decision import ( # pylint: disable=unused-import
+    decide, decision_threshold, DEFAULT_THRESHOLD
+)
 from src.utils import logger
 
-def evaluate_model(model, X_test_scaled, y_test, report_dir='reports'): # pylint: disable=invalid-name
+# Cost of each outcome per transaction: a false positive is a wasted review,
+# a false negative a missed fraud. Scale to the business case with --cost_fp
+# and --cost_fn.
+DEFAULT_COSTS = {'tp': 0.0, 'fp': 1.0, 'fn': 100.0, 'tn': 0.0}
+
+DEFAULT_BINS = 10_000
+
+def _costs(costs):
+    return dict(DEFAULT_COSTS, **(costs or {}))
+
+def _sweep_table(thresholds, tp, fp, positives, negatives, costs):
+    """
+    Completes a threshold sweep from the true/false positive counts of the
+    rule 'flag when probability >= threshold', thresholds descending.
+    """
+    costs = _costs(costs)
+    tp = np.asarray(tp, dtype=np.float64)
+    fp = np.asarray(fp, dtype=np.float64)
+    fn = positives - tp
+    tn = negatives - fp
+    flagged = tp + fp
+    precision = np.divide(tp, flagged, out=np.ones_like(tp), where=flagged > 0)
+    recall = tp / positives if positives else np.ones_like(tp)
+    total = precision + recall
+    f1 = np.divide(2 * precision * recall, total, out=np.zeros_like(tp), where=total > 0)
+    cost = (tp * costs['tp'] + fp * costs['fp'] + fn * costs['fn'] + tn * costs['tn'])
+    return {
+        'threshold': np.asarray(thresholds, dtype=np.float64),
+        'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+        'precision': precision, 'recall': recall, 'f1': f1,
+        'expected_cost': cost / max(positives + negatives, 1),
+        'fpr': fp / negatives if negatives else np.zeros_like(fp)
+    }
+
+def sweep_scores(probabilities, labels, costs=None):
+    """
+    Precision, recall, F1 and expected cost at every distinct threshold in
+    one sorted cumulative pass. Row i of the result flags the transactions
+    with probability >= threshold[i]; row 0 (threshold above 1) flags none.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels) == 1
+    order = np.argsort(-probabilities, kind='stable')
+    scores = probabilities[order]
+
+    # Last position of every run of equal scores
+    ends = np.append(np.flatnonzero(np.diff(scores)), len(scores) - 1) if len(scores) else []
+    tp = np.cumsum(labels[order])[ends]
+    fp = np.asarray(ends) + 1 - tp
+    thresholds = np.concatenate([[np.nextafter(max(1.0, scores[0] if len(scores) else 1.0),
+                                               np.inf)], scores[ends]])
+    positives = int(labels.sum())
+    return _sweep_table(thresholds, np.concatenate([[0], tp]), np.concatenate([[0], fp]),
+                        positives, len(labels) - positives, costs)
+
+class ScoreHistogram:
+    """
+    Fraud and legitimate counts per probability bin, for evaluating test
+    sets that do not fit in memory: add() each scored chunk (or merge()
+    histograms built elsewhere) and sweep() once. Bin b holds scores in
+    [b / bins, (b + 1) / bins), plus one bin for a score of exactly 1, so
+    thresholds are exact to within 1 / ``bins``.
+    """
+    def __init__(self, bins=DEFAULT_BINS):
+        self.bins = bins
+        self.positives = np.zeros(bins + 1, dtype=np.int64)
+        self.negatives = np.zeros(bins + 1, dtype=np.int64)
+
+    def add(self, probabilities, labels):
+        """Counts one chunk of scores."""
+        index = np.clip((np.asarray(probabilities) * self.bins).astype(np.intp), 0, self.bins)
+        fraud = np.asarray(labels) == 1
+        self.positives += np.bincount(index[fraud], minlength=self.bins + 1)
+        self.negatives += np.bincount(index[~fraud], minlength=self.bins + 1)
+        return self
+
+    def merge(self, other):
+        """Adds the counts of another histogram with the same bins."""
+        if other.bins != self.bins:
+            raise ValueError(f"Cannot merge histograms of {other.bins} and {self.bins} bins")
+        self.positives += other.positives
+        self.negatives += other.negatives
+        return self
+
+    def sweep(self, costs=None):
+        """The sweep_scores table with one row per non-empty bin."""
+        occupied = np.flatnonzero(self.positives + self.negatives)[::-1]
+        tp = np.cumsum(self.positives[::-1])[self.bins - occupied]
+        fp = np.cumsum(self.negatives[::-1])[self.bins - occupied]
+        thresholds = np.concatenate([[np.nextafter(1.0, np.inf)], occupied / self.bins])
+        return _sweep_table(thresholds, np.concatenate([[0], tp]), np.concatenate([[0], fp]),
+                            int(self.positives.sum()), int(self.negatives.sum()), costs)
+
+def sweep_auc(sweep):
+    """ROC AUC from a sweep (trapezoidal, so tied scores count half)."""
+    tpr = sweep['recall'] if sweep['tp'][-1] else np.zeros_like(sweep['recall'])
+    return float(np.sum(np.diff(sweep['fpr']) * (tpr[1:] + tpr[:-1]) / 2))
+
+def operating_point(sweep):
+    """The sweep row with the lowest expected cost, as plain floats."""
+    best = int(np.argmin(sweep['expected_cost']))
+    return {key: float(values[best]) for key, values in sweep.items()}
+
+def evaluate_stream(chunks, costs=None, bins=DEFAULT_BINS, report_dir='reports'):
+    """
+    Evaluates (probabilities, labels) chunks without holding them all, via a
+    ScoreHistogram. Returns the AUC and the cost-optimal operating point.
+    """
+    histogram = ScoreHistogram(bins)
+    for probabilities, labels in chunks:
+        histogram.add(probabilities, labels)
+    return _report_sweep(histogram.sweep(costs), costs, report_dir)
+
+def _report_sweep(sweep, costs, report_dir):
+    """Logs and writes the AUC and operating point of a sweep."""
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    auc = sweep_auc(sweep)
+    best = operating_point(sweep)
+    logger.info("ROC AUC Score: %s", auc)
+    logger.info("Operating point (costs %s): threshold=%.6f precision=%.4f recall=%.4f "
+                "f1=%.4f expected cost=%.6f", _costs(costs), best['threshold'],
+                best['precision'], best['recall'], best['f1'], best['expected_cost'])
+    with open(os.path.join(report_dir, 'operating_point.json'), 'w', encoding='utf-8') as f:
+        json.dump({'costs': _costs(costs), 'auc': auc, 'operating_point': best}, f, indent=2)
+    return {'auc': auc, 'operating_point': best, 'sweep': sweep}
+
+class DetectorScorer:
+    """
+    Stands in for the estimator in evaluate_model: takes the same scaled
+    features but scores them with FraudDetector.predict_proba, so a cascade
+    is part of the evaluated (and tuned) model.
+    """
+    def __init__(self, detector):
+        self.detector = detector
+
+    def predict_proba(self, X_scaled): # pylint: disable=invalid-name
+        """Scores of the detector for scaled features."""
+        return self.detector.predict_proba(pd.DataFrame(
+            self.detector.scaler.inverse_transform(X_scaled),
+            columns=self.detector.feature_names
+        ))
+
+def evaluate_model(model, X_test_scaled, y_test, # pylint: disable=invalid-name
+                   report_dir='reports', threshold=None, costs=None, plots=True):
     """
     Evaluates the model and generates reports.
+
+    The model runs once. The classification report and confusion matrix
+    label with decide() at ``threshold`` (the model's stored operating point,
+    if any, else DEFAULT_THRESHOLD); the AUC and the cost-optimal operating point under
+    ``costs`` (see DEFAULT_COSTS) come from one threshold sweep. Plots are
+    only rendered with ``plots``.
     """
     logger.info("Evaluating model...")
-    
+
     if not os.path.exists(report_dir):
         os.makedirs(report_dir)
-        
-    y_pred = model.predict(X_test_scaled)
-    # Model object here is the underlying sklearn/xgb model, expected to be passed from outside or inside wrapper?
-    # Wait, X_test_scaled is already scaled.
-    # If we pass the wrapper 'FraudDetector', it expects raw X and handles scaling.
-    # If we pass the internal model, it expects scaled X.
-    # Let's assume we pass the internal model and scaled data for this low-level eval function.
 
+    # X_test_scaled is already scaled, so this is the underlying
+    # sklearn/xgb model rather than the FraudDetector wrapper.
+    y_test = np.asarray(y_test)
     y_prob = model.predict_proba(X_test_scaled)[:, 1]
+    y_pred = decide(y_prob, threshold)
 
     # Text Report
     report = classification_report(y_test, y_pred)
     logger.info("Classification Report:\n%s", report)
-    
+
     with open(os.path.join(report_dir, 'classification_report.txt'), 'w', encoding='utf-8') as f:
         f.write(report)
-        
-    # Confusion Matrix
+
     conf_matrix = confusion_matrix(y_test, y_pred)
+    result = _report_sweep(sweep_scores(y_prob, y_test, costs), costs, report_dir)
+    if plots:
+        _plot_reports(conf_matrix, result, report_dir)
+
+    return {
+        "auc": result['auc'],
+        "confusion_matrix": conf_matrix.tolist(),
+        "operating_point": result['operating_point']
+    }
+
+def _plot_reports(conf_matrix, result, report_dir):
+    """Renders the confusion matrix and ROC curve PNGs."""
+    # Plotting libraries are slow to import and only needed for these reports
+    import matplotlib.pyplot as plt # pylint: disable=import-outside-toplevel
+    import seaborn as sns # pylint: disable=import-outside-toplevel
+
     plt.figure(figsize=(8, 6))
     sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues')
     plt.title('Confusion Matrix')
@@ -42,13 +210,9 @@ def evaluate_model(model, X_test_scaled, y_test, report_dir='reports'): # pylint
     plt.savefig(os.path.join(report_dir, 'confusion_matrix.png'))
     plt.close()
 
-    # ROC Curve
-    auc = roc_auc_score(y_test, y_prob)
-    logger.info("ROC AUC Score: %s", auc)
-    
-    fpr, tpr, _ = roc_curve(y_test, y_prob)
+    sweep = result['sweep']
     plt.figure(figsize=(8, 6))
-    plt.plot(fpr, tpr, label=f"AUC = {auc:.2f}")
+    plt.plot(sweep['fpr'], sweep['recall'], label=f"AUC = {result['auc']:.2f}")
     plt.plot([0, 1], [0, 1], 'k--')
     plt.xlabel('False Positive Rate')
     plt.ylabel('True Positive Rate')
@@ -57,4 +221,46 @@ def evaluate_model(model, X_test_scaled, y_test, report_dir='reports'): # pylint
     plt.savefig(os.path.join(report_dir, 'roc_curve.png'))
     plt.close()
 
-    return {"auc": auc, "confusion_matrix": conf_matrix.tolist()}
+def evaluate_cascade(detector, X_test_scaled, y_test, # pylint: disable=invalid-name
+                     report_dir='reports'):
+    """
+    Reports the pass-through rate of the detector's cascade, the share of
+    test fraud it lets through, and end-to-end predict_proba throughput with
+    and without it.
+    """
+    logger.info("Evaluating cascade...")
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+
+    # The cascade and predict_proba take raw features
+    features = pd.DataFrame(detector.scaler.inverse_transform(X_test_scaled),
+                            columns=detector.feature_names)
+    y_test = np.asarray(y_test)
+    passing = detector.cascade.passes(np.asarray(features, dtype=np.float32))
+
+    cascade, timings = detector.cascade, {}
+    try:
+        for name, stage in (('without', None), ('with', cascade)):
+            detector.cascade = stage
+            start = time.perf_counter()
+            detector.predict_proba(features)
+            timings[name] = len(features) / (time.perf_counter() - start)
+    finally:
+        # The detector is saved afterwards; it must keep its cascade
+        detector.cascade = cascade
+
+    report = {
+        'pass_through_rate': float(passing.mean()),
+        'fraud_passed': float(passing[y_test == 1].mean()) if y_test.any() else 1.0,
+        'rows_per_second_without': timings['without'],
+        'rows_per_second_with': timings['with'],
+        'speedup': timings['with'] / timings['without']
+    }
+    logger.info("Cascade pass-through %.2f%%, fraud passed %.2f%%, "
+                "%.0f -> %.0f rows/s (x%.2f)",
+                100 * report['pass_through_rate'], 100 * report['fraud_passed'],
+                report['rows_per_second_without'], report['rows_per_second_with'],
+                report['speedup'])
+    with open(os.path.join(report_dir, 'cascade_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
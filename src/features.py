@@ -1,9 +1,30 @@
 """
 Feature engineering module for Credit Card Fraud Detection.
 """
+import numpy as np
 import pandas as pd
+from src.data_loader import TRANSACTION_TYPES
 from src.utils import logger
 
+# Bump whenever the output of feature_engineering or feature_matrix changes;
+# cached datasets built by an older version are invalidated.
+FEATURE_VERSION = 3
+
+# Fixed output schema of feature_matrix. CASH_IN is the reference level, as
+# with get_dummies(drop_first=True) on the full category set.
+FEATURE_COLUMNS = [
+    'step', 'amount', 'oldBalanceOrig', 'newBalanceOrig', 'oldBalanceDest', 'newBalanceDest',
+    'hour_of_day', 'type_CASH_OUT', 'type_DEBIT', 'type_PAYMENT', 'type_TRANSFER',
+    'errorBalanceOrig', 'errorBalanceDest'
+]
+
+# Leading FEATURE_COLUMNS copied from the cleaned input; the rest are derived.
+RAW_FEATURE_COLUMNS = [
+    'step', 'amount', 'oldBalanceOrig', 'newBalanceOrig', 'oldBalanceDest', 'newBalanceDest'
+]
+_HOUR, _FIRST_TYPE, _ERROR_ORIG, _ERROR_DEST = 6, 7, 11, 12
+_BLOCK_ROWS = 16_384
+
 def feature_engineering(data):
     """
     Generates new features for the dataset.
@@ -38,7 +59,7 @@ def feature_engineering(data):
     # Drop irrelevant columns
     # nameOrig and nameDest are high cardinality ID strings.
     # In a real system, we might track frequency of these IDs, but for this generic model,
-    # we drop them.
+    # we drop them. src/account_store.py derives per-account velocity features from them.
     # isFlaggedFraud is a rule-based label in the dataset, we can keep it as a feature
     # or drop it.
     # The goal is to predict 'isFraud'.
@@ -48,3 +69,78 @@ def feature_engineering(data):
 
     logger.info("Feature engineering completed. Features: %s", data.columns.tolist())
     return data
+
+def type_codes(types):
+    """
+    Encodes transaction types as indices into TRANSACTION_TYPES (-1 if unknown).
+    """
+    if isinstance(types.dtype, pd.CategoricalDtype):
+        if list(types.cat.categories) == TRANSACTION_TYPES:
+            return types.cat.codes.to_numpy()
+        types = types.astype(object)
+    return pd.Categorical(types, categories=TRANSACTION_TYPES).codes
+
+def feature_matrix(data, out=None):
+    """
+    Computes the FEATURE_COLUMNS of a cleaned frame into one float32 matrix.
+
+    Unlike feature_engineering this never mutates or copies ``data`` and the
+    columns do not depend on which transaction types occur in the batch, so a
+    1-row batch and the full dataset share the same schema. Pass a
+    preallocated ``out`` of shape (len(data), len(FEATURE_COLUMNS)) to reuse it.
+    """
+    shape = (len(data), len(FEATURE_COLUMNS))
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    elif out.shape != shape or out.dtype != np.float32:
+        raise ValueError(f"Expected a float32 output buffer of shape {shape}")
+
+    columns = [data[col].to_numpy() for col in RAW_FEATURE_COLUMNS]
+    codes = type_codes(data['type'])
+
+    # Work in row blocks so the strided column writes stay in cache.
+    for start in range(0, shape[0], _BLOCK_ROWS):
+        stop = min(start + _BLOCK_ROWS, shape[0])
+        _fill_block(out[start:stop], [col[start:stop] for col in columns], codes[start:stop])
+
+    return out
+
+def _fill_block(out, columns, codes):
+    """Fills one row block of the feature matrix in place."""
+    for j, col in enumerate(columns):
+        out[:, j] = col
+    fill_derived(out, codes, columns)
+
+def fill_derived(out, codes, columns=None):
+    """
+    Computes the derived FEATURE_COLUMNS in place, given a matrix whose
+    RAW_FEATURE_COLUMNS are already filled and the type codes of its rows.
+
+    The balance error terms are differences of large balances, so they are
+    computed from ``columns``, the RAW_FEATURE_COLUMNS at the precision they
+    were read in (float64), when given, and only then rounded to float32.
+    """
+    # 'step' is hours.
+    np.remainder(out[:, 0], 24, out=out[:, _HOUR])
+
+    for k in range(1, len(TRANSACTION_TYPES)):
+        np.equal(codes, k, out=out[:, _FIRST_TYPE + k - 1], casting='unsafe')
+
+    if columns is None:
+        columns = [out[:, j] for j in range(len(RAW_FEATURE_COLUMNS))]
+
+    # errorBalanceOrig = newBalanceOrig + amount - oldBalanceOrig
+    np.subtract(np.add(columns[3], columns[1]), columns[2], out=out[:, _ERROR_ORIG])
+
+    # errorBalanceDest = oldBalanceDest + amount - newBalanceDest
+    np.subtract(np.add(columns[4], columns[1]), columns[5], out=out[:, _ERROR_DEST])
+
+def feature_frame(data, target_col='isFraud'):
+    """
+    Wraps feature_matrix in a DataFrame (without copying it), carrying over the
+    target column when present.
+    """
+    features = pd.DataFrame(feature_matrix(data), columns=FEATURE_COLUMNS, copy=False)
+    if target_col in data.columns:
+        features[target_col] = data[target_col].to_numpy()
+    return features
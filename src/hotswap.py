@@ -0,0 +1,225 @@
+"""
+Zero-downtime model hot swap for the scoring server.
+
+A swap moves a candidate FraudDetector through three stages, all off the
+scoring thread:
+
+1. load: the candidate is loaded (from the model registry, or any loader)
+   on the swap thread.
+2. warm-up: it scores the most recent live batch, repeated up to the
+   batcher's ``max_batch`` rows, so its feature index and scoring buffers
+   are built and its memory-mapped arrays are paged in.
+3. shadow: every live batch scored by the serving model is also scored by
+   the candidate on the swap thread (a batch is skipped while the previous
+   one is still in shadow), and the two are compared.
+
+After ``shadow_rows`` rows (or ``shadow_timeout`` seconds without enough
+traffic) the candidate replaces ``MicroBatcher.detector`` in one reference
+assignment on the event loop. The batch in flight finishes on the old model
+and the next batch uses the new one, so no request is dropped or waits for
+the load. With ``max_disagreement`` set, a candidate whose labels disagree
+with the serving model on a larger share of shadow rows is rejected instead.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.decision import decide
+from src.utils import logger
+
+STATES = ('idle', 'loading', 'warming', 'shadow', 'swapped', 'rejected', 'failed')
+
+class HotSwapper:
+    """
+    Swaps the detector of a MicroBatcher after loading, warming and shadow
+    scoring a candidate (see the module docstring).
+    """
+    def __init__(self, batcher, version=None, shadow_rows=2000, shadow_timeout=30.0,
+                 max_disagreement=None):
+        self.batcher = batcher
+        # Version of the serving model, if it came from the registry
+        self.version = version
+        self.shadow_rows = shadow_rows
+        self.shadow_timeout = shadow_timeout
+        self.max_disagreement = max_disagreement
+        # The candidate is only touched from this thread until it is swapped in
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='swap')
+        self.state = 'idle'
+        self.candidate = None
+        self.candidate_version = None
+        self.task = None
+        self.history = []
+        self._shadow = None
+        self._shadow_future = None
+        self._shadow_done = None
+        self._recent = None
+        batcher.observers.append(self.observe)
+
+    @property
+    def busy(self):
+        """True while a candidate is being loaded, warmed or shadowed."""
+        return self.state in ('loading', 'warming', 'shadow')
+
+    def start(self, loader, version=None):
+        """
+        Starts swapping in the detector returned by ``loader()`` (called on
+        the swap thread). Returns False if a swap is already in progress.
+        """
+        if self.busy:
+            return False
+        self.state = 'loading'
+        self.candidate_version = version
+        self._shadow = {'rows': 0, 'batches': 0, 'skipped': 0, 'abs_diff_sum': 0.0,
+                        'max_abs_diff': 0.0, 'label_disagreements': 0, 'seconds': 0.0}
+        self._shadow_done = asyncio.Event()
+        self.task = asyncio.create_task(self._run(loader, version))
+        return True
+
+    async def _run(self, loader, version):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        entry = {'version': version, 'from_version': self.version}
+        try:
+            candidate = await loop.run_in_executor(self.executor, loader)
+            entry['load_seconds'] = time.perf_counter() - started
+            self.state = 'warming'
+            start = time.perf_counter()
+            await loop.run_in_executor(self.executor, self._warm, candidate)
+            entry['warm_seconds'] = time.perf_counter() - start
+
+            self.candidate = candidate
+            self.state = 'shadow'
+            try:
+                await asyncio.wait_for(self._shadow_done.wait(), self.shadow_timeout)
+            except asyncio.TimeoutError:
+                pass
+            if self._shadow_future is not None:
+                await self._shadow_future
+            entry['shadow'] = self.shadow_report()
+
+            disagreement = entry['shadow']['label_disagreement']
+            if (self.max_disagreement is not None and disagreement is not None
+                    and disagreement > self.max_disagreement):
+                self.state = 'rejected'
+                logger.warning("Rejected model %s: labels disagree on %.4f of %s shadow rows "
+                               "(limit %.4f)", version, disagreement,
+                               entry['shadow']['rows'], self.max_disagreement)
+            else:
+                if getattr(self.batcher.detector, 'monitor', None) is not None \
+                        and getattr(candidate, 'reference', None) is not None:
+                    candidate.start_monitoring()
+                # The swap: the next batch is scored by the candidate
+                self.batcher.detector = candidate
+                self.version = version
+                self.state = 'swapped'
+                logger.info("Swapped in model %s after %.1fs: %s", version,
+                            time.perf_counter() - started, entry['shadow'])
+        except Exception as exc: # pylint: disable=broad-except
+            self.state = 'failed'
+            entry['error'] = str(exc)
+            logger.error("Model swap to %s failed: %s", version, exc)
+        finally:
+            self.candidate = None
+            entry['state'] = self.state
+            entry['seconds'] = time.perf_counter() - started
+            self.history.append(entry)
+
+    def _warm(self, candidate):
+        """Scores the last live batch (repeated to a full batch) on the swap thread."""
+        if not self._recent:
+            return
+        records = (self._recent * (self.batcher.max_batch // len(self._recent) + 1))
+        candidate.score_many(records[:self.batcher.max_batch])
+        candidate.score_many(self._recent[:1])
+
+    def observe(self, records, probabilities):
+        """Called by the batcher after every live batch (on the event loop)."""
+        self._recent = records
+        if self.state != 'shadow' or self._shadow_done.is_set():
+            return
+        if self._shadow_future is not None:
+            self._shadow['skipped'] += 1
+            return
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        self._shadow_future = loop.run_in_executor(
+            self.executor, self.candidate.score_many, records
+        )
+        self._shadow_future.add_done_callback(
+            lambda future: self._compare(future, probabilities, start)
+        )
+
+    def _compare(self, future, probabilities, start):
+        self._shadow_future = None
+        if future.cancelled() or future.exception() is not None:
+            logger.warning("Shadow scoring failed: %s",
+                           None if future.cancelled() else future.exception())
+            return
+        live = np.asarray(probabilities, dtype=np.float64)
+        shadow = np.asarray(future.result(), dtype=np.float64)
+        diff = np.abs(shadow - live)
+        stats = self._shadow
+        stats['rows'] += len(live)
+        stats['batches'] += 1
+        stats['seconds'] += time.perf_counter() - start
+        stats['abs_diff_sum'] += float(diff.sum())
+        stats['max_abs_diff'] = max(stats['max_abs_diff'], float(diff.max(initial=0.0)))
+        stats['label_disagreements'] += int(np.count_nonzero(
+            decide(live, getattr(self.batcher.detector, 'threshold', None))
+            != decide(shadow, getattr(self.candidate, 'threshold', None))
+        ))
+        if stats['rows'] >= self.shadow_rows:
+            self._shadow_done.set()
+
+    def shadow_report(self):
+        """Comparison of the candidate with the serving model so far."""
+        if self._shadow is None:
+            return None
+        stats = self._shadow
+        rows = stats['rows']
+        return {
+            'rows': rows,
+            'batches': stats['batches'],
+            'skipped_batches': stats['skipped'],
+            'mean_abs_diff': stats['abs_diff_sum'] / rows if rows else None,
+            'max_abs_diff': stats['max_abs_diff'],
+            'label_disagreement': stats['label_disagreements'] / rows if rows else None,
+            'seconds': stats['seconds']
+        }
+
+    def status(self):
+        """The serving version and the state of the current or last swap."""
+        return {
+            'version': self.version,
+            'swap': {
+                'state': self.state,
+                'candidate_version': self.candidate_version,
+                'shadow': self.shadow_report()
+            },
+            'history': self.history[-10:]
+        }
+
+    async def watch(self, registry, interval):
+        """
+        Polls the registry's CURRENT pointer every ``interval`` seconds and
+        swaps to each new version (a rejected or failed one is not retried).
+        """
+        tried = {self.version}
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                version = registry.current()
+            except (OSError, ValueError) as exc:
+                logger.warning("Cannot read registry %s: %s", registry.root, exc)
+                continue
+            if version is None or version in tried or self.busy:
+                continue
+            tried.add(version)
+            logger.info("Registry %s now points at %s; swapping it in", registry.root, version)
+            self.start(lambda v=version: registry.load(v), version)
+
+    def shutdown(self):
+        """Cancels a swap in progress and stops the swap thread."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.executor.shutdown(wait=False)
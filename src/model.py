@@ -4,22 +4,88 @@ Model training and prediction module.
 import os
 import joblib
 import numpy as np
-from sklearn.model_selection import train_test_split
+import pandas as pd
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
-from xgboost import XGBClassifier
+from src.artifact import is_artifact_dir, read_artifact, write_artifact
+from src.cascade import fit_cascade, Cascade
+from src.compiled import compile_model, CompiledEnsemble
+from src.data_loader import RAW_NAMES, TRANSACTION_TYPES
+from src.decision import decide
+from src.features import fill_derived, FEATURE_COLUMNS, RAW_FEATURE_COLUMNS
+from src.monitoring import build_reference, DriftMonitor, DriftReference, DEFAULT_BINS
+from src.profiling import traced
+from src.refresh import (
+    refresh_seed, rescale_model, retire_trees, DEFAULT_UPDATE_TREES, UPDATE_MAX_DELTA_STEP
+)
 from src.utils import logger
 
+_TYPE_CODES = {name: code for code, name in enumerate(TRANSACTION_TYPES)}
+
+# Rows per block when prepare_data_lean fits and applies the scaler
+_SCALE_BLOCK_ROWS = 262_144
+
+def _frame_type_codes(X):
+    """Recovers TRANSACTION_TYPES codes from the one-hot type columns of ``X``."""
+    codes = np.zeros(len(X), dtype=np.intp)
+    for code, name in enumerate(TRANSACTION_TYPES[1:], start=1):
+        column = f'type_{name}'
+        if column in X.columns:
+            codes[np.asarray(X[column]) > 0.5] = code
+    return codes
+
+def _split_rows(split):
+    """Rows out of prepare_data: train plus test."""
+    return len(split[0]) + len(split[1])
+
 class FraudDetector:
     """
     Wrapper class for fraud detection models.
     """
-    def __init__(self, model_type='rf'):
+    def __init__(self, model_type='rf', params=None):
         self.model_type = model_type
+        # Estimator parameters overriding make_estimator's defaults (see src.tuning)
+        self.params = dict(params or {})
         self.scaler = StandardScaler()
-        self.model = None
+        self._model = None
+        self._model_path = None
         self.feature_names = None
-        
+        self.compiled = None
+        # Negative downsampling applied at training time (see src.training)
+        self.sampling = None
+        # Optional pre-filter that short-circuits rows which cannot be fraud
+        self.cascade = None
+        # Operating point chosen by evaluation; None keeps the 0.5 default
+        self.threshold = None
+        # Held-out feature/score distribution for drift monitoring (see src.monitoring)
+        self.reference = None
+        # DriftMonitor that predict_proba and score_many feed, if any
+        self.monitor = None
+        # Incremental updates since the last full training (see update)
+        self.refresh = None
+        self._reset_scoring_state()
+
+    @property
+    def model(self):
+        """The fitted estimator, read on first use for directory artifacts."""
+        if self._model is None and self._model_path is not None:
+            self._model = joblib.load(self._model_path)
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_path = None
+
+    def _reset_scoring_state(self):
+        """Drops the single-row scoring index and buffers (rebuilt on demand)."""
+        self._feature_index = None
+        self._score_offset = None
+        self._score_scale = None
+        self._raw_buffer = None
+        self._input_buffer = None
+        self._odds_factors = None
+
+    @traced('prepare_data', rows_out=_split_rows)
     def prepare_data(self, data, target_col='isFraud', test_size=0.2):
         """
         Prepares data for training/testing by splitting and scaling.
@@ -33,7 +99,10 @@ class FraudDetector:
         self.feature_names = X.columns.tolist()
         
         logger.info("Features shape: %s, Target shape: %s", X.shape, y.shape)
-        
+
+        # Training-only dependencies are imported here to keep scoring start-up lean
+        # pylint: disable=import-outside-toplevel
+        from sklearn.model_selection import train_test_split
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=test_size, stratify=y, random_state=42
         )
@@ -45,65 +114,351 @@ class FraudDetector:
         
         return X_train_scaled, X_test_scaled, y_train, y_test
 
+    @traced('prepare_data_lean', rows_out=_split_rows)
+    def prepare_data_lean(self, data, target_col='isFraud', test_size=0.2, scale=True):
+        """
+        Memory-lean prepare_data: same split, float32 NumPy outputs.
+
+        Only the split indices are computed from the frame; each feature
+        column is then gathered straight into contiguous float32 train and
+        test matrices, and both are scaled in place. Peak memory is the input
+        frame plus one float32 copy of the features, instead of a dropped
+        frame, split frames and float64 scaled copies. With ``scale=False``
+        the scaler is fitted as an identity (tree models do not need scaled
+        inputs) and the matrices are returned unscaled.
+        """
+        logger.info("Preparing data for training (lean)...")
+        # pylint: disable=import-outside-toplevel
+        from sklearn.model_selection import train_test_split
+
+        self.feature_names = [col for col in data.columns if col != target_col]
+        y = data[target_col].to_numpy()
+        logger.info("Features shape: %s, Target shape: %s",
+                    (len(data), len(self.feature_names)), y.shape)
+
+        # Same stratified split as prepare_data, as row indices
+        train_idx, test_idx = train_test_split(
+            np.arange(len(data)), test_size=test_size, stratify=y, random_state=42
+        )
+        X_train = np.empty((len(train_idx), len(self.feature_names)), dtype=np.float32)
+        X_test = np.empty((len(test_idx), len(self.feature_names)), dtype=np.float32)
+        for j, col in enumerate(self.feature_names):
+            values = data[col].to_numpy()
+            X_train[:, j] = values[train_idx]
+            X_test[:, j] = values[test_idx]
+
+        if not scale:
+            self.scaler = StandardScaler(with_mean=False, with_std=False)
+        logger.info("Scaling features...")
+        # Fit and scale in row blocks: StandardScaler works in float64
+        # temporaries the size of its input.
+        for start in range(0, len(X_train), _SCALE_BLOCK_ROWS):
+            self.scaler.partial_fit(X_train[start:start + _SCALE_BLOCK_ROWS])
+        if scale:
+            for matrix in (X_train, X_test):
+                for start in range(0, len(matrix), _SCALE_BLOCK_ROWS):
+                    self.scaler.transform(matrix[start:start + _SCALE_BLOCK_ROWS], copy=False)
+
+        # Fitted on bare matrices; record the schema for inference
+        self.scaler.feature_names_in_ = np.asarray(self.feature_names, dtype=object)
+        return X_train, X_test, y[train_idx], y[test_idx]
+
+    @traced('train')
     def train(self, X_train, y_train): 
         """
         Trains the model.
         """
         logger.info("Training %s model...", self.model_type)
+        # y_train might be a Series, connect to numpy
+        y_np = y_train.values if hasattr(y_train, 'values') else y_train
+        self.model = self.make_estimator(np.sum(y_np == 0), np.sum(y_np == 1))
+
+        self.model.fit(X_train, y_train)
+        self.compiled = None
+        self.sampling = None
+        self.cascade = None
+        self.threshold = None
+        self.reference = None
+        self.refresh = None
+        self._reset_scoring_state()
+        logger.info("Model training completed.")
+
+    @traced('update')
+    def update(self, X, y, n_estimators=None, max_tree_age=None):
+        """
+        Extends the fitted model with a window of new rows instead of
+        retraining it (see src.refresh).
+
+        ``X`` holds raw features with the model's columns, including
+        'step'. The scaler statistics are updated with the window and the
+        existing trees rescaled to match, unless that would change their
+        scores on the window. A random forest then gets
+        ``n_estimators`` trees fitted on the window; with ``max_tree_age``,
+        trees whose training data ended more than that many steps before
+        the window's last step are retired (trees from the initial training
+        count as ending just before the first update). XGBoost boosts
+        ``n_estimators`` more rounds from the existing booster.
+        """
+        # pylint: disable=import-outside-toplevel
+        import copy
+        from sklearn.base import clone
+        if self.model is None:
+            raise ValueError("Train or load a model before updating it.")
+        if self.sampling is not None:
+            raise ValueError("Models trained on downsampled negatives cannot be updated; "
+                             "retrain them.")
+        if self.model_type not in DEFAULT_UPDATE_TREES:
+            raise ValueError(f"Unsupported model type: {self.model_type}")
+        X = self._align_features(X)
+        y_np = y.values if hasattr(y, 'values') else np.asarray(y)
+        positives = int(np.count_nonzero(y_np))
+        if positives in (0, len(y_np)):
+            raise ValueError("The update window needs both fraud and legitimate rows.")
+        steps = np.asarray(X['step'])
+        first_step, last_step = int(steps.min()), int(steps.max())
+        n_estimators = n_estimators or DEFAULT_UPDATE_TREES[self.model_type]
+        logger.info("Updating %s model with %s rows (%s fraud) from steps %s-%s...",
+                    self.model_type, len(y_np), positives, first_step, last_step)
+
+        scaler = copy.deepcopy(self.scaler)
+        for start in range(0, len(X), _SCALE_BLOCK_ROWS):
+            scaler.partial_fit(X.iloc[start:start + _SCALE_BLOCK_ROWS])
+        rescaled, changed = rescale_model(self.model, self.model_type, self.scaler, scaler, X)
+        if changed:
+            logger.warning("Keeping the previous scaler statistics: rescaling the existing "
+                           "trees would change %s of %s window scores.", changed, len(X))
+            scaler = self.scaler
+            rescaled = self.model if self.model_type == 'rf' else self.model.get_booster()
+        X_scaled = scaler.transform(X)
+
+        refresh = self.refresh or {'history': []}
+        # A fresh seed per refresh; the model's own would repeat the same trees
+        seed = refresh_seed(self.model.get_params().get('random_state'),
+                            len(refresh['history']) + 1)
+        if self.model_type == 'rf':
+            model = rescaled
+            tree_steps = refresh.get('tree_steps') or [first_step - 1] * len(model.estimators_)
+            added = clone(model).set_params(n_estimators=n_estimators,
+                                            random_state=seed).fit(X_scaled, y_np)
+            estimators = model.estimators_ + added.estimators_
+            tree_steps = tree_steps + [last_step] * len(added.estimators_)
+            keep = retire_trees(tree_steps, last_step, max_tree_age)
+            model.estimators_ = [estimators[i] for i in keep]
+            model.n_estimators = len(keep)
+            refresh['tree_steps'] = [tree_steps[i] for i in keep]
+            retired, trees = len(estimators) - len(keep), len(keep)
+        else:
+            ratio = float(len(y_np) - positives) / positives
+            model = clone(self.model).set_params(n_estimators=n_estimators,
+                                                 scale_pos_weight=ratio, random_state=seed)
+            # Fraud the existing booster scores near 0 has a near-zero hessian;
+            # with scale_pos_weight in the hundreds its leaf weights diverge
+            if model.get_params().get('max_delta_step') is None:
+                model.set_params(max_delta_step=UPDATE_MAX_DELTA_STEP)
+            model.fit(X_scaled, y_np, xgb_model=rescaled)
+            retired, trees = 0, model.get_booster().num_boosted_rounds()
+
+        refresh['history'].append({
+            'rows': len(y_np), 'fraud': positives, 'steps': [first_step, last_step],
+            'trees_added': n_estimators, 'trees_retired': retired, 'trees': trees,
+            'scaler_updated': not changed
+        })
+        self.refresh = refresh
+        self.scaler = scaler
+        self.model = model
+        # Compiled thresholds embed the old trees and scaler
+        if self.compiled is not None:
+            self.compile()
+        self._reset_scoring_state()
+        logger.info("Model updated: %s trees (%s added, %s retired).", trees, n_estimators, retired)
+        return self
+
+    def make_estimator(self, num_neg, num_pos, params=None):
+        """
+        Returns the unfitted estimator for ``model_type``, configured for a
+        training set with ``num_neg`` legitimate and ``num_pos`` fraud rows.
+        ``params`` overrides estimator parameters (e.g. n_estimators, n_jobs)
+        on top of the detector's own ``params``.
+        """
+        params = dict(self.params, **(params or {}))
+        # pylint: disable=import-outside-toplevel
         if self.model_type == 'rf':
             # random forest with balanced class weights
-            self.model = RandomForestClassifier(
+            from sklearn.ensemble import RandomForestClassifier
+            return RandomForestClassifier(
                 n_estimators=100, class_weight='balanced',
                 random_state=42, n_jobs=-1, verbose=1
-            )
-        elif self.model_type == 'xgb':
+            ).set_params(**params)
+        if self.model_type == 'xgb':
             # XGBoost
             # Calculate scale_pos_weight for imbalance
             try:
-                # y_train might be a Series, connect to numpy
-                y_np = y_train.values if hasattr(y_train, 'values') else y_train
-                num_neg = np.sum(y_np == 0)
-                num_pos = np.sum(y_np == 1)
                 ratio = float(num_neg) / float(num_pos) if num_pos > 0 else 1.0
                 logger.info("XGBoost scale_pos_weight: %s", ratio)
-                
-                self.model = XGBClassifier(
+
+                from xgboost import XGBClassifier
+                return XGBClassifier(
                     scale_pos_weight=ratio, n_jobs=-1, random_state=42, eval_metric='logloss'
-                )
+                ).set_params(**params)
             except Exception as e: 
                 logger.error("Error configuring XGBoost: %s", e)
                 raise e
-        else:
-            raise ValueError(f"Unsupported model type: {self.model_type}")
-            
-        if self.model is None:
-            raise ValueError("Model initialization failed.")
-
-        self.model.fit(X_train, y_train)
-        logger.info("Model training completed.")
+        raise ValueError(f"Unsupported model type: {self.model_type}")
 
     def _align_features(self, X):
         """Aligns input features to match training features."""
         if self.feature_names is None:
             return X
-        
+
+        # Frames from features.feature_matrix already share the training schema
+        if list(X.columns) == self.feature_names:
+            return X
+
         # Reindex ensures all training columns exist (filled with 0) and drops extras
         return X.reindex(columns=self.feature_names, fill_value=0)
 
+    @traced('compile')
+    def compile(self):
+        """
+        Compiles the fitted model into flat arrays with the scaler folded into
+        the split thresholds (see src.compiled). Once compiled, predictions run
+        on raw features through the compiled evaluator.
+        """
+        if self.model is None:
+            raise ValueError("Train or load a model before compiling it.")
+        n_features = len(self.feature_names or FEATURE_COLUMNS)
+        self.compiled = compile_model(self.model, self.scaler, self.model_type, n_features)
+        logger.info("Compiled %s trees (%s nodes).", self.compiled.n_trees, self.compiled.n_nodes)
+        return self.compiled
+
+    @traced('fit_cascade')
+    def fit_cascade(self, X_train, y_train, **kwargs):
+        """
+        Learns a cascade (see src.cascade) from the scaled training data the
+        model was fitted on. Keyword arguments go to cascade.fit_cascade.
+        """
+        self.cascade = fit_cascade(X_train, y_train, self.scaler,
+                                   self.feature_names or FEATURE_COLUMNS, **kwargs)
+        return self.cascade
+
+    @traced('fit_reference')
+    def fit_reference(self, X_scaled, n_bins=DEFAULT_BINS, max_rows=200_000):
+        """
+        Snapshots the raw feature and fraud probability distributions of a
+        scaled held-out matrix (such as prepare_data's test split) as the
+        drift reference saved with the model. At most ``max_rows`` rows,
+        sampled uniformly, are scored for it.
+        """
+        names = self.feature_names or FEATURE_COLUMNS
+        X_scaled = np.asarray(X_scaled)
+        if len(X_scaled) > max_rows:
+            rows = np.sort(np.random.default_rng(42).choice(len(X_scaled), max_rows, replace=False))
+            X_scaled = X_scaled[rows]
+        raw = self.scaler.inverse_transform(X_scaled)
+        # Unscaled float32 features carry rounding noise (a 0 flag comes back
+        # as 4.7e-10); bin edges are lowered past it, see build_reference.
+        mean = getattr(self.scaler, 'mean_', None)
+        mean = 0.0 if mean is None else np.abs(mean)
+        tolerance = 8 * np.finfo(np.float32).eps * (np.abs(raw).max(axis=0, initial=0) + mean)
+        raw = raw.astype(np.float32)
+        monitor, self.monitor = self.monitor, None
+        try:
+            probabilities = self.predict_proba(pd.DataFrame(raw, columns=names, copy=False))[:, 1]
+        finally:
+            self.monitor = monitor
+        self.reference = build_reference(raw, probabilities, names, n_bins=n_bins,
+                                         tolerance=tolerance)
+        return self.reference
+
+    def start_monitoring(self):
+        """Attaches a DriftMonitor on the saved reference to the scoring paths."""
+        if self.reference is None:
+            raise ValueError("This model has no drift reference; retrain to record one.")
+        self.monitor = DriftMonitor(self.reference)
+        return self.monitor
+
+    @traced('predict')
     def predict(self, X): 
-        """Predicts class labels."""
-        X = self._align_features(X)
-        X_scaled = self.scaler.transform(X) 
-        return self.model.predict(X_scaled)
+        """
+        Predicts class labels: fraud when the probability reaches
+        ``threshold``, or 0.5 without a stored operating point (see
+        src.decision.decide).
+        """
+        return decide(self.predict_proba(X)[:, 1], self.threshold)
 
+    @traced('predict_proba')
     def predict_proba(self, X): 
         """Predicts class probabilities."""
         X = self._align_features(X)
-        X_scaled = self.scaler.transform(X) 
-        return self.model.predict_proba(X_scaled)
+        if self.cascade is not None:
+            raw = np.asarray(X, dtype=np.float32)
+            passing = self.cascade.passes(raw)
+            positive = np.zeros(len(raw), dtype=np.float64)
+            if passing.any():
+                positive[passing] = self._model_proba(X[passing], raw[passing])[:, 1]
+            proba = np.column_stack([1.0 - positive, positive])
+        else:
+            proba = self._model_proba(X)
+        if self.monitor is not None:
+            self.monitor.update(np.asarray(X, dtype=np.float32), proba[:, 1],
+                                columns=getattr(X, 'columns', None))
+        return proba
+
+    def _model_proba(self, X, raw=None):
+        """Class probabilities from the model alone (compiled if available)."""
+        if self.compiled is not None:
+            proba = self.compiled.predict_proba(
+                np.asarray(X, dtype=np.float32) if raw is None else raw
+            )
+        else:
+            X_scaled = self.scaler.transform(X) 
+            proba = self.model.predict_proba(X_scaled)
+        if self.sampling is not None:
+            positive = self._calibrate(proba[:, 1], _frame_type_codes(X))
+            proba = np.column_stack([1.0 - positive, positive])
+        return proba
+
+    def _calibrate(self, positive, codes):
+        """
+        Corrects fraud probabilities of a model fitted on downsampled negatives.
+
+        Class weights are rebalanced on the sample, so keeping every type at
+        the same rate needs no correction in expectation. Keeping type t at
+        rate r_t, against an overall kept fraction r, multiplies the odds the
+        model learns for that type by r / r_t; this undoes it. ``codes``
+        index TRANSACTION_TYPES (-1 for unknown types, left unchanged).
+        """
+        if self._odds_factors is None:
+            rates = self.sampling['negative_rates']
+            kept = self.sampling['negatives_kept'] / max(self.sampling['negatives_seen'], 1)
+            self._odds_factors = np.array(
+                [rates[name] / kept for name in TRANSACTION_TYPES] + [1.0]
+            )
+        factors = self._odds_factors[codes]
+        return positive * factors / (positive * factors + (1.0 - positive))
 
+    @traced('save_model')
     def save_model(self, filepath='models/fraud_model.pkl'):
-        """Saves the trained model to disk."""
+        """
+        Saves the trained model to disk.
+
+        Paths ending in .pkl or .joblib are written as a single joblib pickle.
+        Any other path is written as a directory artifact (see src.artifact)
+        whose arrays are memory-mapped on load; the model is compiled first
+        if it has not been already.
+        """
+        if is_artifact_dir(filepath):
+            if self.compiled is None:
+                self.compile()
+            write_artifact(filepath, self.model, self.scaler, self.model_type,
+                           self.feature_names, self.compiled, sampling=self.sampling,
+                           cascade=None if self.cascade is None else self.cascade.to_dict(),
+                           threshold=self.threshold,
+                           reference=None if self.reference is None else self.reference.to_dict(),
+                           refresh=self.refresh)
+            logger.info("Model artifact saved to %s", filepath)
+            return
+
         if not os.path.exists('models'):
             os.makedirs('models')
         
@@ -111,18 +466,152 @@ class FraudDetector:
             'model': self.model,
             'scaler': self.scaler,
             'type': self.model_type,
-            'feature_names': self.feature_names
+            'feature_names': self.feature_names,
+            'compiled': None if self.compiled is None else self.compiled.to_dict(),
+            'sampling': self.sampling,
+            'cascade': None if self.cascade is None else self.cascade.to_dict(),
+            'threshold': self.threshold,
+            'reference': None if self.reference is None else self.reference.to_dict(),
+            'refresh': self.refresh
         }
         joblib.dump(payload, filepath)
         logger.info("Model saved to %s", filepath)
 
+    @traced('load_model')
     def load_model(self, filepath='models/fraud_model.pkl'):
-        """Loads a trained model from disk."""
+        """Loads a trained model (pickle or directory artifact) from disk."""
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Model file not found: {filepath}")
-        data = joblib.load(filepath)
-        self.model = data['model']
+        if os.path.isdir(filepath):
+            data = read_artifact(filepath)
+            self.model = None
+            self._model_path = data['model_path']
+        else:
+            data = joblib.load(filepath)
+            self.model = data['model']
         self.scaler = data['scaler']
         self.model_type = data.get('type', 'rf')
         self.feature_names = data.get('feature_names', None)
+        compiled = data.get('compiled')
+        if isinstance(compiled, dict):
+            compiled = CompiledEnsemble.from_dict(compiled)
+        self.compiled = compiled
+        self.sampling = data.get('sampling')
+        cascade = data.get('cascade')
+        self.cascade = None if cascade is None else Cascade.from_dict(cascade)
+        self.threshold = data.get('threshold')
+        reference = data.get('reference')
+        self.reference = None if reference is None else DriftReference.from_dict(reference)
+        self.refresh = data.get('refresh')
+        self.monitor = None
+        self._reset_scoring_state()
+        self._build_feature_index()
         logger.info("Model loaded from %s", filepath)
+
+    def _build_feature_index(self):
+        """
+        Maps FEATURE_COLUMNS onto the model's input columns and caches the
+        scaler parameters, so single transactions can be scored without pandas.
+        """
+        names = self.feature_names or FEATURE_COLUMNS
+        unknown = [name for name in names if name not in FEATURE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot score features outside FEATURE_COLUMNS: {unknown}")
+
+        index = np.array([FEATURE_COLUMNS.index(name) for name in names], dtype=np.intp)
+        self._feature_index = None if index.tolist() == list(range(len(FEATURE_COLUMNS))) else index
+        # Identity scalers (with_mean/with_std off) store None
+        mean = getattr(self.scaler, 'mean_', None)
+        scale = getattr(self.scaler, 'scale_', None)
+        self._score_offset = np.asarray(0.0 if mean is None else mean, dtype=np.float32)
+        self._score_scale = np.asarray(1.0 if scale is None else scale, dtype=np.float32)
+        self._raw_buffer = np.zeros((1, len(FEATURE_COLUMNS)), dtype=np.float32)
+        self._input_buffer = np.zeros((1, len(names)), dtype=np.float32)
+
+    def _buffers(self, rows):
+        """Returns the raw feature and model-input buffers for ``rows`` rows."""
+        if self._raw_buffer is None:
+            self._build_feature_index()
+        if len(self._raw_buffer) < rows:
+            self._raw_buffer = np.zeros((rows, self._raw_buffer.shape[1]), dtype=np.float32)
+            self._input_buffer = np.zeros((rows, self._input_buffer.shape[1]), dtype=np.float32)
+        return self._raw_buffer[:rows], self._input_buffer[:rows]
+
+    def score_many(self, records):
+        """
+        Returns the fraud probability of each transaction in ``records``.
+
+        Records are dicts of PaySim fields (raw names such as 'oldbalanceOrg' or
+        cleaned names such as 'oldBalanceOrig'). They are written straight into
+        reused NumPy buffers, bypassing DataFrames and sklearn input validation.
+        The buffers make this method unsafe to call concurrently on one instance.
+        Raises ValueError for a transaction type outside TRANSACTION_TYPES.
+        """
+        raw, model_input = self._buffers(len(records))
+        codes = np.empty(len(records), dtype=np.int8)
+        # Read at full precision for the balance error terms (see fill_derived)
+        values = np.empty((len(records), len(RAW_FEATURE_COLUMNS)))
+        for i, record in enumerate(records):
+            values[i] = [
+                record[name] if name in record else record[RAW_NAMES[name]]
+                for name in RAW_FEATURE_COLUMNS
+            ]
+            code = _TYPE_CODES.get(record['type'])
+            if code is None:
+                raise ValueError(f"Unknown transaction type {record['type']!r}; "
+                                 f"expected one of {TRANSACTION_TYPES}")
+            codes[i] = code
+        raw[:, :len(RAW_FEATURE_COLUMNS)] = values
+        fill_derived(raw, codes, values.T)
+
+        if self.cascade is None:
+            positive = self._score_raw(raw, model_input, codes)
+        else:
+            passing = self.cascade.passes(
+                raw if self._feature_index is None else raw[:, self._feature_index]
+            )
+            positive = np.zeros(len(records), dtype=np.float64)
+            if passing.any():
+                rows = np.flatnonzero(passing)
+                positive[rows] = self._score_raw(raw[rows], model_input[:len(rows)], codes[rows])
+        if self.monitor is not None:
+            self.monitor.update(raw, positive, columns=FEATURE_COLUMNS)
+        return positive
+
+    def _score_raw(self, raw, model_input, codes):
+        """
+        Scores a raw FEATURE_COLUMNS matrix; ``model_input`` is a buffer with
+        the same number of rows in the model's column order.
+        """
+        if self.compiled is not None:
+            # Thresholds already include the scaler
+            if self._feature_index is not None:
+                raw = np.take(raw, self._feature_index, axis=1, out=model_input)
+            positive = self.compiled.positive_proba(raw)
+            return positive if self.sampling is None else self._calibrate(positive, codes)
+
+        # Same float32 arithmetic as feature_matrix followed by StandardScaler.transform
+        if self._feature_index is None:
+            model_input[:] = raw
+        else:
+            np.take(raw, self._feature_index, axis=1, out=model_input)
+        np.subtract(model_input, self._score_offset, out=model_input)
+        np.divide(model_input, self._score_scale, out=model_input)
+        positive = self._positive_proba(model_input)
+        return positive if self.sampling is None else self._calibrate(positive, codes)
+
+    def score_one(self, record):
+        """Returns the fraud probability of a single transaction dict."""
+        return float(self.score_many([record])[0])
+
+    def _positive_proba(self, model_input):
+        """Runs the fitted model on a scaled float32 matrix, skipping input validation."""
+        if self.model_type == 'rf' and hasattr(self.model, 'estimators_'):
+            positive = list(self.model.classes_).index(1)
+            proba = np.zeros(len(model_input), dtype=np.float64)
+            for tree in self.model.estimators_:
+                proba += tree.predict_proba(model_input, check_input=False)[:, positive]
+            return proba / len(self.model.estimators_)
+        if self.model_type == 'xgb':
+            return self.model.get_booster().inplace_predict(model_input)
+        return self.model.predict_proba(model_input)[:, 1]
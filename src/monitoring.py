@@ -0,0 +1,200 @@
+"""
+Feature and score drift monitoring against the training distribution.
+
+A DriftReference is a snapshot of the held-out data a model was evaluated
+on: per feature (in the model's column order) the bin edges at the
+reference deciles and the share of rows in each bin, plus the same for the
+output fraud probability. It is built after training (FraudDetector.
+fit_reference) and saved with the model.
+
+A DriftMonitor counts live traffic into the same fixed bins. Each update is
+one vectorized bincount per batch, and the state is a fixed-size count
+array, so memory does not grow with traffic. report() copies the counts
+under a lock and computes PSI and KS per feature outside it, so reporting
+never holds up the scoring thread.
+"""
+import json
+import os
+import threading
+import numpy as np
+from src.utils import logger
+
+DEFAULT_BINS = 10
+
+# Conventional PSI bands: < 0.1 stable, 0.1-0.2 moderate shift, >= 0.2 drifted
+PSI_ALERT = 0.2
+
+# Floor on bin shares so that empty bins do not make PSI infinite
+_EPSILON = 1e-4
+
+def _edges(values, n_bins, tolerance=0.0):
+    """
+    Interior bin edges at the quantiles of ``values`` (fewer if values
+    repeat), lowered by ``tolerance``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return np.empty(0)
+    return np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]) - tolerance)
+
+class DriftReference:
+    """
+    Bin edges and reference bin counts for each feature and the probability.
+    Bin k of a column holds values v with edges[k - 1] <= v < edges[k].
+    """
+    def __init__(self, feature_names, edges, counts, probability_edges, probability_counts):
+        self.feature_names = list(feature_names)
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.counts = [np.asarray(c, dtype=np.int64) for c in counts]
+        self.probability_edges = np.asarray(probability_edges, dtype=np.float64)
+        self.probability_counts = np.asarray(probability_counts, dtype=np.int64)
+
+    def to_dict(self):
+        """Returns a JSON-serializable description of the reference."""
+        return {
+            'feature_names': self.feature_names,
+            'edges': [e.tolist() for e in self.edges],
+            'counts': [c.tolist() for c in self.counts],
+            'probability_edges': self.probability_edges.tolist(),
+            'probability_counts': self.probability_counts.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a reference from ``to_dict`` output."""
+        return cls(data['feature_names'], data['edges'], data['counts'],
+                   data['probability_edges'], data['probability_counts'])
+
+def build_reference(features, probabilities, feature_names, n_bins=DEFAULT_BINS,
+                    tolerance=None):
+    """
+    Builds a DriftReference from raw (unscaled) ``features`` in
+    ``feature_names`` order and the model's fraud ``probabilities``.
+
+    Edges fall on reference values, so a value repeated across an edge (a 0/1
+    flag, a whole step) sits just above it. When the features are
+    reconstructed, e.g. unscaled from float32, ``tolerance`` gives the
+    largest error per feature; edges are lowered by it so that live values
+    equal to a reference value land in the same bin.
+    """
+    features = np.asarray(features)
+    if tolerance is None:
+        tolerance = np.zeros(features.shape[1])
+    edges = [_edges(features[:, j], n_bins, tolerance[j]) for j in range(features.shape[1])]
+    probability_edges = _edges(probabilities, n_bins)
+    reference = DriftReference(feature_names, edges, [np.zeros(len(e) + 1) for e in edges],
+                               probability_edges, np.zeros(len(probability_edges) + 1))
+    counter = DriftMonitor(reference)
+    counter.update(features, probabilities)
+    reference.counts, reference.probability_counts = counter.snapshot()
+    return reference
+
+def psi(expected, actual):
+    """Population stability index between two count vectors over the same bins."""
+    expected = np.maximum(expected / max(expected.sum(), 1), _EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), _EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov statistic between two count vectors, at the bin edges."""
+    expected = np.cumsum(expected) / max(expected.sum(), 1)
+    actual = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(actual - expected)))
+
+class DriftMonitor:
+    """
+    Counts scored rows into the bins of a DriftReference. Safe to update from
+    several threads and to report from another.
+    """
+    def __init__(self, reference):
+        self.reference = reference
+        self.feature_names = reference.feature_names
+        sizes = [len(e) + 1 for e in reference.edges]
+        # Each feature's bins are a slice of one flat count array
+        self._offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+        self._counts = np.zeros(sum(sizes), dtype=np.int64)
+        self._probability_counts = np.zeros(len(reference.probability_edges) + 1, dtype=np.int64)
+        self._column_index = {}
+        self._lock = threading.Lock()
+        self.rows = 0
+
+    def update(self, features, probabilities, columns=None):
+        """
+        Counts a batch of raw ``features`` and their ``probabilities``.
+        ``columns`` names the feature columns if they are not in the
+        reference order (e.g. FEATURE_COLUMNS); only the reference's are used.
+        """
+        features = np.asarray(features)
+        if columns is not None and list(columns) != self.feature_names:
+            key = tuple(columns)
+            if key not in self._column_index:
+                self._column_index[key] = np.array(
+                    [list(columns).index(name) for name in self.feature_names], dtype=np.intp
+                )
+            features = features[:, self._column_index[key]]
+
+        bins = np.empty(features.shape, dtype=np.intp)
+        for j, edges in enumerate(self.reference.edges):
+            bins[:, j] = np.searchsorted(edges, features[:, j], side='right')
+        bins += self._offsets
+        counts = np.bincount(bins.ravel(), minlength=len(self._counts))
+        probability_counts = np.bincount(
+            np.searchsorted(self.reference.probability_edges, probabilities, side='right'),
+            minlength=len(self._probability_counts)
+        )
+        with self._lock:
+            self._counts += counts
+            self._probability_counts += probability_counts
+            self.rows += len(features)
+
+    def snapshot(self):
+        """Copies of the per-feature and probability counts so far."""
+        with self._lock:
+            counts = self._counts.copy()
+            probability_counts = self._probability_counts.copy()
+        return np.split(counts, self._offsets[1:]), probability_counts
+
+    def reset(self):
+        """Starts a new monitoring window."""
+        with self._lock:
+            self._counts[:] = 0
+            self._probability_counts[:] = 0
+            self.rows = 0
+
+    def report(self, psi_alert=PSI_ALERT):
+        """
+        PSI and KS of each feature and of the probability against the
+        reference, with the features whose PSI reaches ``psi_alert``.
+        """
+        rows = self.rows
+        counts, probability_counts = self.snapshot()
+        reference = self.reference
+        features = {
+            name: {'psi': psi(expected, actual), 'ks': ks(expected, actual)}
+            for name, expected, actual in zip(self.feature_names, reference.counts, counts)
+        }
+        return {
+            'rows': rows,
+            'features': features,
+            'probability': {
+                'psi': psi(reference.probability_counts, probability_counts),
+                'ks': ks(reference.probability_counts, probability_counts)
+            },
+            'drifted': sorted((name for name, stats in features.items()
+                               if stats['psi'] >= psi_alert),
+                              key=lambda name: -features[name]['psi'])
+        }
+
+def write_drift_report(report, path):
+    """Logs a drift report's headline figures and writes it to ``path`` as JSON."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    logger.info("Drift over %d rows: score PSI=%.4f KS=%.4f", report['rows'],
+                report['probability']['psi'], report['probability']['ks'])
+    for name in report['drifted']:
+        logger.warning("Feature %s drifted: PSI=%.4f KS=%.4f", name,
+                       report['features'][name]['psi'], report['features'][name]['ks'])
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
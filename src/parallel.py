@@ -0,0 +1,208 @@
+"""
+Parallel featurization into a shared, memory-mapped feature matrix.
+
+The CSV is cut into byte-range shards on line boundaries. A process pool
+first counts the rows of every shard, which fixes the row at which each
+shard starts, then parses, cleans and featurizes the shards with
+feature_matrix writing straight into one float32 ``features.npy`` matrix
+(with ``labels.npy`` and ``ids.npy`` alongside) that every process maps.
+Nothing is pickled back to the parent but row counts.
+
+The arrays live in a scratch directory, on ``/dev/shm`` where available
+and large enough (a container's default is 64 MB; writing past a full
+tmpfs kills the process with SIGBUS rather than raising), so their pages
+are shared memory that the parent hands on without copying: training
+wraps them in a DataFrame (SharedFeatures.frame), and scoring workers map
+the same file and score their slice of it in place (see src.scoring).
+Removing the directory does not invalidate arrays that are already
+mapped; their memory is released once the last one is dropped.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from src.data_loader import iter_clean_range, read_header, DEFAULT_CHUNKSIZE
+from src.features import feature_matrix, FEATURE_COLUMNS
+from src.utils import logger
+
+DEFAULT_SHARD_BYTES = 32 * 2**20
+
+# Arrays of a SharedFeatures directory, mapped once per pool worker by _init_worker
+_WORKER_ARRAYS = {}
+
+# Room left for one extra per-row array (the scores of src.scoring)
+_EXTRA_ROW_BYTES = 8
+
+def _scratch_root(nbytes):
+    """
+    tmpfs when it has room for ``nbytes``, so that the mapped files never
+    touch disk; otherwise the system temporary directory.
+    """
+    if not os.path.isdir('/dev/shm'):
+        return None
+    stat = os.statvfs('/dev/shm')
+    free = stat.f_bavail * stat.f_frsize
+    if free >= nbytes:
+        return '/dev/shm'
+    logger.info("/dev/shm has %.0f MB free, %.0f MB needed; using %s instead.",
+                free / 2**20, nbytes / 2**20, tempfile.gettempdir())
+    return None
+
+class SharedFeatures:
+    """
+    Featurized rows in memory-mapped ``.npy`` files under ``directory``:
+    ``features`` (rows x FEATURE_COLUMNS, float32), ``ids`` (row numbers in
+    the source file) and ``labels`` (int8, None if the source has none).
+    Removes its directory on ``close`` or when used as a context manager.
+    """
+    def __init__(self, directory, rows):
+        self.directory = directory
+        self.rows = rows
+        self.features = self._open('features')[:rows]
+        self.ids = self._open('ids')[:rows]
+        labels = self._open('labels')
+        self.labels = None if labels is None else labels[:rows]
+
+    @classmethod
+    def allocate(cls, rows, labels=True, directory=None):
+        """
+        Creates the arrays for up to ``rows`` rows in a new scratch directory
+        under ``directory`` (see _scratch_root if None).
+        """
+        arrays = [('features', np.float32, (rows, len(FEATURE_COLUMNS))),
+                  ('ids', np.int64, (rows,))]
+        if labels:
+            arrays.append(('labels', np.int8, (rows,)))
+        if directory is None:
+            row_bytes = sum(np.dtype(dtype).itemsize * int(np.prod(shape[1:]))
+                            for _, dtype, shape in arrays)
+            directory = _scratch_root(rows * (row_bytes + _EXTRA_ROW_BYTES))
+        directory = tempfile.mkdtemp(prefix='cfd_shared_', dir=directory)
+        for name, dtype, shape in arrays:
+            np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode='w+',
+                                      dtype=dtype, shape=shape)
+        return cls(directory, rows)
+
+    def _open(self, name, mode='r+'):
+        path = os.path.join(self.directory, f"{name}.npy")
+        return np.load(path, mmap_mode=mode) if os.path.exists(path) else None
+
+    def array(self, name, dtype=np.float64):
+        """Creates (or opens) an extra per-row array, e.g. scores written by workers."""
+        path = os.path.join(self.directory, f"{name}.npy")
+        if os.path.exists(path):
+            return np.load(path, mmap_mode='r+')
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(self.rows,))
+
+    def frame(self, target_col='isFraud'):
+        """The features (and labels) as a DataFrame over the mapped arrays, without copying."""
+        data = pd.DataFrame(self.features, columns=FEATURE_COLUMNS, copy=False)
+        if self.labels is not None:
+            data[target_col] = self.labels
+        return data
+
+    def close(self):
+        """Removes the scratch directory; arrays already mapped stay valid."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def csv_shards(filepath, shard_bytes=DEFAULT_SHARD_BYTES):
+    """
+    Splits the data rows of a CSV file into [start, stop) byte ranges of
+    about ``shard_bytes`` that begin and end on line boundaries.
+    """
+    size = os.path.getsize(filepath)
+    shards = []
+    with open(filepath, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + shard_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            stop = f.tell()
+            shards.append((start, stop))
+            start = stop
+    return shards
+
+def _count_rows(task):
+    """Number of data rows in one shard (a last line without newline counts)."""
+    filepath, start, stop = task
+    rows = 0
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        last = b'\n'
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 24))
+            rows += block.count(b'\n')
+            remaining -= len(block)
+            last = block[-1:]
+    return rows + (last != b'\n')
+
+def _init_worker(directory, rows):
+    _WORKER_ARRAYS['shared'] = SharedFeatures(directory, rows)
+
+def _featurize_shard(task):
+    """Featurizes one shard into the shared arrays from row ``base``; returns rows written."""
+    filepath, start, stop, base, columns, chunksize = task
+    shared = _WORKER_ARRAYS['shared']
+    position = base
+    for chunk in iter_clean_range(filepath, start, stop, columns, chunksize=chunksize,
+                                  skip_names=True):
+        end = position + len(chunk)
+        feature_matrix(chunk, out=shared.features[position:end])
+        shared.ids[position:end] = base + chunk.index.to_numpy(dtype=np.int64)
+        if shared.labels is not None:
+            shared.labels[position:end] = chunk['isFraud'].to_numpy(dtype=np.int8)
+        position = end
+    return position - base
+
+def featurize_parallel(filepath, workers=None, shard_bytes=DEFAULT_SHARD_BYTES,
+                       chunksize=DEFAULT_CHUNKSIZE, directory=None):
+    """
+    Loads, cleans and featurizes ``filepath`` across ``workers`` processes
+    (all cores if None) into a SharedFeatures under ``directory`` (tmpfs if
+    it has room, else the system default, if None). Rows keep their order in the file.
+    """
+    columns = read_header(filepath)
+    shards = csv_shards(filepath, shard_bytes)
+    workers = workers or os.cpu_count()
+    logger.info("Featurizing %s in %s shards with %s workers...", filepath, len(shards), workers)
+
+    with multiprocessing.Pool(workers) as pool:
+        counts = pool.map(_count_rows, [(filepath, start, stop) for start, stop in shards])
+    bases = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    if not bases[-1]:
+        raise ValueError(f"No rows in {filepath}")
+    shared = SharedFeatures.allocate(int(bases[-1]), labels='isFraud' in columns,
+                                     directory=directory)
+    try:
+        tasks = [(filepath, start, stop, int(base), columns, chunksize)
+                 for (start, stop), base in zip(shards, bases)]
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(shared.directory, shared.rows)) as pool:
+            written = pool.map(_featurize_shard, tasks)
+    except BaseException:
+        shared.close()
+        raise
+
+    # Rows dropped in cleaning leave gaps at the end of their shard; close them
+    rows = 0
+    for base, count in zip(bases, written):
+        if base != rows:
+            for array in (shared.features, shared.ids, shared.labels):
+                if array is not None:
+                    array[rows:rows + count] = array[base:base + count]
+        rows += count
+    if rows < shared.rows:
+        logger.warning("Dropped %s rows with null values.", shared.rows - rows)
+    logger.info("Featurized %s rows into %s.", rows, shared.directory)
+    return SharedFeatures(shared.directory, rows)
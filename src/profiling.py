@@ -0,0 +1,284 @@
+"""
+Timing and memory spans for the audit log.
+
+A span measures one pipeline stage and logs a structured ``span`` record
+(see setup_logging) when it ends::
+
+    with span('load_data') as stage:
+        data = load_data(path)
+        stage.rows_out = len(data)
+
+    @traced('train')
+    def train(self, X_train, y_train): ...
+
+Each record holds the stage name, its parent span, wall and CPU seconds, rows
+in and out, the process peak RSS and how much the stage raised it. Spans can
+also be profiled: ``enable_profiling`` (``--profile`` on the command line)
+runs the chosen stages under cProfile or tracemalloc and writes the results
+next to the log.
+
+``python -m src.profiling [audit file]`` summarizes a run's spans into a
+stage breakdown (the latest audit file in logs/ by default).
+"""
+import functools
+import glob
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from src.utils import logger
+
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+# Stages to profile, set by enable_profiling
+_PROFILING = {'stages': frozenset(), 'mode': 'cprofile', 'directory': 'reports/profiles'}
+
+_ACTIVE = threading.local()
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB (``VmHWM``
+    where available, which unlike ``ru_maxrss`` is not inherited over exec).
+    """
+    try:
+        with open('/proc/self/status', encoding='utf-8') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def count_rows(value):
+    """Rows of an array, frame or sequence; None for anything else."""
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    if isinstance(value, list):
+        return len(value)
+    return None
+
+def enable_profiling(stages, mode='cprofile', directory='reports/profiles'):
+    """
+    Profiles the spans named in ``stages`` ('all' for every span) with
+    ``mode`` ('cprofile' or 'tracemalloc'), writing to ``directory``.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode}; expected one of {PROFILE_MODES}")
+    _PROFILING.update(stages=frozenset(stages or ()), mode=mode, directory=directory)
+
+def _profiled(stage):
+    stages = _PROFILING['stages']
+    return stage in stages or 'all' in stages
+
+class Span:
+    """
+    Context manager measuring one stage; set ``rows_out`` (and ``rows_in``
+    if not given up front) before it exits.
+    """
+    def __init__(self, stage, rows_in=None):
+        self.stage = stage
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.parent = None
+        self._start = None
+        self._profiler = None
+
+    def __enter__(self):
+        stack = getattr(_ACTIVE, 'stack', None)
+        if stack is None:
+            stack = _ACTIVE.stack = []
+        self.parent = stack[-1].stage if stack else None
+        # Spans nested in a profiled span are covered by its profile
+        if _profiled(self.stage) and all(active._profiler is None for active in stack):
+            self._start_profiler()
+        stack.append(self)
+        self._start = (time.perf_counter(), time.process_time(), peak_rss_mb())
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall, cpu, rss = self._start
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        peak = peak_rss_mb()
+        _ACTIVE.stack.pop()
+        fields = {
+            'stage': self.stage,
+            'parent': self.parent,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'peak_rss_mb': round(peak, 1),
+            'peak_rss_delta_mb': round(peak - rss, 1),
+            'failed': exc_type is not None
+        }
+        if self._profiler is not None:
+            fields['profile'] = self._stop_profiler()
+        logger.info("Stage %s: %.3fs wall, %.3fs CPU, rows %s -> %s, peak RSS %.0f MB (+%.1f MB)",
+                    self.stage, wall, cpu, self.rows_in, self.rows_out, peak, peak - rss,
+                    extra={'span': fields})
+        return False
+
+    def _start_profiler(self):
+        # pylint: disable=import-outside-toplevel
+        if _PROFILING['mode'] == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            import tracemalloc
+            # True when this span started tracing and must stop it
+            self._profiler = not tracemalloc.is_tracing()
+            if self._profiler:
+                tracemalloc.start(10)
+            tracemalloc.reset_peak()
+
+    def _stop_profiler(self):
+        """Stops the stage's profiler, writes its output and returns the path."""
+        # pylint: disable=import-outside-toplevel
+        directory = _PROFILING['directory']
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        if _PROFILING['mode'] == 'cprofile':
+            import pstats
+            self._profiler.disable()
+            path = os.path.join(directory, f"{self.stage}_{stamp}.prof")
+            self._profiler.dump_stats(path)
+            # stats maps (file, line, function) to (calls, primitive calls,
+            # own time, cumulative time, callers)
+            stats = pstats.Stats(self._profiler).stats
+            top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:10]
+            logger.info("Profile of %s written to %s; top cumulative: %s", self.stage, path,
+                        [f"{func[2]} ({func[0]}:{func[1]}) {values[3]:.3f}s"
+                         for func, values in top])
+            return path
+
+        import tracemalloc
+        _, traced_peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if self._profiler:
+            tracemalloc.stop()
+        path = os.path.join(directory, f"{self.stage}_{stamp}.tracemalloc")
+        snapshot.dump(path)
+        top = snapshot.statistics('lineno')[:10]
+        logger.info("Traced allocations of %s written to %s; peak %.1f MB; largest: %s",
+                    self.stage, path, traced_peak / 2**20,
+                    [f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+                     f"{stat.size / 2**20:.1f} MB" for stat in top])
+        return path
+
+def span(stage, rows_in=None):
+    """Returns a Span for ``stage`` (see Span)."""
+    return Span(stage, rows_in=rows_in)
+
+def traced(stage, rows_out=count_rows):
+    """
+    Decorator running a function or method inside a span. Rows in are
+    counted from the first positional argument that has rows; rows out from
+    the result with ``rows_out``.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows_in = next((rows for rows in map(count_rows, args) if rows is not None), None)
+            with Span(stage, rows_in=rows_in) as current:
+                result = func(*args, **kwargs)
+                current.rows_out = rows_out(result)
+            return result
+        return wrapper
+    return decorate
+
+def read_spans(path):
+    """Returns the span records of a JSON audit file, in order."""
+    spans = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'span' in record:
+                spans.append(record['span'])
+    return spans
+
+def summarize(spans):
+    """
+    Aggregates spans per (parent, stage), in order of first appearance.
+    Returns a list of dicts with calls, total wall/CPU seconds, rows and the
+    largest peak RSS increase, and each top-level stage's share of the run.
+    """
+    stages = {}
+    for record in spans:
+        key = (record.get('parent'), record['stage'])
+        entry = stages.setdefault(key, {
+            'stage': record['stage'], 'parent': record.get('parent'), 'calls': 0,
+            'wall_s': 0.0, 'cpu_s': 0.0, 'rows_in': None, 'rows_out': None,
+            'peak_rss_delta_mb': 0.0, 'peak_rss_mb': 0.0
+        })
+        entry['calls'] += 1
+        entry['wall_s'] += record['wall_s']
+        entry['cpu_s'] += record['cpu_s']
+        for rows in ('rows_in', 'rows_out'):
+            if record.get(rows) is not None:
+                entry[rows] = (entry[rows] or 0) + record[rows]
+        entry['peak_rss_delta_mb'] = max(entry['peak_rss_delta_mb'], record['peak_rss_delta_mb'])
+        entry['peak_rss_mb'] = max(entry['peak_rss_mb'], record['peak_rss_mb'])
+
+    total = sum(entry['wall_s'] for entry in stages.values() if entry['parent'] is None)
+    for entry in stages.values():
+        entry['share'] = entry['wall_s'] / total if entry['parent'] is None and total else None
+    return list(stages.values())
+
+def _depth(entry, parents):
+    depth, parent = 0, entry['parent']
+    while parent is not None and depth < 10:
+        depth += 1
+        parent = parents.get(parent)
+    return depth
+
+def format_summary(summary):
+    """Formats summarize() output as an indented table."""
+    parents = {entry['stage']: entry['parent'] for entry in summary}
+    lines = [f"{'stage':32s} {'calls':>5s} {'wall s':>9s} {'cpu s':>9s} {'share':>6s} "
+             f"{'rows in':>11s} {'rows out':>11s} {'+peak MB':>9s}"]
+    # Children right after their parent
+    ordered = []
+    def add(parent):
+        for entry in summary:
+            if entry['parent'] == parent and entry not in ordered:
+                ordered.append(entry)
+                add(entry['stage'])
+    add(None)
+    ordered += [entry for entry in summary if entry not in ordered]
+    for entry in ordered:
+        name = '  ' * _depth(entry, parents) + entry['stage']
+        share = '' if entry['share'] is None else f"{entry['share']:.0%}"
+        rows_in, rows_out = ('-' if entry[rows] is None else f"{entry[rows]:,d}"
+                             for rows in ('rows_in', 'rows_out'))
+        lines.append(f"{name:32s} {entry['calls']:5d} {entry['wall_s']:9.3f} "
+                     f"{entry['cpu_s']:9.3f} {share:>6s} {rows_in:>11s} "
+                     f"{rows_out:>11s} {entry['peak_rss_delta_mb']:9.1f}")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    """Prints the stage breakdown of an audit file (the latest in logs/ by default)."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        path = argv[0]
+    else:
+        audits = sorted(glob.glob(os.path.join('logs', 'audit_*.json')))
+        if not audits:
+            print("No audit files in logs/")
+            return 1
+        path = audits[-1]
+    spans = read_spans(path)
+    print(f"{path}: {len(spans)} spans")
+    print(format_summary(summarize(spans)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Incremental model refresh.
+
+FraudDetector.update extends a fitted model with a window of new rows
+instead of retraining on the whole history: random forests get extra trees
+fitted on the window (and can retire trees whose training data has grown
+too old), XGBoost boosts extra rounds from the existing booster.
+
+The scaler statistics are updated with ``StandardScaler.partial_fit``, so
+its mean and variance cover every row the model has seen. Existing trees
+split on values scaled with the old statistics; before the new trees are
+fitted their split thresholds are rewritten into the new scaling.
+Thresholds go through raw space the way src.compiled folds them, with
+float32 arithmetic, so rows on a split value stay on their side. That is
+only possible while the new scaling keeps neighbouring raw values apart:
+scaled float32 values are coarse where a feature's mean is far from its
+values (errorBalanceOrig near 0 with a mean in the 1e5s), and XGBoost cuts
+sit on data values. rescale_model therefore checks the rescaled trees
+against the originals on the update window; FraudDetector.update keeps the
+previous scaler when any score would change.
+"""
+import copy
+import json
+import numpy as np
+from src.compiled import fold_thresholds
+
+# Trees (random forest) or boosting rounds (XGBoost) added per update
+DEFAULT_UPDATE_TREES = {'rf': 20, 'xgb': 50}
+
+# XGBoost max_delta_step for the rounds an update adds, unless the model sets one
+UPDATE_MAX_DELTA_STEP = 1.0
+
+def _affine(scaler, n_features):
+    """The float32 (mean, scale) a scaler applies, identity where unset."""
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(n_features) if mean is None else mean
+    scale = np.ones(n_features) if scale is None else scale
+    return np.asarray(mean, dtype=np.float32), np.asarray(scale, dtype=np.float32)
+
+def _rescale(thresholds, features, old, new, strict):
+    """
+    Maps thresholds on ``features`` from the ``old`` to the ``new`` (mean,
+    scale): a float32 raw value goes left under the new threshold exactly
+    when it went left under the old one (unless the new scaling maps it and
+    its float32 successor to the same value).
+    """
+    raw = fold_thresholds(thresholds, old[0][features], old[1][features], strict=strict)
+    with np.errstate(invalid='ignore', over='ignore'):
+        scaled = (raw - new[0][features]) / new[1][features]
+    # raw <= T goes left; strict splits (x < t) need the next float32 up
+    return np.nextafter(scaled, np.float32(np.inf)) if strict else scaled
+
+def rescale_forest(model, old_scaler, new_scaler):
+    """Rewrites the split thresholds of a fitted RandomForestClassifier in place."""
+    old = _affine(old_scaler, model.n_features_in_)
+    new = _affine(new_scaler, model.n_features_in_)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        # tree_.threshold is a view of the node array
+        thresholds = tree.threshold
+        split = tree.children_left >= 0
+        thresholds[split] = _rescale(thresholds[split], tree.feature[split], old, new,
+                                     strict=False)
+    return model
+
+def rescale_booster(booster, old_scaler, new_scaler, n_features):
+    """Returns a copy of an XGBoost Booster with its split conditions rescaled."""
+    import xgboost # pylint: disable=import-outside-toplevel
+    old = _affine(old_scaler, n_features)
+    new = _affine(new_scaler, n_features)
+    state = json.loads(booster.save_raw('json'))
+    for tree in state['learner']['gradient_booster']['model']['trees']:
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # Leaf nodes keep their weight in split_conditions
+        split = np.asarray(tree['left_children']) >= 0
+        features = np.asarray(tree['split_indices'], dtype=np.intp)[split]
+        conditions[split] = _rescale(conditions[split].astype(np.float64), features, old, new,
+                                     strict=True)
+        tree['split_conditions'] = conditions.tolist()
+    rescaled = xgboost.Booster()
+    rescaled.load_model(bytearray(json.dumps(state).encode('utf-8')))
+    return rescaled
+
+def _positive_scores(model, model_type, features):
+    """Fraud scores of a fitted forest or an XGBoost Booster on scaled features."""
+    if model_type == 'rf':
+        return model.predict_proba(features)[:, list(model.classes_).index(1)]
+    return model.inplace_predict(features)
+
+def rescale_model(model, model_type, old_scaler, new_scaler, X):
+    """
+    Returns a copy of a fitted 'rf' model, or the Booster of an 'xgb'
+    model, with its thresholds moved from ``old_scaler`` to ``new_scaler``
+    scaling, and how many rows of the raw window ``X`` it scores differently
+    from the original.
+    """
+    if model_type == 'rf':
+        original = model
+        rescaled = rescale_forest(copy.deepcopy(model), old_scaler, new_scaler)
+    else:
+        original = model.get_booster()
+        rescaled = rescale_booster(original, old_scaler, new_scaler, X.shape[1])
+    before = _positive_scores(original, model_type, old_scaler.transform(X))
+    after = _positive_scores(rescaled, model_type, new_scaler.transform(X))
+    return rescaled, int(np.count_nonzero(np.abs(after - before) > 1e-6))
+
+def refresh_seed(random_state, update):
+    """
+    The random_state of the trees or rounds added by the ``update``-th
+    refresh: derived from the model's own seed, so refreshes stay
+    reproducible without every refresh drawing the same bootstrap samples
+    and feature subsets. None stays None.
+    """
+    if random_state is None:
+        return None
+    return int(np.random.SeedSequence([random_state, update]).generate_state(1)[0])
+
+def retire_trees(tree_steps, newest_step, max_tree_age):
+    """
+    Indices of the trees to keep: those whose training window ended at most
+    ``max_tree_age`` steps before ``newest_step`` (all with None).
+    """
+    if not max_tree_age:
+        return list(range(len(tree_steps)))
+    return [i for i, step in enumerate(tree_steps) if newest_step - step <= max_tree_age]
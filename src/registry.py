@@ -0,0 +1,182 @@
+"""
+Local file-based model registry.
+
+Every registered model becomes an immutable version directory:
+
+    <root>/versions/v0001/model/          artifact directory (see src.artifact)
+    <root>/versions/v0001/metadata.json   feature schema, metrics, data fingerprint
+    <root>/CURRENT                        {"version": ...}, the version to serve
+    <root>/history.jsonl                  every change of CURRENT
+
+Versions are written into a staging directory and renamed into place, so a
+version either exists completely or not at all, and their files are made
+read-only. CURRENT is replaced atomically with ``os.replace``: readers see
+the old pointer or the new one, never a partial file. Long-running scorers
+pick up a new CURRENT through src.hotswap.
+
+Usage:
+    python -m src.registry list [--registry models/registry]
+    python -m src.registry show v0003
+    python -m src.registry promote v0002      # also rolls back
+"""
+import argparse
+import json
+import os
+import shutil
+import stat
+import time
+from src.features import FEATURE_VERSION
+from src.utils import logger
+
+DEFAULT_REGISTRY = os.path.join('models', 'registry')
+
+METADATA = 'metadata.json'
+MODEL_DIR = 'model'
+CURRENT = 'CURRENT'
+HISTORY = 'history.jsonl'
+
+def _version_name(number):
+    return f"v{number:04d}"
+
+def _freeze(directory):
+    """Makes every file under ``directory`` read-only."""
+    for parent, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(parent, name)
+            os.chmod(path, os.stat(path).st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+class ModelRegistry:
+    """
+    Immutable model versions under ``root`` with an atomic CURRENT pointer.
+    """
+    def __init__(self, root=DEFAULT_REGISTRY):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+
+    def versions(self):
+        """Registered version names, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir)
+                      if name.startswith('v') and name[1:].isdigit()
+                      and os.path.isfile(os.path.join(self.versions_dir, name, METADATA)))
+
+    def _check(self, version):
+        if version not in self.versions():
+            raise ValueError(f"No model version {version} in registry {self.root}")
+
+    def metadata(self, version):
+        """The metadata recorded with ``version``."""
+        self._check(version)
+        with open(os.path.join(self.versions_dir, version, METADATA), encoding='utf-8') as f:
+            return json.load(f)
+
+    def model_path(self, version=None):
+        """The model artifact of ``version`` (CURRENT by default)."""
+        version = version or self.current()
+        if version is None:
+            raise ValueError(f"Registry {self.root} has no current model version")
+        self._check(version)
+        return os.path.join(self.versions_dir, version, MODEL_DIR)
+
+    def register(self, detector, metrics=None, data_fingerprint=None, promote=True, **extra):
+        """
+        Saves ``detector`` as a new immutable version with its metadata and
+        returns the version name; with ``promote`` it becomes CURRENT.
+        ``extra`` keyword arguments are recorded in the metadata as they are.
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = os.path.join(self.versions_dir, f".staging-{os.getpid()}-{time.time_ns()}")
+        os.makedirs(staging)
+        try:
+            detector.save_model(os.path.join(staging, MODEL_DIR))
+            metadata = {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'model_type': detector.model_type,
+                'feature_names': detector.feature_names,
+                'feature_version': FEATURE_VERSION,
+                'threshold': detector.threshold,
+                'metrics': metrics,
+                'data_fingerprint': data_fingerprint,
+                'parent': self.current(),
+                'updates': len((detector.refresh or {}).get('history', [])),
+                **extra
+            }
+            # Claim the next free number; rename fails if another writer took it
+            while True:
+                existing = self.versions()
+                version = _version_name(int(existing[-1][1:]) + 1 if existing else 1)
+                metadata['version'] = version
+                with open(os.path.join(staging, METADATA), 'w', encoding='utf-8') as f:
+                    json.dump(metadata, f, indent=2)
+                try:
+                    os.rename(staging, os.path.join(self.versions_dir, version))
+                    break
+                except OSError:
+                    if not os.path.isdir(os.path.join(self.versions_dir, version)):
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        _freeze(os.path.join(self.versions_dir, version))
+        logger.info("Registered model version %s in %s", version, self.root)
+        if promote:
+            self.promote(version)
+        return version
+
+    def current(self):
+        """The version CURRENT points to, or None."""
+        try:
+            with open(os.path.join(self.root, CURRENT), encoding='utf-8') as f:
+                return json.load(f)['version']
+        except FileNotFoundError:
+            return None
+
+    def promote(self, version):
+        """Points CURRENT at ``version`` (a newer one or a rollback)."""
+        self._check(version)
+        previous = self.current()
+        entry = {'version': version, 'previous': previous,
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+        tmp_path = os.path.join(self.root, f"{CURRENT}.tmp{os.getpid()}")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, CURRENT))
+        with open(os.path.join(self.root, HISTORY), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        logger.info("Registry %s: current model %s -> %s", self.root, previous, version)
+
+    def load(self, version=None):
+        """Loads ``version`` (CURRENT by default) into a FraudDetector."""
+        from src.model import FraudDetector # pylint: disable=import-outside-toplevel
+        detector = FraudDetector()
+        detector.load_model(self.model_path(version))
+        return detector
+
+def main():
+    """Lists, shows and promotes registry versions."""
+    parser = argparse.ArgumentParser(description="Model registry")
+    parser.add_argument('command', choices=['list', 'show', 'promote'])
+    parser.add_argument('version', nargs='?')
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY)
+    args = parser.parse_args()
+    registry = ModelRegistry(args.registry)
+
+    if args.command == 'list':
+        current = registry.current()
+        for version in registry.versions():
+            metadata = registry.metadata(version)
+            auc = (metadata.get('metrics') or {}).get('auc')
+            print(f"{'*' if version == current else ' '} {version}  {metadata['created']}  "
+                  f"{metadata['model_type']:3s}  auc={auc}  parent={metadata['parent']}")
+    elif args.version is None:
+        parser.error(f"{args.command} needs a version")
+    elif args.command == 'show':
+        print(json.dumps(registry.metadata(args.version), indent=2))
+    else:
+        registry.promote(args.version)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Time-ordered replay of a PaySim file through the online scoring path.
+
+Transactions are streamed in ``step`` order and sent one per request to a
+ScoringServer in this process, which parses, validates, micro-batches,
+scores (score_many) and audits them exactly as it does for HTTP requests.
+
+Pacing:
+    speed > 0   open loop: one PaySim step (an hour) takes 3600 / speed
+                seconds and the transactions of a step are spread evenly
+                over it. Latency is measured from each transaction's
+                scheduled time, so time spent waiting to be sent while the
+                stack is saturated is counted instead of hidden.
+    speed = 0   maximum speed: ``in_flight`` requests are kept outstanding
+                and latency is measured from the actual send.
+
+Per-transaction latency goes into log-linear histograms (HDR-style: every
+value is kept to within 1/128 of itself, in a fixed 26 KB array). Every
+``interval`` seconds a window with the throughput, latency percentiles,
+queue depth and audit drops is recorded. Backpressure events are recorded
+as episodes:
+    shed              the server refused requests (503, queue full)
+    in_flight_limit   the replayer had ``in_flight`` requests outstanding
+                      and waited before sending
+    behind_schedule   transactions went out more than ``lag_threshold``
+                      seconds after their scheduled time
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from src.audit import active_writer
+from src.data_loader import iter_chunks, DEFAULT_CHUNKSIZE
+from src.server import ScoringServer
+from src.utils import logger
+
+SECONDS_PER_STEP = 3600
+
+# Histogram layout: values below 2**SUB_BITS microseconds are exact, larger
+# ones fall in buckets 1/HALF of their magnitude wide, up to MAX_MAGNITUDE
+SUB_BITS = 8
+HALF = 1 << (SUB_BITS - 1)
+MAX_MAGNITUDE = 32
+
+# Episodes of one kind closer than this many seconds are merged
+EPISODE_GAP = 1.0
+MAX_EPISODES = 1000
+
+REPORTED_PERCENTILES = (50, 90, 99, 99.9, 99.99)
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in microseconds (see the module docstring).
+    """
+    def __init__(self):
+        self.counts = np.zeros((1 << SUB_BITS) + (MAX_MAGNITUDE - SUB_BITS) * HALF,
+                               dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0
+
+    @staticmethod
+    def index(value):
+        """Bucket index of a value in microseconds."""
+        if value < (1 << SUB_BITS):
+            return value
+        shift = value.bit_length() - SUB_BITS
+        return (1 << SUB_BITS) + (shift - 1) * HALF + (value >> shift) - HALF
+
+    @staticmethod
+    def highest_equivalent(index):
+        """The largest value that falls in bucket ``index``."""
+        if index < (1 << SUB_BITS):
+            return index
+        shift = (index - (1 << SUB_BITS)) // HALF + 1
+        sub = (index - (1 << SUB_BITS)) % HALF + HALF
+        return ((sub + 1) << shift) - 1
+
+    def record(self, seconds):
+        """Adds one latency given in seconds."""
+        value = min(max(int(seconds * 1e6), 0), (1 << MAX_MAGNITUDE) - 1)
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """The latency in microseconds that ``percent`` of the values do not exceed."""
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(percent / 100 * self.count))
+        index = int(np.searchsorted(np.cumsum(self.counts), target))
+        return min(self.highest_equivalent(index), self.max)
+
+    def summary(self):
+        """Count, mean, percentiles and max in milliseconds."""
+        summary = {'count': self.count,
+                   'mean_ms': round(self.total / self.count / 1000, 3) if self.count else 0.0}
+        for percent in REPORTED_PERCENTILES:
+            summary[f'p{percent:g}_ms'] = round(self.percentile(percent) / 1000, 3)
+        summary['max_ms'] = round(self.max / 1000, 3)
+        return summary
+
+    def percentile_distribution(self, ticks_per_half_distance=5):
+        """
+        The histogram as HdrHistogram's text percentile distribution (values
+        in milliseconds), which the HdrHistogram plotting tools read.
+        """
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}",
+                 '']
+        cumulative = np.cumsum(self.counts)
+        # Ticks get twice as dense each time the remaining distance to 100% halves
+        levels, percent = [], 0.0
+        while self.count and (100 - percent) / 100 * self.count >= 1:
+            levels.append(percent)
+            ticks = ticks_per_half_distance * 2 ** (int(math.log2(100 / (100 - percent))) + 1)
+            percent += 100 / ticks
+        for percent in levels + [100.0] if self.count else []:
+            value = self.percentile(percent)
+            total = int(cumulative[self.index(value)])
+            inverse = f"{1 / (1 - percent / 100):14.2f}" if percent < 100 else ''
+            lines.append(f"{value / 1000:12.3f} {percent / 100:14.12f} {total:10d} {inverse}")
+        buckets = int(np.count_nonzero(self.counts))
+        lines.append(f"#[Mean    = {self.total / max(self.count, 1) / 1000:12.3f}, "
+                     f"Max         = {self.max / 1000:12.3f}]")
+        lines.append(f"#[Total count    = {self.count:12d}, Buckets     = {buckets:12d}]")
+        return '\n'.join(lines) + '\n'
+
+def iter_steps(filepath, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yields (step, frame of that step's raw transactions) from a PaySim CSV
+    in step order. The file is streamed in chunks; only the step that runs
+    over a chunk boundary is carried into the next chunk. Raises ValueError
+    if the file is not sorted by step.
+    """
+    pending = None
+    for chunk in iter_chunks(filepath, chunksize=chunksize, skip_names=True):
+        if pending is not None:
+            chunk = pd.concat([pending, chunk])
+        steps = chunk['step'].to_numpy()
+        if (np.diff(steps) < 0).any():
+            raise ValueError(f"{filepath} is not in step order; sort it by step to replay it")
+        bounds = [0, *(np.flatnonzero(np.diff(steps)) + 1), len(chunk)]
+        for start, stop in zip(bounds[:-2], bounds[1:-1]):
+            yield int(steps[start]), chunk.iloc[start:stop]
+        pending = chunk.iloc[bounds[-2]:]
+    if pending is not None and len(pending):
+        yield int(pending['step'].iloc[0]), pending
+
+def _iter_records(filepath, chunksize, max_rows=None):
+    """
+    Yields (step, request dicts) per step, the dicts carrying the row
+    number as 'id' and no labels, stopping after ``max_rows`` transactions.
+    """
+    remaining = max_rows
+    for step, frame in iter_steps(filepath, chunksize=chunksize):
+        if remaining is not None:
+            if remaining <= 0:
+                return
+            frame = frame.iloc[:remaining]
+            remaining -= len(frame)
+        records = frame.drop(columns=['isFraud', 'isFlaggedFraud'],
+                             errors='ignore').to_dict('records')
+        for row, record in zip(frame.index, records):
+            record['id'] = int(row)
+        yield step, records
+
+class Episodes:
+    """Backpressure episodes per kind (see the module docstring)."""
+    def __init__(self):
+        self.episodes = []
+        self.counts = {}
+        self._open = {}
+
+    def mark(self, kind, elapsed, amount=1):
+        """Records ``amount`` events of ``kind`` at ``elapsed`` seconds into the replay."""
+        self.counts[kind] = self.counts.get(kind, 0) + amount
+        episode = self._open.get(kind)
+        if episode is not None and elapsed - episode['end_s'] <= EPISODE_GAP:
+            episode['end_s'] = round(elapsed, 3)
+            episode['events'] += amount
+            return
+        episode = {'kind': kind, 'start_s': round(elapsed, 3), 'end_s': round(elapsed, 3),
+                   'events': amount}
+        self._open[kind] = episode
+        if len(self.episodes) < MAX_EPISODES:
+            self.episodes.append(episode)
+
+class Replayer:
+    """
+    Replays a PaySim file through a ScoringServer (see the module docstring).
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, server, speed=0.0, in_flight=1024, interval=1.0, max_rows=None,
+                 lag_threshold=0.1):
+        self.server = server
+        self.speed = speed
+        self.in_flight = in_flight
+        self.interval = interval
+        self.max_rows = max_rows
+        self.lag_threshold = lag_threshold
+        self.end_to_end = LatencyHistogram()
+        # From the actual send; equals end_to_end at maximum speed
+        self.service = LatencyHistogram()
+        self.episodes = Episodes()
+        self.windows = []
+        self.outcomes = {'sent': 0, 'scored': 0, 'shed': 0, 'rejected': 0, 'failed': 0}
+        self.outstanding = 0
+        self._window = None
+        self._slots = None
+        self._started = None
+        self._step = None
+
+    async def run(self, filepath, chunksize=DEFAULT_CHUNKSIZE):
+        """Replays ``filepath`` and returns the report."""
+        loop = asyncio.get_running_loop()
+        # Parsing and converting the next step overlaps with sending this one
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='replay-reader')
+        steps = _iter_records(filepath, chunksize, self.max_rows)
+        try:
+            item = await loop.run_in_executor(reader, next, steps, None)
+            if item is None:
+                raise ValueError(f"No transactions to replay in {filepath}")
+            first_step = item[0]
+            # Warm up outside the measurement (buffers, feature index, page cache)
+            if getattr(self.server.batcher.detector, 'monitor', None) is None:
+                await loop.run_in_executor(self.server.batcher.executor,
+                                           self.server.batcher.detector.score_many,
+                                           item[1][:self.server.batcher.max_batch])
+
+            self._slots = asyncio.Semaphore(self.in_flight)
+            self._started = time.perf_counter()
+            self._new_window()
+            ticker = asyncio.create_task(self._tick())
+            pending = set()
+            try:
+                while item is not None:
+                    step, records = item
+                    self._step = last_step = step
+                    upcoming = loop.run_in_executor(reader, next, steps, None)
+                    await self._send_step(records, step - first_step, pending)
+                    item = await upcoming
+                if pending:
+                    await asyncio.wait(pending)
+            finally:
+                ticker.cancel()
+        finally:
+            reader.shutdown(wait=False, cancel_futures=True)
+        self._close_window()
+        seconds = time.perf_counter() - self._started
+        writer = active_writer()
+        if writer is not None:
+            writer.flush()
+        return {
+            'file': filepath,
+            'speed': self.speed or 'max',
+            'in_flight': self.in_flight,
+            'steps': [first_step, last_step],
+            'seconds': round(seconds, 3),
+            'throughput_tps': round(self.outcomes['scored'] / seconds, 1) if seconds else 0.0,
+            'outcomes': self.outcomes,
+            'end_to_end': self.end_to_end.summary(),
+            'service': self.service.summary(),
+            'backpressure': {'counts': self.episodes.counts,
+                             'episodes': self.episodes.episodes},
+            'batching': self.server.batcher.health(),
+            'audit': None if writer is None else dict(writer.stats),
+            'windows': self.windows
+        }
+
+    async def _send_step(self, records, step_offset, pending):
+        """Sends one step's transactions, on schedule unless at maximum speed."""
+        for i, record in enumerate(records):
+            if self.speed:
+                scheduled = self._started + (step_offset + i / len(records)) \
+                    * SECONDS_PER_STEP / self.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif -delay > self.lag_threshold:
+                    self.episodes.mark('behind_schedule', time.perf_counter() - self._started)
+                    self._window['max_lag_ms'] = max(self._window['max_lag_ms'], -delay * 1000)
+            if self._slots.locked():
+                self.episodes.mark('in_flight_limit', time.perf_counter() - self._started)
+            await self._slots.acquire()
+            now = time.perf_counter()
+            if not self.speed:
+                scheduled = now
+            self.outcomes['sent'] += 1
+            self._window['sent'] += 1
+            self.outstanding += 1
+            task = asyncio.create_task(self._send(record, scheduled, now))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    async def _send(self, record, scheduled, sent):
+        try:
+            status, _ = await self.server.route('POST', '/score',
+                                                json.dumps(record).encode('utf-8'))
+        finally:
+            self.outstanding -= 1
+            self._slots.release()
+        done = time.perf_counter()
+        if status == 200:
+            self.outcomes['scored'] += 1
+            self.end_to_end.record(done - scheduled)
+            self.service.record(done - sent)
+            self._window['latency'].record(done - scheduled)
+        elif status == 503:
+            self.outcomes['shed'] += 1
+            self._window['shed'] += 1
+            self.episodes.mark('shed', done - self._started)
+        else:
+            self.outcomes['rejected' if status < 500 else 'failed'] += 1
+
+    def _new_window(self):
+        writer = active_writer()
+        self._window = {'start': time.perf_counter(), 'sent': 0, 'shed': 0, 'max_lag_ms': 0.0,
+                        'latency': LatencyHistogram(),
+                        'audit_dropped': writer.stats['dropped'] if writer else 0,
+                        'requests': self.server.batcher.stats['requests'],
+                        'batches': self.server.batcher.stats['batches']}
+
+    def _close_window(self):
+        window, now = self._window, time.perf_counter()
+        writer = active_writer()
+        stats = self.server.batcher.stats
+        latency = window['latency']
+        batches = stats['batches'] - window['batches']
+        self.windows.append({
+            't_s': round(window['start'] - self._started, 3),
+            'step': self._step,
+            'sent': window['sent'],
+            'scored': latency.count,
+            'shed': window['shed'],
+            'throughput_tps': round(latency.count / max(now - window['start'], 1e-9), 1),
+            'p50_ms': round(latency.percentile(50) / 1000, 3),
+            'p99_ms': round(latency.percentile(99) / 1000, 3),
+            'max_ms': round(latency.max / 1000, 3),
+            'max_lag_ms': round(window['max_lag_ms'], 3),
+            'in_flight': self.outstanding,
+            'queue_depth': self.server.batcher.queue.qsize(),
+            'mean_batch': round((stats['requests'] - window['requests']) / batches, 1)
+                          if batches else 0.0,
+            'audit_dropped': (writer.stats['dropped'] if writer else 0) - window['audit_dropped']
+        })
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self._close_window()
+            self._new_window()
+
+def replay(detector, filepath, report_path='reports/replay.json', audit=True, speed=0.0,
+           in_flight=1024, interval=1.0, max_rows=None, chunksize=DEFAULT_CHUNKSIZE,
+           **batcher_options):
+    """
+    Replays ``filepath`` through a ScoringServer for ``detector``, writes the
+    report to ``report_path`` and the end-to-end latency histogram next to
+    it (``.hgrm``), and returns the report.
+    """
+    async def _main():
+        server = ScoringServer(detector, audit=audit, **batcher_options)
+        batcher_task = asyncio.create_task(server.batcher.run())
+        try:
+            replayer = Replayer(server, speed=speed, in_flight=in_flight, interval=interval,
+                                max_rows=max_rows)
+            return replayer, await replayer.run(filepath, chunksize=chunksize)
+        finally:
+            batcher_task.cancel()
+            server.swapper.shutdown()
+            server.batcher.executor.shutdown(wait=False)
+
+    replayer, report = asyncio.run(_main())
+    directory = os.path.dirname(report_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.splitext(report_path)[0] + '.hgrm', 'w', encoding='utf-8') as f:
+        f.write(replayer.end_to_end.percentile_distribution())
+    logger.info("Replayed %s transactions (steps %s-%s) in %.1fs: %.0f scored/s, %s",
+                report['outcomes']['sent'], *report['steps'], report['seconds'],
+                report['throughput_tps'], report['outcomes'])
+    logger.info("End-to-end latency: %s", report['end_to_end'])
+    logger.info("Backpressure: %s", report['backpressure']['counts'] or 'none')
+    logger.info("Replay report written to %s", report_path)
+    return report
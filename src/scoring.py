@@ -0,0 +1,219 @@
+"""
+Bulk batch scoring of transaction files.
+
+The input CSV is streamed through cleaning, the feature kernel and
+``FraudDetector.predict_proba`` chunk by chunk, optionally fanning chunks
+out to a process pool in which every worker loads the model once. Results
+are written incrementally, in input order, as (id, probability, label)
+where ``id`` is the row number in the input file.
+"""
+import collections
+import multiprocessing
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.artifact import is_artifact_dir, read_manifest
+from src.audit import audit_decisions
+from src.data_loader import iter_clean_chunks, DEFAULT_CHUNKSIZE
+from src.decision import decide, decision_threshold
+from src.features import feature_matrix, FEATURE_COLUMNS
+from src.model import FraudDetector
+from src.parallel import featurize_parallel, SharedFeatures
+from src.utils import logger
+
+OUTPUT_COLUMNS = ['id', 'probability', 'label']
+
+# Detector loaded once per pool worker by _init_worker
+_WORKER_DETECTOR = None
+# Shared feature matrix and output mapped once per worker by _init_shared_worker
+_WORKER_SHARED = {}
+
+def _load_detector(model_path, single_threaded=False):
+    detector = FraudDetector()
+    detector.load_model(model_path)
+    # Compiled models never touch the estimator (or read it from an artifact)
+    if single_threaded and detector.compiled is None and hasattr(detector.model, 'n_jobs'):
+        # Parallelism comes from the pool; avoid workers x cores threads
+        detector.model.set_params(n_jobs=1)
+    return detector
+
+def _stored_threshold(model_path):
+    """The operating point stored with a model; artifacts only read their manifest."""
+    if is_artifact_dir(model_path):
+        return read_manifest(model_path).get('threshold')
+    return _load_detector(model_path).threshold
+
+def _init_worker(model_path):
+    global _WORKER_DETECTOR # pylint: disable=global-statement
+    _WORKER_DETECTOR = _load_detector(model_path, single_threaded=True)
+
+def _score(detector, features):
+    frame = pd.DataFrame(features, columns=FEATURE_COLUMNS, copy=False)
+    return detector.predict_proba(frame)[:, 1]
+
+def _score_in_worker(ids, features):
+    return ids, _score(_WORKER_DETECTOR, features)
+
+def _init_shared_worker(model_path, directory, rows):
+    _init_worker(model_path)
+    _WORKER_SHARED['features'] = SharedFeatures(directory, rows)
+    _WORKER_SHARED['probabilities'] = _WORKER_SHARED['features'].array('probabilities')
+
+def _score_slice(bounds):
+    start, stop = bounds
+    features = _WORKER_SHARED['features'].features[start:stop]
+    _WORKER_SHARED['probabilities'][start:stop] = _score(_WORKER_DETECTOR, features)
+    return bounds
+
+def _iter_tasks(input_path, chunksize):
+    """Yields (row ids, feature matrix) per chunk of the input file."""
+    for chunk in iter_clean_chunks(input_path, chunksize=chunksize, skip_names=True):
+        yield chunk.index.to_numpy(dtype=np.int64), feature_matrix(chunk)
+
+class _CsvWriter:
+    def __init__(self, path):
+        # pylint: disable=consider-using-with
+        self.handle = open(path, 'w', encoding='utf-8', newline='')
+        self.header = True
+
+    def write(self, frame):
+        """Appends a chunk of results."""
+        frame.to_csv(self.handle, header=self.header, index=False, float_format='%.6f')
+        self.header = False
+
+    def close(self):
+        """Closes the output file."""
+        self.handle.close()
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            # pylint: disable=import-outside-toplevel
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from exc
+        self.pa = pa
+        self.writer = pq.ParquetWriter(path, pa.schema([
+            ('id', pa.int64()), ('probability', pa.float32()), ('label', pa.int8())
+        ]))
+
+    def write(self, frame):
+        """Appends a chunk of results as a row group."""
+        self.writer.write_table(self.pa.Table.from_pandas(frame, preserve_index=False))
+
+    def close(self):
+        """Finalizes the Parquet file."""
+        self.writer.close()
+
+def _open_writer(output_path, output_format):
+    directory = os.path.dirname(output_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    if output_format == 'parquet':
+        return _ParquetWriter(output_path)
+    return _CsvWriter(output_path)
+
+def score_file(model_path, input_path, output_path, chunksize=DEFAULT_CHUNKSIZE,
+               workers=1, threshold=None, output_format=None, audit=False, monitor=None,
+               shared=False, detector=None, scratch_dir=None):
+    """
+    Scores every transaction in ``input_path`` and writes the results to
+    ``output_path``.
+
+    With ``workers`` > 1 chunks are scored in a process pool; at most two
+    chunks per worker are in flight so memory stays bounded, and results are
+    written in input order. With ``shared`` the whole file is instead
+    featurized by the pool into one shared memory-mapped matrix (see
+    src.parallel) and each worker scores a slice of it in place, so no
+    feature chunk is pickled; memory then grows with the file, under
+    ``scratch_dir`` (tmpfs if it has room when None). Rows are
+    labelled fraud when their probability
+    reaches ``threshold``, by default the model's stored operating point
+    (FraudDetector.threshold) or 0.5. With ``audit`` every decision is
+    also recorded in the audit log (see src.audit). A DriftMonitor passed
+    as ``monitor`` is updated with every chunk. ``detector``, the model at
+    ``model_path`` if the caller has already loaded it, saves loading it
+    again in this process (pool workers still load their own). Returns the
+    number of rows scored.
+    """
+    if detector is None and workers <= 1 and not shared:
+        detector = _load_detector(model_path)
+    if threshold is None:
+        threshold = decision_threshold(
+            _stored_threshold(model_path) if detector is None else detector.threshold
+        )
+    if output_format is None:
+        output_format = 'parquet' if output_path.endswith('.parquet') else 'csv'
+
+    logger.info("Scoring %s with %s worker(s)...", input_path, workers)
+    start = time.perf_counter()
+    rows = 0
+    writer = _open_writer(output_path, output_format)
+    try:
+        if shared:
+            results = _iter_shared_results(model_path, input_path, chunksize, workers,
+                                           scratch_dir)
+        else:
+            results = _iter_results(model_path, input_path, chunksize, workers, detector)
+        for ids, features, probs in results:
+            if monitor is not None:
+                monitor.update(features, probs, columns=FEATURE_COLUMNS)
+            labels = decide(probs, threshold, np.int8)
+            if audit:
+                audit_decisions('score', ids, probs, labels)
+            writer.write(pd.DataFrame({
+                'id': ids,
+                'probability': probs.astype(np.float32),
+                'label': labels
+            }, columns=OUTPUT_COLUMNS))
+            rows += len(ids)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info("Scored %s rows in %.1fs (%.0f rows/s). Output: %s",
+                rows, elapsed, rows / elapsed if elapsed else 0.0, output_path)
+    return rows
+
+def _iter_results(model_path, input_path, chunksize, workers, detector=None):
+    """
+    Yields (row ids, raw features, fraud probabilities) per chunk, in input
+    order; a single worker scores with ``detector`` when given.
+    """
+    tasks = _iter_tasks(input_path, chunksize)
+    if workers <= 1:
+        if detector is None:
+            detector = _load_detector(model_path)
+        for ids, features in tasks:
+            yield ids, features, _score(detector, features)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        pending = collections.deque()
+        for ids, features in tasks:
+            pending.append((features, pool.apply_async(_score_in_worker, (ids, features))))
+            if len(pending) >= 2 * workers:
+                features, result = pending.popleft()
+                ids, probs = result.get()
+                yield ids, features, probs
+        while pending:
+            features, result = pending.popleft()
+            ids, probs = result.get()
+            yield ids, features, probs
+
+def _iter_shared_results(model_path, input_path, chunksize, workers, scratch_dir=None):
+    """
+    Like _iter_results, but featurizes the file into shared memory first and
+    has the pool score slices of it in place.
+    """
+    with featurize_parallel(input_path, workers, chunksize=chunksize,
+                            directory=scratch_dir) as shared:
+        probabilities = shared.array('probabilities')
+        bounds = [(start, min(start + chunksize, shared.rows))
+                  for start in range(0, shared.rows, chunksize)]
+        with multiprocessing.Pool(workers, initializer=_init_shared_worker,
+                                  initargs=(model_path, shared.directory, shared.rows)) as pool:
+            for start, stop in pool.imap(_score_slice, bounds):
+                yield shared.ids[start:stop], shared.features[start:stop], probabilities[start:stop]
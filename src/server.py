@@ -0,0 +1,320 @@
+"""
+Local asyncio HTTP scoring server with adaptive micro-batching.
+
+Concurrent requests are queued and collected into micro-batches of up to
+``max_batch`` transactions or ``max_wait_ms`` milliseconds, whichever comes
+first. Each batch is scored with a single ``FraudDetector.score_many`` call
+in a worker thread, so the event loop keeps accepting requests while the
+model runs. Batches grow on their own under load because requests pile up
+while the previous batch is being scored.
+
+Endpoints:
+    GET  /health  -> status, queue depth and batching statistics
+    GET  /drift   -> feature and score drift against the training reference
+                     (when the detector has a monitor, see src.monitoring)
+    GET  /model   -> serving model version and the state of the last hot swap
+    POST /model   -> {"version": ...} hot swaps to a registry version (see
+                     src.hotswap); 202 when started, 409 while a swap runs
+    POST /score   -> {"probability", "label"} for a transaction object, or a
+                     list of those for a list of transactions
+Requests arriving while ``max_queue`` requests are already queued are shed with 503.
+With a model registry, the server can also follow its CURRENT pointer and
+hot swap each newly promoted version in.
+"""
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.audit import audit_decisions
+from src.data_loader import RAW_NAMES, TRANSACTION_TYPES
+from src.decision import decide, decision_threshold
+from src.features import RAW_FEATURE_COLUMNS
+from src.hotswap import HotSwapper
+from src.utils import logger
+
+_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+            409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+MAX_BODY_BYTES = 1 << 20
+
+class Overloaded(Exception):
+    """Raised when the request queue is full and a request is shed."""
+
+def validate_record(record):
+    """
+    Raises ValueError unless ``record`` carries every field score_many needs:
+    a known transaction type and finite numbers.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Each transaction must be a JSON object")
+    if record.get('type') not in TRANSACTION_TYPES:
+        raise ValueError(f"Missing or unknown field: type (expected one of {TRANSACTION_TYPES})")
+    for name in RAW_FEATURE_COLUMNS:
+        value = record.get(name, record.get(RAW_NAMES.get(name, name)))
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Missing or non-numeric field: {name}")
+        try:
+            # JSON integers are unbounded; past the float range this overflows
+            finite = math.isfinite(float(value))
+        except OverflowError:
+            finite = False
+        if not finite:
+            raise ValueError(f"Non-finite value in field: {name}")
+
+class MicroBatcher:
+    """
+    Collects queued scoring requests into micro-batches and scores each batch
+    with one ``score_many`` call on a single worker thread.
+    """
+    def __init__(self, detector, max_batch=256, max_wait_ms=2.0, max_queue=1024):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        # One thread: score_many reuses per-detector buffers
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scorer')
+        self.stats = {'requests': 0, 'transactions': 0, 'batches': 0, 'shed': 0, 'errors': 0}
+        # Called with (records, probabilities) after every scored batch
+        self.observers = []
+
+    async def submit(self, records):
+        """
+        Queues ``records`` and returns their fraud probabilities and the
+        detector that scored them (the detector can be swapped between batches).
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((records, future))
+        except asyncio.QueueFull as exc:
+            self.stats['shed'] += 1
+            raise Overloaded() from exc
+        self.stats['requests'] += 1
+        return await future
+
+    async def _collect(self):
+        """Waits for one request, then gathers more until the batch is full or time is up."""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def run(self):
+        """Scores micro-batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            records = [record for item, _ in batch for record in item]
+            detector = self.detector
+            try:
+                probs = await loop.run_in_executor(self.executor, detector.score_many, records)
+            except Exception as exc: # pylint: disable=broad-except
+                logger.error("Scoring batch of %s failed: %s", len(records), exc)
+                self.stats['errors'] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.stats['batches'] += 1
+            self.stats['transactions'] += len(records)
+            offset = 0
+            for item, future in batch:
+                if not future.done():
+                    future.set_result((probs[offset:offset + len(item)], detector))
+                offset += len(item)
+            for observer in self.observers:
+                observer(records, probs)
+
+    def health(self):
+        """Returns the health payload."""
+        batches = self.stats['batches']
+        return {
+            'status': 'ok',
+            'model_type': self.detector.model_type,
+            'queue_depth': self.queue.qsize(),
+            'mean_batch_size': self.stats['transactions'] / batches if batches else 0.0,
+            **self.stats
+        }
+
+class ScoringServer:
+    """
+    Minimal HTTP/1.1 front end (keep-alive, JSON bodies) for a MicroBatcher.
+    """
+    def __init__(self, detector, threshold=None, audit=False, registry=None, version=None,
+                 watch_interval=None, swap_options=None, **batcher_options):
+        self.batcher = MicroBatcher(detector, **batcher_options)
+        # Record every decision in the audit log (by the transaction's 'id', if any)
+        self.audit = audit
+        # Labels use the serving model's stored operating point unless overridden
+        self.threshold_override = threshold
+        # Model registry (src.registry) that POST /model and the watcher swap from
+        self.registry = registry
+        self.swapper = HotSwapper(self.batcher, version=version, **(swap_options or {}))
+        self.watch_interval = watch_interval
+        self.server = None
+        self._batcher_task = None
+        self._watch_task = None
+
+    def threshold(self, detector):
+        """The label threshold for scores of ``detector``."""
+        if self.threshold_override is not None:
+            return self.threshold_override
+        return decision_threshold(getattr(detector, 'threshold', None))
+
+    async def start(self, host='127.0.0.1', port=8080, unix_socket=None):
+        """Starts listening and the batching loop."""
+        self._batcher_task = asyncio.create_task(self.batcher.run())
+        if self.registry is not None and self.watch_interval:
+            self._watch_task = asyncio.create_task(
+                self.swapper.watch(self.registry, self.watch_interval)
+            )
+        if unix_socket:
+            self.server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        logger.info("Scoring server listening on %s", unix_socket or self.address)
+
+    @property
+    def address(self):
+        """The (host, port) the server is bound to."""
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """Stops accepting connections and the batching loop."""
+        self.server.close()
+        await self.server.wait_closed()
+        self._batcher_task.cancel()
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+        self.swapper.shutdown()
+        self.batcher.executor.shutdown(wait=False)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Request body too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.route(method, path, body)
+                await self._respond(writer, status, payload)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        """
+        Handles one request and returns (status, JSON payload). Besides the
+        HTTP front end, src.replay calls it directly.
+        """
+        if method == 'GET' and path == '/health':
+            return 200, {**self.batcher.health(), 'model_version': self.swapper.version}
+        if method == 'GET' and path == '/drift':
+            monitor = getattr(self.batcher.detector, 'monitor', None)
+            if monitor is None:
+                return 404, {'error': 'Drift monitoring is not enabled'}
+            return 200, monitor.report()
+        if path == '/model' and method in ('GET', 'POST'):
+            return self._model(method, body)
+        if method != 'POST' or path != '/score':
+            return 404, {'error': f"No route for {method} {path}"}
+
+        try:
+            payload = json.loads(body)
+            records = payload if isinstance(payload, list) else [payload]
+            for record in records:
+                validate_record(record)
+        except ValueError as exc:
+            return 400, {'error': str(exc)}
+
+        try:
+            probs, detector = await self.batcher.submit(records)
+        except Overloaded:
+            return 503, {'error': 'Scoring queue full, retry later'}
+        except Exception as exc: # pylint: disable=broad-except
+            return 500, {'error': str(exc)}
+
+        threshold = self.threshold(detector)
+        results = [{'probability': float(p), 'label': int(label)}
+                   for p, label in zip(probs, decide(probs, threshold))]
+        if self.audit:
+            audit_decisions('serve', [record.get('id') for record in records],
+                            [result['probability'] for result in results],
+                            [result['label'] for result in results])
+        return 200, results if isinstance(payload, list) else results[0]
+
+    def _model(self, method, body):
+        if method == 'GET':
+            return 200, self.swapper.status()
+        if self.registry is None:
+            return 404, {'error': 'No model registry configured'}
+        try:
+            version = json.loads(body)['version']
+            self.registry.model_path(version)
+        except (ValueError, KeyError, TypeError) as exc:
+            return 400, {'error': f"Expected {{\"version\": ...}} of a registered model: {exc}"}
+        if not self.swapper.start(lambda: self.registry.load(version), version):
+            return 409, {'error': 'A model swap is already in progress',
+                         **self.swapper.status()['swap']}
+        return 202, self.swapper.status()['swap']
+
+    @staticmethod
+    async def _respond(writer, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode('latin-1') + b"\r\n" + body)
+        await writer.drain()
+
+def serve(detector, host='127.0.0.1', port=8080, unix_socket=None, **options):
+    """Runs a ScoringServer until interrupted."""
+    async def _main():
+        server = ScoringServer(detector, **options)
+        await server.start(host=host, port=port, unix_socket=unix_socket)
+        started = time.time()
+        try:
+            await server.server.serve_forever()
+        finally:
+            logger.info("Scoring server stopped after %.0fs: %s",
+                        time.time() - started, server.batcher.stats)
+            await server.stop()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,242 @@
+"""
+Out-of-core training for datasets larger than memory.
+
+The CSV is streamed once through cleaning and the feature kernel. Every
+featurized chunk is split into train and test rows, spilled to ``.npy``
+files in a scratch directory and folded into the scaler statistics with
+``StandardScaler.partial_fit``, so the scaler is fitted in that same pass.
+Training then reads the spilled chunks back:
+
+* XGBoost builds a ``QuantileDMatrix`` from an iterator over the scaled
+  chunks; only the quantized matrix (one byte per value) is resident.
+* Random forests need all of their rows in memory, so they are fitted on a
+  uniform sample of at most ``max_rows`` training rows.
+
+The held-out rows are sampled the same way for evaluation.
+
+Training negatives can also be downsampled as they stream in, at one rate or
+at a rate per transaction type (``negative_rate``). The rates are recorded
+on the detector, which corrects its probabilities for them at inference
+(see FraudDetector.sampling); held-out rows are never downsampled.
+"""
+import os
+import shutil
+import tempfile
+import numpy as np
+import xgboost
+from xgboost.sklearn import DEFAULT_N_ESTIMATORS
+from src.data_loader import iter_clean_chunks, DEFAULT_CHUNKSIZE, TRANSACTION_TYPES
+from src.features import feature_matrix, type_codes, FEATURE_COLUMNS
+from src.model import FraudDetector
+from src.utils import logger
+
+DEFAULT_MAX_ROWS = 2_000_000
+
+SPLITS = ('train', 'test')
+
+class SpilledDataset:
+    """
+    Featurized chunks of each split spilled to ``directory``, with row and
+    fraud counts.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.chunks = {split: [] for split in SPLITS}
+        self.rows = dict.fromkeys(SPLITS, 0)
+        self.positives = dict.fromkeys(SPLITS, 0)
+        # Training negatives before downsampling
+        self.negatives_seen = 0
+
+    def add(self, split, features, labels):
+        """Writes one chunk of ``split`` to disk."""
+        prefix = os.path.join(self.directory, f"{split}_{len(self.chunks[split]):05d}")
+        np.save(f"{prefix}_x.npy", features)
+        np.save(f"{prefix}_y.npy", labels)
+        self.chunks[split].append(prefix)
+        self.rows[split] += len(labels)
+        self.positives[split] += int(np.count_nonzero(labels))
+
+    def iter_chunks(self, split):
+        """Yields (features, labels) per spilled chunk, memory-mapping the features."""
+        for prefix in self.chunks[split]:
+            yield np.load(f"{prefix}_x.npy", mmap_mode='r'), np.load(f"{prefix}_y.npy")
+
+def negative_rates(rate):
+    """
+    Normalizes ``rate`` (a float, or a dict of transaction type to rate with
+    an optional 'default' entry) into a keep rate per TRANSACTION_TYPES entry.
+    """
+    if not isinstance(rate, dict):
+        rate = {'default': rate}
+    unknown = set(rate) - set(TRANSACTION_TYPES) - {'default'}
+    if unknown:
+        raise ValueError(f"Unknown transaction types in negative rate: {sorted(unknown)}")
+    rates = {name: float(rate.get(name, rate.get('default', 1.0))) for name in TRANSACTION_TYPES}
+    if any(not 0.0 < value <= 1.0 for value in rates.values()):
+        raise ValueError(f"Negative rates must be in (0, 1]: {rates}")
+    return rates
+
+def parse_negative_rate(text):
+    """
+    Parses a --negative_rate value such as '0.1' or '0.02,TRANSFER=1,CASH_OUT=0.5'
+    (a bare number sets the rate of the types not listed).
+    """
+    rate = {}
+    for item in text.split(','):
+        name, _, value = item.rpartition('=')
+        rate[name.strip() or 'default'] = float(value)
+    return negative_rates(rate)
+
+def spill_features(data_path, directory, scaler, chunksize=DEFAULT_CHUNKSIZE,
+                   test_size=0.2, seed=42, negative_rate=None):
+    """
+    Streams ``data_path`` into a SpilledDataset under ``directory``, assigning
+    each row to the test split with probability ``test_size`` and fitting
+    ``scaler`` on the training rows as they pass. With ``negative_rate``
+    (see negative_rates) training negatives are kept at that rate.
+    """
+    dataset = SpilledDataset(directory)
+    rng = np.random.default_rng(seed)
+    keep_rates = None
+    if negative_rate is not None:
+        # Indexed by type code; unknown types (-1) are always kept
+        keep_rates = np.array(list(negative_rates(negative_rate).values()) + [1.0])
+
+    for chunk in iter_clean_chunks(data_path, chunksize=chunksize, skip_names=True):
+        features = feature_matrix(chunk)
+        labels = chunk['isFraud'].to_numpy(dtype=np.int8)
+        draws = rng.random(len(labels))
+        is_test = draws < test_size
+        is_train = ~is_test
+
+        dataset.negatives_seen += int(np.count_nonzero(is_train & (labels == 0)))
+        if keep_rates is not None:
+            # Reuse the split draw, rescaled to [0, 1) over the training range,
+            # so the train/test split is the same at every rate
+            keep = (draws - test_size) / (1.0 - test_size) < keep_rates[type_codes(chunk['type'])]
+            is_train &= keep | (labels == 1)
+
+        for split, mask in (('train', is_train), ('test', is_test)):
+            if mask.any():
+                if split == 'train':
+                    scaler.partial_fit(features[mask])
+                dataset.add(split, features[mask], labels[mask])
+    return dataset
+
+def load_sample(dataset, split, max_rows, scaler, seed=42):
+    """
+    Loads a uniform sample without replacement of at most ``max_rows`` rows
+    of ``split``, scaled by ``scaler``. Returns (features, labels).
+    """
+    size = min(dataset.rows[split], max_rows)
+    features = np.empty((size, len(FEATURE_COLUMNS)), dtype=np.float32)
+    labels = np.empty(size, dtype=np.int8)
+
+    # Split the sample across chunks with sequential hypergeometric draws so
+    # that it is exactly uniform without ever indexing the whole split.
+    rng = np.random.default_rng(seed)
+    filled, remaining = 0, dataset.rows[split]
+    for chunk_features, chunk_labels in dataset.iter_chunks(split):
+        rows = len(chunk_labels)
+        take = int(rng.hypergeometric(rows, remaining - rows, size - filled))
+        remaining -= rows
+        if take == 0:
+            continue
+        if take == rows:
+            index = slice(None)
+        else:
+            index = np.sort(rng.choice(rows, size=take, replace=False))
+        features[filled:filled + take] = scaler.transform(chunk_features[index])
+        labels[filled:filled + take] = chunk_labels[index]
+        filled += take
+    return features, labels
+
+class _ScaledChunks(xgboost.DataIter):
+    """Feeds the scaled training chunks of a SpilledDataset to XGBoost."""
+    def __init__(self, dataset, scaler):
+        self._dataset = dataset
+        self._scaler = scaler
+        self._chunks = None
+        super().__init__()
+        self.reset()
+
+    def next(self, input_data):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        features, labels = chunk
+        input_data(data=self._scaler.transform(features), label=labels)
+        return True
+
+    def reset(self):
+        self._chunks = self._dataset.iter_chunks('train')
+
+def _train_xgb(detector, dataset):
+    """Fits an XGBClassifier from a QuantileDMatrix built chunk by chunk."""
+    positives = dataset.positives['train']
+    model = detector.make_estimator(dataset.rows['train'] - positives, positives)
+    matrix = xgboost.QuantileDMatrix(_ScaledChunks(dataset, detector.scaler))
+    booster = xgboost.train(
+        model.get_xgb_params(), matrix,
+        num_boost_round=model.n_estimators or DEFAULT_N_ESTIMATORS
+    )
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    return model
+
+def train_out_of_core(data_path, model_type='rf', chunksize=DEFAULT_CHUNKSIZE, test_size=0.2,
+                      max_rows=DEFAULT_MAX_ROWS, spill_dir=None, negative_rate=None):
+    """
+    Trains a FraudDetector on ``data_path`` with memory bounded by the chunk
+    size and ``max_rows`` instead of by the size of the file.
+
+    Spilled chunks go to a temporary directory under ``spill_dir`` (the
+    system default if None) and are removed afterwards. Returns (detector,
+    test_features, test_labels) with a scaled sample of at most ``max_rows``
+    held-out rows, in the form evaluate_model expects. ``negative_rate``
+    downsamples training negatives (see negative_rates).
+    """
+    if model_type not in ('rf', 'xgb'):
+        raise ValueError(f"Unsupported model type: {model_type}")
+
+    logger.info("Training %s model out of core on %s...", model_type, data_path)
+    detector = FraudDetector(model_type=model_type)
+    directory = tempfile.mkdtemp(prefix='cfd_spill_', dir=spill_dir)
+    try:
+        dataset = spill_features(
+            data_path, directory, detector.scaler, chunksize=chunksize, test_size=test_size,
+            negative_rate=negative_rate
+        )
+        logger.info("Spilled %s training and %s test rows to %s.",
+                    dataset.rows['train'], dataset.rows['test'], directory)
+        if dataset.rows['train'] == 0:
+            raise ValueError(f"No training rows in {data_path}")
+
+        if model_type == 'xgb':
+            detector.model = _train_xgb(detector, dataset)
+        else:
+            if dataset.rows['train'] > max_rows:
+                logger.info("Sampling %s of %s training rows.", max_rows, dataset.rows['train'])
+            features, labels = load_sample(dataset, 'train', max_rows, detector.scaler)
+            detector.train(features, labels)
+            del features, labels
+
+        test_features, test_labels = load_sample(
+            dataset, 'test', max_rows, detector.scaler, seed=43
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if negative_rate is not None:
+        detector.sampling = {
+            'negative_rates': negative_rates(negative_rate),
+            'negatives_kept': dataset.rows['train'] - dataset.positives['train'],
+            'negatives_seen': dataset.negatives_seen
+        }
+        logger.info("Kept %s of %s training negatives.",
+                    detector.sampling['negatives_kept'], dataset.negatives_seen)
+
+    # The scaler was fitted on bare matrices; record the schema for inference
+    detector.feature_names = list(FEATURE_COLUMNS)
+    detector.scaler.feature_names_in_ = np.asarray(FEATURE_COLUMNS, dtype=object)
+    logger.info("Out-of-core training completed.")
+    return detector, test_features, test_labels
@@ -0,0 +1,195 @@
+"""
+Hyperparameter search by successive halving.
+
+``n_trials`` configurations are drawn from the model type's SEARCH_SPACES
+entry and scored on the walk-forward folds of src.validation with a small
+share of the training rows. Only the best 1/``eta`` of each rung is
+promoted to the next, which trains on ``eta`` times more rows, until the
+last rung trains on all of them. A trial's score is its mean expected cost
+at the cost-optimal operating point (lower is better), ties broken by AUC.
+
+Trials run in a process pool sized to a global CPU budget: each trial's
+estimator gets ``trial_jobs`` threads and at most ``cpu_budget //
+trial_jobs`` trials run at once, instead of every estimator starting
+``n_jobs=-1`` threads. Every finished trial is appended to a JSON-lines
+journal; rerunning the same search with the same journal skips the trials
+already in it.
+"""
+import json
+import math
+import multiprocessing
+import os
+import time
+import numpy as np
+from src.evaluation import DEFAULT_COSTS
+from src.utils import logger
+from src.validation import run_fold, walk_forward_windows, FoldCache
+
+# Values drawn for each estimator parameter
+SEARCH_SPACES = {
+    'rf': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [None, 8, 16, 32],
+        'min_samples_leaf': [1, 2, 5, 20],
+        'max_features': ['sqrt', 0.5, 1.0]
+    },
+    'xgb': {
+        'n_estimators': [100, 200, 400, 800],
+        'max_depth': [3, 4, 6, 8, 10],
+        'learning_rate': [0.02, 0.05, 0.1, 0.2, 0.3],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'min_child_weight': [1, 3, 10]
+    }
+}
+
+def sample_configs(model_type, n_trials, seed=0):
+    """Draws ``n_trials`` distinct parameter sets (fewer if the space is smaller)."""
+    space = SEARCH_SPACES[model_type]
+    rng = np.random.default_rng(seed)
+    size = math.prod(len(values) for values in space.values())
+    configs = []
+    seen = set()
+    while len(configs) < min(n_trials, size):
+        params = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        # NumPy scalars from the draw are not JSON serializable
+        params = {name: value.item() if hasattr(value, 'item') else value
+                  for name, value in params.items()}
+        key = json.dumps(params, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(params)
+    return configs
+
+def rungs(n_trials, eta=3, min_fraction=None):
+    """
+    The (trials kept, training fraction) of each rung: the trials shrink
+    and the fraction grows by ``eta`` per rung, ending at all rows.
+    """
+    count = max(1, int(math.log(n_trials, eta) + 1e-9) + 1)
+    if min_fraction is not None:
+        count = min(count, max(1, int(math.log(1 / min_fraction, eta) + 1e-9) + 1))
+    return [(max(1, n_trials // eta**i), 1.0 / eta**(count - 1 - i)) for i in range(count)]
+
+class TrialJournal:
+    """
+    Append-only JSON-lines record of a search. The first line describes the
+    search; a journal is only resumed by the same search.
+    """
+    def __init__(self, path, search):
+        self.path = path
+        self.trials = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+            if lines and lines[0].get('search') != search:
+                raise ValueError(f"Journal {path} belongs to a different search; "
+                                 "remove it or choose another journal")
+            for entry in lines[1:]:
+                self.trials[(entry['trial'], entry['rung'])] = entry
+            logger.info("Resuming search from %s (%s trials done).", path, len(self.trials))
+        else:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._append({'search': search})
+
+    def _append(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record(self, entry):
+        """Adds a finished trial."""
+        self.trials[(entry['trial'], entry['rung'])] = entry
+        self._append(entry)
+
+def _score(entry):
+    return (entry['expected_cost'], -entry['auc'])
+
+def run_trial(task):
+    """Scores one configuration on every fold at one rung's training fraction."""
+    trial, rung, fraction, directory, folds, model_type, params, costs, n_jobs = task
+    start = time.perf_counter()
+    results = [run_fold(directory, fold, model_type, params, costs, n_jobs, fraction)
+               for fold in folds]
+    return {
+        'trial': trial,
+        'rung': rung,
+        'fraction': fraction,
+        'params': params,
+        'expected_cost': float(np.mean([r['operating_point']['expected_cost'] for r in results])),
+        'auc': float(np.mean([r['auc'] for r in results])),
+        'train_rows': sum(r['train_rows'] for r in results),
+        'seconds': time.perf_counter() - start
+    }
+
+def successive_halving(data, model_type, n_trials=27, eta=3, min_fraction=None, n_folds=2,
+                       train_window=None, cpu_budget=None, trial_jobs=1, seed=0,
+                       journal_path='reports/tune_journal.jsonl', cache_dir='cache',
+                       report_dir='reports', costs=None):
+    """
+    Searches estimator parameters for ``model_type`` on the featurized
+    frame ``data``. Returns the report, whose 'best' entry holds the
+    winning parameters; it is also written to ``report_dir``/tuning.json.
+    """
+    costs = dict(DEFAULT_COSTS, **(costs or {}))
+    configs = sample_configs(model_type, n_trials, seed)
+    schedule = rungs(len(configs), eta, min_fraction)
+    windows = walk_forward_windows(data['step'], n_folds, train_window)
+    # As it reads back from the journal (tuples become lists)
+    search = json.loads(json.dumps({
+        'model_type': model_type, 'configs': configs, 'rungs': schedule,
+        'windows': windows, 'costs': costs
+    }))
+    journal = TrialJournal(journal_path, search)
+    directory = FoldCache(cache_dir).directory(data, windows)
+    folds = [window['fold'] for window in windows]
+
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    workers = max(1, cpu_budget // trial_jobs)
+    logger.info("Tuning %s: %s trials, rungs %s, %s worker(s) x %s thread(s).",
+                model_type, len(configs), schedule, workers, trial_jobs)
+
+    start = time.perf_counter()
+    alive = list(range(len(configs)))
+    history = []
+    # pylint: disable=consider-using-with
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        for rung, (_, fraction) in enumerate(schedule):
+            tasks = [(trial, rung, fraction, directory, folds, model_type, configs[trial],
+                      costs, trial_jobs)
+                     for trial in alive if (trial, rung) not in journal.trials]
+            results = pool.imap_unordered(run_trial, tasks) if pool else map(run_trial, tasks)
+            for entry in results:
+                journal.record(entry)
+                logger.info("Rung %s trial %s: expected cost %.6f, AUC %.4f (%.1fs) %s",
+                            rung, entry['trial'], entry['expected_cost'], entry['auc'],
+                            entry['seconds'], entry['params'])
+            ranked = sorted((journal.trials[(trial, rung)] for trial in alive), key=_score)
+            history.append({'rung': rung, 'fraction': fraction, 'trials': len(ranked),
+                            'best_expected_cost': ranked[0]['expected_cost']})
+            if rung + 1 < len(schedule):
+                alive = [entry['trial'] for entry in ranked[:schedule[rung + 1][0]]]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    best = ranked[0]
+    report = {
+        'model_type': model_type,
+        'best': best,
+        'rungs': history,
+        'trials_run': len(journal.trials),
+        'seconds': time.perf_counter() - start
+    }
+    logger.info("Best %s parameters: %s (expected cost %.6f, AUC %.4f)",
+                model_type, best['params'], best['expected_cost'], best['auc'])
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    with open(os.path.join(report_dir, 'tuning.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
@@ -2,43 +2,28 @@
 Utility functions for the Credit Card Fraud Detection System.
 """
 import logging
-import json
 import sys
-import os
-from datetime import datetime
+from src.audit import AsyncAuditHandler, start_writer
 
-def setup_logging(log_dir="logs"):
+LOGGER_NAME = "CreditCardFraud"
+
+def setup_logging(log_dir="logs", **audit_options):
     """
     Sets up logging configuration.
-    Logs are saved to a file in the 'logs' directory and printed to stdout.
+    Logs are saved to a JSON audit file in the 'logs' directory and printed
+    to stdout. The audit file is written asynchronously in batches by a
+    background thread (see src.audit; ``audit_options`` go to its
+    AuditWriter), which also records per-decision audit events.
+    Only the first call attaches handlers; later calls return the same logger.
     """
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_filename = os.path.join(log_dir, f"audit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    logit = logging.getLogger(LOGGER_NAME)
+    if logit.handlers:
+        return logit
 
-    logit = logging.getLogger("CreditCardFraud")
     logit.setLevel(logging.INFO)
 
-    # JSON Formatter
-    class JsonFormatter(logging.Formatter):
-        def format(self, record):
-            log_record = {
-                "timestamp": datetime.fromtimestamp(record.created).isoformat(),
-                "level": record.levelname,
-                "message": record.getMessage(),
-                "module": record.module,
-                "function": record.funcName,
-                "line": record.lineno
-            }
-            if record.exc_info:
-                log_record["exception"] = self.formatException(record.exc_info)
-            return json.dumps(log_record)
-
-    # File Handler
-    file_handler = logging.FileHandler(log_filename)
-    file_handler.setFormatter(JsonFormatter())
-    logit.addHandler(file_handler)
+    # Audit file handler: serialization and I/O happen off the caller's thread
+    logit.addHandler(AsyncAuditHandler(start_writer(log_dir, **audit_options)))
 
     # Console Handler (Human readable for dev)
     console_handler = logging.StreamHandler(sys.stdout)
@@ -47,4 +32,5 @@ def setup_logging(log_dir="logs"):
 
     return logit
 
-logger = setup_logging()
+# Entry points call setup_logging(); importing a module has no side effects
+logger = logging.getLogger(LOGGER_NAME)
@@ -0,0 +1,294 @@
+"""
+Time-ordered walk-forward validation.
+
+prepare_data splits at random, so every model is trained on transactions
+from after the ones it is tested on. Walk-forward validation splits by
+``step`` instead: the step range is cut into ``n_folds + 1`` blocks of
+about equal row counts, and fold k is validated on block k after training
+on the blocks before it (all of them, or the last ``train_window`` steps),
+leaving ``gap`` steps between the two.
+
+Building a fold (selecting its rows, fitting its scaler and scaling both
+windows) is done once: the scaled float32 matrices are written to ``.npy``
+files under the fold cache, keyed on the data and the windows, and
+memory-mapped by every later run and every model configuration. Training
+runs one (fold, configuration) task per process in a pool; workers map the
+cached matrices instead of receiving pickled copies.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from src.evaluation import operating_point, sweep_auc, sweep_scores, DEFAULT_COSTS
+from src.features import FEATURE_VERSION
+from src.model import FraudDetector
+from src.utils import logger
+
+FOLD_CACHE_VERSION = 1
+
+MANIFEST = 'manifest.json'
+
+def walk_forward_windows(steps, n_folds=4, train_window=None, gap=0):
+    """
+    Returns the [start, stop) step ranges of each fold's train and
+    validation windows as dicts, for the ``steps`` of every row.
+    """
+    steps = np.asarray(steps)
+    quantiles = np.quantile(steps, np.linspace(0, 1, n_folds + 2)[1:-1], method='lower')
+    bounds = np.unique(np.concatenate([[steps.min()], quantiles, [steps.max() + 1]]))
+    if len(bounds) != n_folds + 2:
+        raise ValueError(f"Not enough distinct steps for {n_folds} walk-forward folds")
+    windows = []
+    for k in range(1, n_folds + 1):
+        train_stop = int(bounds[k]) - gap
+        train_start = int(bounds[0]) if not train_window else max(int(bounds[0]),
+                                                                   train_stop - train_window)
+        if train_stop <= train_start:
+            raise ValueError(f"Fold {k - 1} has no training steps; reduce the gap")
+        windows.append({
+            'fold': k - 1,
+            'train': [train_start, train_stop],
+            'valid': [int(bounds[k]), int(bounds[k + 1])]
+        })
+    return windows
+
+def _frame_digest(data):
+    """Content hash of a frame's columns."""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in data.columns:
+        digest.update(name.encode('utf-8'))
+        digest.update(np.ascontiguousarray(data[name].to_numpy()).view(np.uint8))
+    return digest.hexdigest()
+
+class FoldCache:
+    """
+    Scaled train and validation matrices of every fold, as memory-mapped
+    ``.npy`` files under ``cache_dir``.
+
+    Each set of folds is built in a staging directory private to the
+    process and renamed into place, so concurrent runs never see a partial
+    entry. Entries are evicted least-recently-used first once there are more
+    than ``max_entries``; the entry just returned is never evicted.
+    """
+    def __init__(self, cache_dir='cache', max_entries=2):
+        self.cache_dir = os.path.join(cache_dir, 'folds')
+        self.max_entries = max_entries
+
+    def directory(self, data, windows, target_col='isFraud'):
+        """
+        Returns the directory of the folds of ``data``, building them unless
+        an entry for the same data and windows exists.
+        """
+        key = hashlib.sha256(json.dumps([
+            FOLD_CACHE_VERSION, FEATURE_VERSION, _frame_digest(data), windows, target_col
+        ]).encode('utf-8')).hexdigest()[:32]
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.isfile(os.path.join(entry, MANIFEST)):
+            # Mark as recently used for LRU eviction
+            os.utime(entry)
+            logger.info("Reusing cached walk-forward folds %s", entry)
+            return entry
+
+        staging = f"{entry}.tmp{os.getpid()}"
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        self._build(staging, data, windows, target_col)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another run built the same folds first; theirs may be in use
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict(keep=entry)
+        return entry
+
+    def evict(self, keep=None):
+        """
+        Drops least-recently-used entries beyond ``max_entries`` and entries
+        of another fold cache version, except ``keep``.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            if '.tmp' in name or entry == keep:
+                continue
+            try:
+                with open(os.path.join(entry, MANIFEST), encoding='utf-8') as f:
+                    version = json.load(f).get('version')
+                mtime = os.stat(entry).st_mtime
+            except (OSError, ValueError):
+                continue
+            if version != FOLD_CACHE_VERSION:
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entries.append((mtime, entry))
+
+        if self.max_entries is None:
+            return
+        entries.sort(reverse=True)
+        # ``keep`` counts towards the limit
+        for _, entry in entries[max(self.max_entries - (keep is not None), 0):]:
+            logger.info("Evicting walk-forward folds %s", entry)
+            shutil.rmtree(entry, ignore_errors=True)
+
+    @staticmethod
+    def _build(directory, data, windows, target_col):
+        """Fits each fold's scaler on its training window and writes both windows."""
+        start = time.perf_counter()
+        feature_names = [col for col in data.columns if col != target_col]
+        features = data[feature_names].to_numpy(dtype=np.float32)
+        labels = data[target_col].to_numpy(dtype=np.int8)
+        steps = data['step'].to_numpy()
+        for window in windows:
+            masks = {split: (steps >= window[split][0]) & (steps < window[split][1])
+                     for split in ('train', 'valid')}
+            scaler = StandardScaler().fit(features[masks['train']])
+            for split, mask in masks.items():
+                prefix = os.path.join(directory, f"fold_{window['fold']:02d}_{split}")
+                np.save(f"{prefix}_x.npy", scaler.transform(features[mask]))
+                np.save(f"{prefix}_y.npy", labels[mask])
+        with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump({'version': FOLD_CACHE_VERSION, 'feature_names': feature_names,
+                       'windows': windows}, f, indent=2)
+        logger.info("Built %s walk-forward folds in %.1fs", len(windows),
+                    time.perf_counter() - start)
+
+def load_fold(directory, fold, split):
+    """The cached (features, labels) of one fold's 'train' or 'valid' split, memory-mapped."""
+    prefix = os.path.join(directory, f"fold_{fold:02d}_{split}")
+    return np.load(f"{prefix}_x.npy", mmap_mode='r'), np.load(f"{prefix}_y.npy", mmap_mode='r')
+
+def run_fold(directory, fold, model_type, params=None, costs=None, n_jobs=None,
+             train_fraction=1.0):
+    """
+    Trains one configuration on a cached fold and scores its validation
+    window, the estimator using ``n_jobs`` threads (its default if None).
+    With ``train_fraction`` < 1 only that share of the training rows is
+    used, a fixed random subset that grows with the fraction. Returns the
+    fold's metrics and timings.
+    """
+    X_train, y_train = load_fold(directory, fold, 'train') # pylint: disable=invalid-name
+    X_valid, y_valid = load_fold(directory, fold, 'valid') # pylint: disable=invalid-name
+    if train_fraction < 1.0:
+        order = np.random.default_rng(fold).permutation(len(y_train))
+        rows = np.sort(order[:max(1, int(len(y_train) * train_fraction))])
+        X_train, y_train = X_train[rows], y_train[rows] # pylint: disable=invalid-name
+    positives = int(np.count_nonzero(y_train))
+    estimator_params = dict(params or {})
+    if n_jobs is not None:
+        estimator_params['n_jobs'] = n_jobs
+    if model_type == 'rf':
+        estimator_params.setdefault('verbose', 0)
+    model = FraudDetector(model_type=model_type).make_estimator(
+        len(y_train) - positives, positives, estimator_params
+    )
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    probabilities = model.predict_proba(X_valid)[:, 1]
+    predict_seconds = time.perf_counter() - start
+
+    sweep = sweep_scores(probabilities, y_valid, costs)
+    return {
+        'fold': fold,
+        'model_type': model_type,
+        'params': params or {},
+        'train_rows': len(y_train),
+        'valid_rows': len(y_valid),
+        'valid_fraud': int(np.count_nonzero(y_valid)),
+        'auc': sweep_auc(sweep),
+        'operating_point': operating_point(sweep),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds
+    }
+
+def _run_task(task):
+    return run_fold(*task)
+
+def _summarize(results):
+    """Mean and spread of the fold metrics of each configuration."""
+    summary = {}
+    for result in results:
+        key = json.dumps([result['model_type'], result['params']], sort_keys=True)
+        summary.setdefault(key, []).append(result)
+    rows = []
+    for folds in summary.values():
+        aucs = np.array([fold['auc'] for fold in folds])
+        rows.append({
+            'model_type': folds[0]['model_type'],
+            'params': folds[0]['params'],
+            'folds': len(folds),
+            'auc_mean': float(aucs.mean()),
+            'auc_std': float(aucs.std()),
+            'expected_cost_mean': float(np.mean([fold['operating_point']['expected_cost']
+                                                 for fold in folds])),
+            'fit_seconds': float(sum(fold['fit_seconds'] for fold in folds))
+        })
+    return sorted(rows, key=lambda row: row['expected_cost_mean'])
+
+def walk_forward(data, configs, n_folds=4, train_window=None, gap=0, workers=1,
+                 cache_dir='cache', report_dir='reports', costs=None, target_col='isFraud'):
+    """
+    Walk-forward validates each configuration (a dict with 'model_type' and
+    optional estimator 'params') on the featurized frame ``data``.
+
+    Folds come from the fold cache; the (fold, configuration) tasks run in
+    a pool of ``workers`` processes, the largest first, each estimator
+    using its share of the cores. Writes ``walk_forward.json`` to
+    ``report_dir`` and returns the report.
+    """
+    windows = walk_forward_windows(data['step'], n_folds, train_window, gap)
+    start = time.perf_counter()
+    directory = FoldCache(cache_dir).directory(data, windows, target_col)
+    prepare_seconds = time.perf_counter() - start
+
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    tasks = []
+    for config in configs:
+        for window in windows:
+            tasks.append((directory, window['fold'], config['model_type'],
+                          config.get('params', {}), costs, n_jobs))
+    # Later folds train on more rows; start them first so the pool drains evenly
+    tasks.sort(key=lambda task: -task[1])
+
+    logger.info("Walk-forward validating %s configuration(s) on %s folds with %s worker(s)...",
+                len(configs), len(windows), workers)
+    start = time.perf_counter()
+    if workers <= 1:
+        results = [_run_task(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(_run_task, tasks)
+    results.sort(key=lambda result: (result['model_type'],
+                                     json.dumps(result['params'], sort_keys=True), result['fold']))
+
+    report = {
+        'windows': windows,
+        'costs': dict(DEFAULT_COSTS, **(costs or {})),
+        'prepare_seconds': prepare_seconds,
+        'train_seconds': time.perf_counter() - start,
+        'results': results,
+        'summary': _summarize(results)
+    }
+    for result in results:
+        logger.info("Fold %s %s: train %s rows, valid %s rows (%s fraud), AUC %.4f, "
+                    "expected cost %.6f, fit %.1fs", result['fold'], result['model_type'],
+                    result['train_rows'], result['valid_rows'], result['valid_fraud'],
+                    result['auc'], result['operating_point']['expected_cost'],
+                    result['fit_seconds'])
+    for row in report['summary']:
+        logger.info("%s %s: AUC %.4f +/- %.4f, expected cost %.6f", row['model_type'],
+                    row['params'], row['auc_mean'], row['auc_std'], row['expected_cost_mean'])
+
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    with open(os.path.join(report_dir, 'walk_forward.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
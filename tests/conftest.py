@@ -0,0 +1,35 @@
+"""
+Shared fixtures built on the seeded synthetic PaySim generator.
+"""
+import pytest
+from benchmarks.synthetic import generate_paysim
+from src.data_loader import clean_data
+from src.features import feature_frame
+from src.model import FraudDetector
+
+@pytest.fixture(scope="session", name="paysim_raw")
+def fixture_paysim_raw():
+    """
+    2,000 raw PaySim-schema rows with an inflated fraud rate.
+    """
+    return generate_paysim(2000, seed=3, fraud_rate=0.05)
+
+@pytest.fixture(scope="session", name="trained_detector")
+def fixture_trained_detector(paysim_raw):
+    """
+    A random forest detector trained on the synthetic sample.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    detector = FraudDetector(model_type='rf')
+    train_feat, _, train_labels, _ = detector.prepare_data(data)
+    detector.train(train_feat, train_labels)
+    return detector
+
+@pytest.fixture(scope="session", name="model_path")
+def fixture_model_path(trained_detector, tmp_path_factory):
+    """
+    The trained detector saved to a temporary pickle.
+    """
+    path = str(tmp_path_factory.mktemp("models") / "fraud_model.pkl")
+    trained_detector.save_model(path)
+    return path
@@ -0,0 +1,74 @@
+"""
+Tests for the per-account velocity feature store.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.account_store import AccountFeatureStore, ACCOUNT_FEATURES, account_key, account_keys
+
+@pytest.fixture(name="history")
+def fixture_history():
+    """
+    A time-ordered history where a handful of accounts transact repeatedly.
+    """
+    rng = np.random.default_rng(7)
+    n = 400
+    return pd.DataFrame({
+        'step': np.sort(rng.integers(1, 60, size=n)),
+        'amount': rng.uniform(1, 1000, size=n).round(2),
+        'nameOrig': [f"C{i}" for i in rng.integers(100, 130, size=n)],
+        'nameDest': [f"{p}{i}" for p, i in zip(rng.choice(['C', 'M'], size=n),
+                                              rng.integers(100, 115, size=n))]
+    })
+
+def test_account_keys():
+    """
+    PaySim IDs intern exactly and other IDs fall back to a hash.
+    """
+    names = ['C1231006815', 'M1979787155', 'C1231006815', 'not-an-id']
+    keys = account_keys(names)
+    assert keys[0] == keys[2] != keys[1]
+    assert list(keys) == [account_key(name) for name in names]
+    assert keys[3] < 0
+
+    # Look-alike IDs never share a key, and both functions agree on them
+    names = ['C1', 'C01', 'C0', 'C00', 'C123', 'C\u0661\u0662\u0663', '\u00e9123', 'C',
+             'C1234567890123']
+    keys = account_keys(names)
+    assert list(keys) == [account_key(name) for name in names]
+    assert len(set(keys)) == len(names)
+    assert [key >= 0 for key in keys] == [True, False, True, False, True, False, False,
+                                          False, False]
+
+def test_batch_matches_incremental(history):
+    """
+    Batch features over the full history equal per-transaction updates.
+    """
+    batch = AccountFeatureStore(window_steps=10, history=4).fit_transform(history)
+    assert batch.columns.tolist() == ACCOUNT_FEATURES
+
+    store = AccountFeatureStore(window_steps=10, history=4)
+    incremental = np.array([
+        store.update(row.nameOrig, row.nameDest, row.step, row.amount)
+        for row in history.itertuples()
+    ])
+    np.testing.assert_allclose(batch.to_numpy(), incremental, rtol=1e-5)
+
+def test_snapshot_restore(history, tmp_path):
+    """
+    A restored snapshot continues exactly like the original store.
+    """
+    head, tail = history.iloc[:300], history.iloc[300:]
+    store = AccountFeatureStore(window_steps=10, history=4)
+    store.fit_transform(head)
+    store.update('C999', 'C998', 50, 10.0)  # account only in the overflow map
+
+    path = tmp_path / 'accounts.npz'
+    store.save(str(path))
+    restored = AccountFeatureStore.load(str(path))
+    assert restored.num_accounts == store.num_accounts
+
+    for row in tail.itertuples():
+        expected = store.update(row.nameOrig, row.nameDest, row.step, row.amount)
+        actual = restored.update(row.nameOrig, row.nameDest, row.step, row.amount)
+        np.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,157 @@
+"""
+Tests for the asynchronous audit log.
+"""
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from src import audit
+from src.audit import AsyncAuditHandler, AuditWriter, JsonFormatter
+from src.scoring import score_file
+
+def _lines(directory):
+    lines = []
+    for path in sorted(glob.glob(str(directory / 'audit_*.json'))):
+        with open(path, encoding='utf-8') as f:
+            lines += [json.loads(line) for line in f]
+    return lines
+
+def test_writer_records_and_decisions(tmp_path):
+    """
+    Log records and decision batches end up as JSON lines, in order.
+    """
+    writer = AuditWriter(str(tmp_path), flush_interval=60)
+    logit = logging.getLogger('test_audit')
+    logit.addHandler(AsyncAuditHandler(writer))
+    logit.propagate = False
+    try:
+        logit.warning("scored %s rows", 3)
+        writer.put(audit.DecisionBatch('score', np.array([7, 8]), np.array([0.25, 0.75]),
+                                       np.array([0, 1], dtype=np.int8)))
+        assert writer.flush(timeout=5)
+        lines = _lines(tmp_path)
+        assert lines[0]['message'] == "scored 3 rows" and lines[0]['level'] == 'WARNING'
+        assert lines[1:] == [
+            {'ts': lines[1]['ts'], 'event': 'decision', 'source': 'score', 'id': 7,
+             'p': 0.25, 'label': 0},
+            {'ts': lines[1]['ts'], 'event': 'decision', 'source': 'score', 'id': 8,
+             'p': 0.75, 'label': 1}
+        ]
+    finally:
+        logit.handlers.clear()
+        writer.close()
+    assert writer.stats['records'] == 3
+
+def test_rotation_by_size(tmp_path):
+    """
+    A file past max_bytes is closed and the next batch starts a new one.
+    """
+    writer = AuditWriter(str(tmp_path), max_bytes=50)
+    for batch in range(3):
+        writer.put(audit.DecisionBatch('serve', [batch], [0.5], [1]))
+        writer.flush()
+    writer.close()
+    assert writer.stats['files'] == 3
+    assert len(glob.glob(str(tmp_path / 'audit_*.json'))) == 3
+    assert [line['id'] for line in _lines(tmp_path)] == [0, 1, 2]
+
+def test_batched_writes(tmp_path):
+    """
+    Written batches stay in the file buffer until the flush interval or a flush.
+    """
+    writer = AuditWriter(str(tmp_path), flush_interval=60)
+    for batch in range(3):
+        writer.put(audit.DecisionBatch('serve', [batch], [0.5], [1]))
+        while writer.stats['batches'] <= batch:
+            time.sleep(0.01)
+    assert os.path.getsize(writer.path) == 0
+    writer.flush()
+    assert len(_lines(tmp_path)) == 3
+    writer.close()
+
+def _log_in_worker(index):
+    logging.getLogger('test_audit_fork').warning("worker %s", index)
+    audit.audit_decisions('worker', [index], [0.5], [1])
+    return index
+
+def test_forked_workers(tmp_path, monkeypatch):
+    """
+    Records logged in forked pool workers are written, even with a full
+    inherited queue under the block policy and a pool that terminates them.
+    """
+    writer = AuditWriter(str(tmp_path), policy='block', max_queue=2, linger=1.0)
+    monkeypatch.setitem(audit._ACTIVE, 'writer', writer) # pylint: disable=protected-access
+    logit = logging.getLogger('test_audit_fork')
+    logit.addHandler(AsyncAuditHandler(writer))
+    logit.propagate = False
+    try:
+        logit.warning("parent")
+        # Fill the queue: a child still using the parent's queue would block on it
+        writer.put(audit.DecisionBatch('parent', [0], [0.5], [1]))
+        with multiprocessing.get_context('fork').Pool(2) as pool:
+            assert pool.map(_log_in_worker, range(4)) == list(range(4))
+        writer.flush(timeout=5)
+    finally:
+        logit.handlers.clear()
+        writer.close()
+    lines = _lines(tmp_path)
+    messages = [line['message'] for line in lines if 'message' in line]
+    assert sorted(messages) == ['parent'] + [f'worker {i}' for i in range(4)]
+    assert sorted(line['id'] for line in lines if line.get('source') == 'worker') == [0, 1, 2, 3]
+    # The parent's lines are written once, by the parent
+    assert [line['source'] for line in lines if line.get('source') == 'parent'] == ['parent']
+    assert len(glob.glob(str(tmp_path / 'audit_*_pid*.json'))) >= 1
+
+def test_drop_policy(tmp_path, capsys):
+    """
+    With the writer stalled and the queue full, entries are dropped and counted.
+    """
+    release = threading.Event()
+
+    class StalledFormatter(JsonFormatter):
+        """Blocks the writer thread until released."""
+        def format(self, record):
+            release.wait(5)
+            return super().format(record)
+
+    writer = AuditWriter(str(tmp_path), max_queue=1, policy='drop')
+    writer.formatter = StalledFormatter()
+    record = logging.LogRecord('x', logging.INFO, __file__, 1, "entry", None, None)
+    assert writer.put(record)
+    # Wait for the writer thread to take the record off the queue and stall
+    while writer._queue.qsize(): # pylint: disable=protected-access
+        pass
+    assert writer.put(record)
+    assert not writer.put(record)
+    release.set()
+    writer.close()
+
+    lines = _lines(tmp_path)
+    assert [line['message'] for line in lines[:2]] == ["entry", "entry"]
+    assert lines[-1]['level'] == 'WARNING' and lines[-1]['audit']['dropped'] == 1
+    assert "dropped 1 entries" in capsys.readouterr().err
+
+def test_score_file_audit(model_path, paysim_raw, tmp_path, monkeypatch):
+    """
+    score_file records one decision per scored row, matching its output.
+    """
+    input_csv = tmp_path / 'input.csv'
+    paysim_raw.head(500).to_csv(input_csv, index=False)
+    writer = AuditWriter(str(tmp_path / 'logs'))
+    monkeypatch.setitem(audit._ACTIVE, 'writer', writer) # pylint: disable=protected-access
+
+    output = str(tmp_path / 'scores.csv')
+    score_file(model_path, str(input_csv), output, chunksize=200, audit=True)
+    writer.close()
+
+    decisions = pd.DataFrame(_lines(tmp_path / 'logs'))
+    scores = pd.read_csv(output)
+    assert (decisions['source'] == 'score').all()
+    np.testing.assert_array_equal(decisions['id'], scores['id'])
+    np.testing.assert_array_equal(decisions['label'], scores['label'])
+    np.testing.assert_allclose(decisions['p'], scores['probability'], atol=1e-6)
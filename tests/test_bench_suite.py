@@ -0,0 +1,41 @@
+"""
+Tests for the benchmark suite's baseline comparison.
+"""
+import pytest
+from benchmarks.suite import compare
+
+CONFIG = {'rows': 1000, 'model_type': 'rf', 'calls': 10, 'seed': 0, 'model_format': 'pickle'}
+
+def _results(**stages):
+    return {'config': dict(CONFIG), 'stages': stages}
+
+def test_compare_flags_regressions():
+    """
+    Slower stages, higher latency and more memory beyond tolerance are regressions;
+    noise-level timings and faster stages are not.
+    """
+    baseline = _results(
+        train={'seconds': 1.0, 'peak_rss_mb': 100.0},
+        clean_data={'seconds': 0.001, 'peak_rss_mb': 100.0},
+        score_one={'seconds': 1.0, 'p50_us': 100.0, 'p99_us': 200.0, 'peak_rss_mb': 100.0}
+    )
+    results = _results(
+        train={'seconds': 1.6, 'peak_rss_mb': 100.0},
+        clean_data={'seconds': 0.01, 'peak_rss_mb': 105.0},
+        score_one={'seconds': 0.5, 'p50_us': 90.0, 'p99_us': 400.0, 'peak_rss_mb': 120.0}
+    )
+    regressions = compare(results, baseline)
+    assert len(regressions) == 3
+    assert regressions[0].startswith('train: seconds')
+    assert any(r.startswith('score_one: p99_us') for r in regressions)
+    assert any(r.startswith('score_one: peak_rss_mb') for r in regressions)
+    assert not compare(baseline, baseline)
+
+def test_compare_rejects_other_config():
+    """
+    Results are only compared with a baseline of the same configuration.
+    """
+    other = _results()
+    other['config']['rows'] = 2000
+    with pytest.raises(ValueError):
+        compare(_results(), other)
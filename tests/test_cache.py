@@ -0,0 +1,78 @@
+"""
+Tests for the featurized dataset cache.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.cache import DatasetCache
+
+@pytest.fixture(name="source_file")
+def fixture_source_file(tmp_path):
+    """
+    Writes a small source CSV; its content only matters for the fingerprint.
+    """
+    path = tmp_path / 'source.csv'
+    path.write_text("step,amount\n1,10.0\n2,20.0\n", encoding='utf-8')
+    return str(path)
+
+@pytest.fixture(name="frame")
+def fixture_frame():
+    """
+    A small featurized-looking frame.
+    """
+    return pd.DataFrame({
+        'step': np.arange(5, dtype='int32'),
+        'amount': np.linspace(0, 1, 5, dtype='float32'),
+        'type_TRANSFER': [True, False, True, False, True],
+        'isFraud': np.array([0, 1, 0, 0, 1], dtype='int8')
+    })
+
+def test_cache_roundtrip(tmp_path, source_file, frame):
+    """
+    A stored frame is returned memory-mapped with identical columns and dtypes.
+    """
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    assert cache.load(source_file) is None
+
+    cache.store(source_file, frame)
+    cached = cache.load(source_file)
+
+    assert cached is not None
+    assert cached.columns.tolist() == frame.columns.tolist()
+    assert (cached.dtypes == frame.dtypes).all()
+    pd.testing.assert_frame_equal(cached.copy(), frame)
+    # Columns are memory-mapped rather than read into memory
+    base = cached['amount'].to_numpy()
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert base is not None
+
+def test_cache_invalidated_on_change(tmp_path, source_file, frame):
+    """
+    Changing the source file or invalidating explicitly causes a miss.
+    """
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    cache.store(source_file, frame)
+
+    with open(source_file, 'a', encoding='utf-8') as f:
+        f.write("3,30.0\n")
+    assert cache.load(source_file) is None
+
+    cache.store(source_file, frame)
+    assert cache.invalidate(source_file) >= 1
+    assert cache.load(source_file) is None
+
+def test_cache_eviction(tmp_path, frame):
+    """
+    Only the most recently used ``max_entries`` entries are kept.
+    """
+    cache = DatasetCache(str(tmp_path / 'cache'), max_entries=2)
+    for i in range(3):
+        path = tmp_path / f'source_{i}.csv'
+        path.write_text(f"step\n{i}\n", encoding='utf-8')
+        cache.store(str(path), frame)
+
+    assert len(os.listdir(tmp_path / 'cache')) == 2
+    assert cache.load(str(tmp_path / 'source_0.csv')) is None
+    assert cache.load(str(tmp_path / 'source_2.csv')) is not None
@@ -0,0 +1,109 @@
+"""
+Tests for the rule-based pre-filter cascade.
+"""
+import copy
+import os
+import numpy as np
+import pytest
+from src.data_loader import clean_data
+from src.evaluation import evaluate_cascade, evaluate_model, DetectorScorer
+from src.features import feature_frame
+from src.model import FraudDetector
+
+@pytest.fixture(scope="module", name="cascaded")
+def fixture_cascaded(paysim_raw):
+    """
+    A random forest detector with a cascade and its scaled train/test split.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    detector = FraudDetector(model_type='rf')
+    train_feat, test_feat, train_labels, test_labels = detector.prepare_data(data)
+    detector.train(train_feat, train_labels)
+    detector.fit_cascade(train_feat, train_labels, min_support=50, min_samples_leaf=20)
+    return detector, train_feat, test_feat, train_labels, test_labels
+
+def test_cascade_rules(cascaded, paysim_raw):
+    """
+    Fraud-free types are blocked and no training fraud is short-circuited.
+    """
+    detector, train_feat, _, train_labels, _ = cascaded
+    cascade = detector.cascade
+    fraud_types = set(paysim_raw.loc[paysim_raw['isFraud'] == 1, 'type'])
+    assert cascade.blocked_types
+    assert not fraud_types & set(cascade.blocked_types)
+    assert cascade.stage_one is not None
+
+    raw = detector.scaler.inverse_transform(train_feat).astype(np.float32)
+    passing = cascade.passes(raw)
+    assert passing[np.asarray(train_labels) == 1].all()
+    assert passing.mean() < 0.8
+
+def test_cascade_scoring(cascaded, paysim_raw, tmp_path):
+    """
+    Short-circuited rows score 0, the rest score as without the cascade, on
+    every scoring path and after save/load.
+    """
+    detector = cascaded[0]
+    features = feature_frame(clean_data(paysim_raw)).drop(columns=['isFraud'])
+    records = paysim_raw.to_dict('records')
+    passing = detector.cascade.passes(features.to_numpy())
+
+    cascade, detector.cascade = detector.cascade, None
+    expected = detector.predict_proba(features)[:, 1]
+    detector.cascade = cascade
+    expected[~passing] = 0.0
+
+    np.testing.assert_allclose(detector.predict_proba(features)[:, 1], expected, atol=1e-9)
+    np.testing.assert_allclose(detector.score_many(records), expected, atol=1e-6)
+    np.testing.assert_array_equal(detector.predict(features), (expected >= 0.5).astype(int))
+
+    for path in (str(tmp_path / 'model.pkl'), str(tmp_path / 'artifact')):
+        detector.save_model(path)
+        loaded = FraudDetector()
+        loaded.load_model(path)
+        assert loaded.cascade.blocked_types == cascade.blocked_types
+        np.testing.assert_allclose(loaded.predict_proba(features)[:, 1], expected, atol=1e-6)
+        np.testing.assert_allclose(loaded.score_many(records), expected, atol=1e-6)
+
+def test_evaluate_cascade(cascaded, tmp_path):
+    """
+    The cascade report covers pass-through, fraud passed and throughput.
+    """
+    detector, _, test_feat, _, test_labels = cascaded
+    report = evaluate_cascade(detector, test_feat, test_labels, report_dir=str(tmp_path))
+    assert 0 < report['pass_through_rate'] < 1
+    assert 0 <= report['fraud_passed'] <= 1
+    assert report['speedup'] > 0
+    assert os.path.exists(tmp_path / 'cascade_report.json')
+    assert detector.cascade is not None
+
+def test_evaluate_cascade_restores_on_error(cascaded, tmp_path, monkeypatch):
+    """
+    A failing timing run leaves the detector with its cascade.
+    """
+    detector, _, test_feat, _, test_labels = cascaded
+    detector = copy.copy(detector)
+
+    def fail(*args):
+        raise RuntimeError("scoring failed")
+    monkeypatch.setattr(detector, 'predict_proba', fail)
+    with pytest.raises(RuntimeError):
+        evaluate_cascade(detector, test_feat, test_labels, report_dir=str(tmp_path))
+    assert detector.cascade is not None
+
+def test_evaluate_through_cascade(cascaded, tmp_path):
+    """
+    DetectorScorer evaluates the scaled test split with the cascade applied.
+    """
+    detector, _, test_feat, _, test_labels = cascaded
+    scores = DetectorScorer(detector).predict_proba(test_feat)[:, 1]
+    bare = detector.model.predict_proba(test_feat)[:, 1]
+    raw = detector.scaler.inverse_transform(test_feat)
+    passing = detector.cascade.passes(np.asarray(raw, dtype=np.float32))
+    assert not passing.all()
+    assert (scores[~passing] == 0).all()
+    np.testing.assert_allclose(scores[passing], bare[passing], atol=1e-6)
+
+    metrics = evaluate_model(DetectorScorer(detector), test_feat, test_labels,
+                             report_dir=str(tmp_path), plots=False)
+    assert 0.5 < metrics['auc'] <= 1.0
@@ -0,0 +1,100 @@
+"""
+Tests for the compiled tree evaluator.
+"""
+import numpy as np
+import pytest
+from src.compiled import compile_model, fold_thresholds
+from src.data_loader import clean_data
+from src.features import feature_frame
+from src.model import FraudDetector
+
+@pytest.fixture(scope="module", name="features")
+def fixture_features(paysim_raw):
+    """
+    Raw feature frame of the synthetic sample.
+    """
+    return feature_frame(clean_data(paysim_raw)).drop(columns=['isFraud'])
+
+def test_fold_thresholds():
+    """
+    Folded thresholds route every float32 value like the scaled comparison.
+    """
+    rng = np.random.default_rng(0)
+    values = (rng.standard_normal(5000) * 1e5).astype(np.float32)
+    thresholds = rng.standard_normal(50)
+    mean = np.float32(1234.5)
+    scale = np.float32(6789.25)
+
+    scaled = (values - mean) / scale
+    for strict in (False, True):
+        folded = fold_thresholds(thresholds, np.full(50, mean), np.full(50, scale), strict=strict)
+        for threshold, raw_threshold in zip(thresholds, folded):
+            expected = scaled < threshold if strict else scaled <= threshold
+            np.testing.assert_array_equal(values <= raw_threshold, expected)
+
+@pytest.mark.parametrize("rows", [1, 10, 2000])
+def test_compiled_forest(trained_detector, features, rows):
+    """
+    The compiled forest matches predict_proba on small and large batches.
+    """
+    batch = features.iloc[:rows]
+    compiled = compile_model(
+        trained_detector.model, trained_detector.scaler, 'rf', batch.shape[1]
+    )
+    expected = trained_detector.predict_proba(batch)
+    np.testing.assert_allclose(compiled.predict_proba(batch.to_numpy()), expected, atol=1e-9)
+
+def test_compiled_xgb_roundtrip(paysim_raw, features, tmp_path):
+    """
+    A compiled XGBoost detector matches the booster and survives save/load.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    detector = FraudDetector(model_type='xgb')
+    train_feat, _, train_labels, _ = detector.prepare_data(data)
+    detector.train(train_feat, train_labels)
+    expected = detector.predict_proba(features)[:, 1]
+
+    detector.compile()
+    np.testing.assert_allclose(detector.predict_proba(features)[:, 1], expected, atol=1e-6)
+
+    path = str(tmp_path / 'compiled.pkl')
+    detector.save_model(path)
+    loaded = FraudDetector()
+    loaded.load_model(path)
+    assert loaded.compiled is not None
+    np.testing.assert_allclose(
+        loaded.score_many(paysim_raw.iloc[:50].to_dict('records')), expected[:50], atol=1e-6
+    )
+    np.testing.assert_array_equal(loaded.predict(features), (expected >= 0.5).astype(int))
+
+def test_artifact_directory(trained_detector, features, paysim_raw, tmp_path):
+    """
+    Directory artifacts memory-map the compiled arrays and load the estimator lazily.
+    """
+    path = str(tmp_path / 'artifact')
+    detector = FraudDetector()
+    detector.model = trained_detector.model
+    detector.scaler = trained_detector.scaler
+    detector.feature_names = trained_detector.feature_names
+    detector.save_model(path)
+    expected = trained_detector.predict_proba(features)[:, 1]
+
+    loaded = FraudDetector()
+    loaded.load_model(path)
+    assert isinstance(loaded.compiled.threshold.base, np.memmap)
+    np.testing.assert_allclose(loaded.predict_proba(features)[:, 1], expected, atol=1e-9)
+    np.testing.assert_allclose(
+        loaded.score_many(paysim_raw.iloc[:20].to_dict('records')), expected[:20], atol=1e-9
+    )
+    np.testing.assert_allclose(
+        loaded.scaler.transform(features), trained_detector.scaler.transform(features)
+    )
+    assert loaded._model is None # pylint: disable=protected-access
+
+    # The estimator is only read when it is needed
+    assert loaded.model.n_estimators == trained_detector.model.n_estimators
+
+    # Saving again replaces the artifact in place
+    detector.save_model(path)
+    loaded.load_model(path)
+    assert loaded.model_type == 'rf'
@@ -2,9 +2,10 @@
 Unit tests for individual components of the pipeline.
 """
 import pytest
+import numpy as np
 import pandas as pd
-from src.data_loader import clean_data
-from src.features import feature_engineering
+from src.data_loader import clean_data, load_data, iter_clean_chunks, RAW_DTYPES
+from src.features import feature_engineering, feature_matrix, feature_frame, FEATURE_COLUMNS
 from src.model import FraudDetector
 
 @pytest.fixture
@@ -73,3 +74,124 @@ def test_model_training(sample_data): # pylint: disable=redefined-outer-name
     # from prepare_data is already scaled
     preds = detector.model.predict(test_feat)
     assert len(preds) == len(data) - len(train_labels) # Check lengths match test set
+
+def test_streaming_load(sample_data, tmp_path): # pylint: disable=redefined-outer-name
+    """
+    Test chunked loading with the explicit schema.
+    """
+    path = tmp_path / 'sample.csv'
+    sample_data.to_csv(path, index=False)
+
+    chunks = list(iter_clean_chunks(str(path), chunksize=4, skip_names=True))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+    chunk = chunks[0]
+    assert 'oldBalanceOrig' in chunk.columns
+    assert 'nameOrig' not in chunk.columns
+    assert chunk['step'].dtype == 'int32'
+    assert chunk['amount'].dtype == chunk['oldBalanceOrig'].dtype == 'float64'
+    assert isinstance(chunk['type'].dtype, pd.CategoricalDtype)
+
+    # Chunked loading yields the same rows as the eager path
+    eager = clean_data(load_data(str(path)))
+    typed = clean_data(load_data(str(path), chunksize=4))
+    assert len(typed) == len(eager)
+    assert (typed['amount'].values == eager['amount'].values).all()
+
+def test_feature_matrix(sample_data): # pylint: disable=redefined-outer-name
+    """
+    Test the fixed-schema feature kernel against feature_engineering.
+    """
+    data = clean_data(sample_data)
+    matrix = feature_matrix(data)
+    assert matrix.shape == (len(data), len(FEATURE_COLUMNS))
+    assert matrix.dtype == np.float32
+
+    # With the full category set get_dummies produces the same schema
+    typed = data.copy()
+    typed['type'] = typed['type'].astype(RAW_DTYPES['type'])
+    expected = feature_engineering(typed)[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    np.testing.assert_allclose(matrix, expected, rtol=1e-6)
+
+    # A single row is encoded exactly like the same row in a larger batch
+    single = feature_matrix(data.iloc[[1]])
+    np.testing.assert_array_equal(single[0], matrix[1])
+
+def test_balance_errors_full_precision(trained_detector):
+    """
+    Balance error terms of large balances are computed before rounding to float32.
+    """
+    record = {'step': 1, 'type': 'TRANSFER', 'amount': 1234.56,
+              'oldBalanceOrig': 35_000_000.17, 'newBalanceOrig': 35_001_234.73,
+              'oldBalanceDest': 35_001_234.73, 'newBalanceDest': 35_000_000.17}
+    # 2469.12; float32 balances give 2470.56
+    expected = np.float32(35_001_234.73 + 1234.56 - 35_000_000.17)
+    matrix = feature_matrix(pd.DataFrame([record]))
+    assert matrix[0, FEATURE_COLUMNS.index('errorBalanceOrig')] == expected
+    assert matrix[0, FEATURE_COLUMNS.index('errorBalanceDest')] == expected
+
+    # score_many fills its raw buffer the same way from records
+    trained_detector.score_many([record])
+    raw, _ = trained_detector._buffers(1) # pylint: disable=protected-access
+    np.testing.assert_array_equal(raw[0], matrix[0])
+
+def test_score_one_matches_predict_proba(trained_detector, paysim_raw):
+    """
+    Test the pandas-free scoring path against predict_proba.
+    """
+    data = clean_data(paysim_raw.iloc[:200])
+    expected = trained_detector.predict_proba(feature_frame(data).drop(columns=['isFraud']))[:, 1]
+
+    # Raw PaySim field names are accepted as well as cleaned ones
+    records = paysim_raw.iloc[:200].to_dict('records')
+    np.testing.assert_allclose(trained_detector.score_many(records), expected, atol=1e-9)
+    assert trained_detector.score_one(records[3]) == pytest.approx(expected[3])
+
+    cleaned = data.iloc[[7]].to_dict('records')[0]
+    assert trained_detector.score_one(cleaned) == pytest.approx(expected[7])
+
+    # An unknown type is an error, not an all-zero type encoding
+    with pytest.raises(ValueError, match='TRANSFR'):
+        trained_detector.score_many([records[0], {**records[1], 'type': 'TRANSFR'}])
+
+def test_score_many_xgb(paysim_raw):
+    """
+    Test the pandas-free scoring path for XGBoost models.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    detector = FraudDetector(model_type='xgb')
+    train_feat, _, train_labels, _ = detector.prepare_data(data)
+    detector.train(train_feat, train_labels)
+
+    expected = detector.predict_proba(data.drop(columns=['isFraud']))[:, 1]
+    actual = detector.score_many(paysim_raw.to_dict('records'))
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+@pytest.mark.parametrize("scale", [True, False])
+def test_prepare_data_lean(paysim_raw, scale):
+    """
+    Test the lean split: same rows as prepare_data, float32 arrays scaled in place.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    features = data.drop(columns=['isFraud'])
+    reference = FraudDetector().prepare_data(data)
+
+    detector = FraudDetector(model_type='xgb')
+    train_feat, test_feat, train_labels, test_labels = detector.prepare_data_lean(data, scale=scale)
+    assert train_feat.dtype == np.float32 and train_feat.flags.c_contiguous
+    np.testing.assert_array_equal(train_labels, reference[2])
+    np.testing.assert_array_equal(test_labels, reference[3])
+    if scale:
+        np.testing.assert_allclose(train_feat, reference[0], atol=1e-6)
+        np.testing.assert_allclose(test_feat, reference[1], atol=1e-6)
+    else:
+        np.testing.assert_array_equal(train_feat, features.to_numpy()[reference[2].index])
+
+    # Inference applies the same (possibly identity) scaler
+    detector.train(train_feat, train_labels)
+    np.testing.assert_allclose(
+        detector.predict_proba(features.iloc[reference[3].index])[:, 1],
+        detector.model.predict_proba(test_feat)[:, 1], atol=1e-6
+    )
+    np.testing.assert_allclose(detector.score_many(paysim_raw.to_dict('records')),
+                               detector.predict_proba(features)[:, 1], atol=1e-6)
@@ -0,0 +1,107 @@
+"""
+Tests for the threshold sweep and the cost-based operating point.
+"""
+import copy
+import os
+import numpy as np
+from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+from src.data_loader import clean_data
+from src.evaluation import (
+    decide, evaluate_model, evaluate_stream, operating_point, sweep_auc, sweep_scores,
+    ScoreHistogram
+)
+from src.features import feature_frame
+from src.model import FraudDetector
+
+def _scores(rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = (rng.random(rows) < 0.05).astype(np.int8)
+    # Multiples of 1/64 (exact in binary), so there are plenty of tied scores
+    probs = np.round(np.clip(rng.normal(0.2 + 0.5 * labels, 0.2), 0, 1) * 64) / 64
+    return probs, labels
+
+def test_sweep_matches_sklearn():
+    """
+    Every row of the sweep matches the metrics of thresholding directly.
+    """
+    probs, labels = _scores()
+    sweep = sweep_scores(probs, labels, costs={'fp': 1.0, 'fn': 20.0})
+    assert sweep['tp'][0] == sweep['fp'][0] == 0
+    assert sweep['tp'][-1] + sweep['fp'][-1] == len(labels)
+    assert np.all(np.diff(sweep['threshold']) < 0)
+
+    for i in range(1, len(sweep['threshold']), 7):
+        flagged = probs >= sweep['threshold'][i]
+        assert sweep['precision'][i] == precision_score(labels, flagged)
+        assert sweep['recall'][i] == recall_score(labels, flagged)
+        np.testing.assert_allclose(sweep['f1'][i], f1_score(labels, flagged))
+        cost = (np.sum(flagged & (labels == 0)) + 20.0 * np.sum(~flagged & (labels == 1)))
+        np.testing.assert_allclose(sweep['expected_cost'][i], cost / len(labels))
+
+    assert abs(sweep_auc(sweep) - roc_auc_score(labels, probs)) < 1e-12
+    best = operating_point(sweep)
+    assert best['expected_cost'] == sweep['expected_cost'].min()
+
+def test_histogram_sweep():
+    """
+    Chunked histograms merge to the exact sweep when scores sit on bin edges.
+    """
+    probs, labels = _scores()
+    exact = sweep_scores(probs, labels)
+    halves = [ScoreHistogram(bins=64).add(probs[part], labels[part])
+              for part in (slice(None, 2000), slice(2000, None))]
+    sweep = halves[0].merge(halves[1]).sweep()
+
+    np.testing.assert_allclose(sweep['threshold'][1:], exact['threshold'][1:])
+    for key in ('tp', 'fp', 'precision', 'recall', 'expected_cost'):
+        np.testing.assert_allclose(sweep[key], exact[key])
+
+def test_evaluate_stream(tmp_path):
+    """
+    Streaming evaluation reports the AUC and operating point of the chunks.
+    """
+    probs, labels = _scores()
+    chunks = ((probs[i:i + 1000], labels[i:i + 1000]) for i in range(0, len(labels), 1000))
+    result = evaluate_stream(chunks, bins=64, report_dir=str(tmp_path))
+    assert abs(result['auc'] - roc_auc_score(labels, probs)) < 1e-12
+    assert os.path.exists(tmp_path / 'operating_point.json')
+
+def test_evaluate_model_threshold(paysim_raw, tmp_path):
+    """
+    The operating point is stored on the detector, used by predict and saved.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    detector = FraudDetector(model_type='rf')
+    train_feat, test_feat, train_labels, test_labels = detector.prepare_data(data)
+    detector.train(train_feat, train_labels)
+
+    metrics = evaluate_model(detector.model, test_feat, test_labels,
+                             report_dir=str(tmp_path), plots=False)
+    assert 0.5 < metrics['auc'] <= 1.0
+    assert not os.path.exists(tmp_path / 'roc_curve.png')
+
+    features = data.drop(columns=['isFraud'])
+    probs = detector.predict_proba(features)[:, 1]
+    detector.threshold = 0.3
+    np.testing.assert_array_equal(detector.predict(features), (probs >= 0.3).astype(int))
+
+    path = str(tmp_path / 'artifact')
+    detector.save_model(path)
+    loaded = FraudDetector()
+    loaded.load_model(path)
+    assert loaded.threshold == 0.3
+
+def test_decision_rule(trained_detector, paysim_raw):
+    """
+    predict flags a probability equal to the threshold, like every other scoring path.
+    """
+    assert decide([0.49, 0.5, 0.51]).tolist() == [0, 1, 1]
+    assert decide([0.2, 0.3], threshold=0.3).tolist() == [0, 1]
+
+    features = feature_frame(clean_data(paysim_raw)).drop(columns=['isFraud'])
+    detector = copy.copy(trained_detector)
+    probs = detector.predict_proba(features)[:, 1]
+    detector.threshold = float(probs[0])
+    assert detector.predict(features.iloc[:1]).tolist() == [1]
+    detector.threshold = None
+    np.testing.assert_array_equal(detector.predict(features), probs >= 0.5)
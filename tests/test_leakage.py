@@ -1,8 +1,10 @@
 """
 Tests for data leakage in feature engineering.
 """
+import os
 import pandas as pd
 import pytest
+from benchmarks.synthetic import generate_paysim
 from src.features import feature_engineering
 from src.data_loader import clean_data
 
@@ -16,7 +18,11 @@ def fixture_clean_sample_data():
         # Using a small chunk to keep tests fast
         data = pd.read_csv('data/PS_20174392719_1491204439457_log.csv', nrows=1000)
     except FileNotFoundError:
-        data = pd.read_csv('data/dummy.csv')
+        if os.path.exists('data/dummy.csv'):
+            data = pd.read_csv('data/dummy.csv')
+        else:
+            # No data checked out: seeded synthetic rows with the same schema
+            data = generate_paysim(1000, seed=0, fraud_rate=0.05)
 
     return clean_data(data)
 
@@ -0,0 +1,136 @@
+"""
+Tests for feature and score drift monitoring.
+"""
+import json
+import numpy as np
+import pytest
+from src.data_loader import clean_data
+from src.features import feature_frame, FEATURE_COLUMNS
+from src.model import FraudDetector
+from src.monitoring import build_reference, write_drift_report, DriftMonitor, DriftReference
+from src.scoring import score_file
+
+@pytest.fixture(scope="module", name="monitored")
+def fixture_monitored(paysim_raw):
+    """
+    A random forest detector with a drift reference on its test split.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    detector = FraudDetector(model_type='rf')
+    train_feat, test_feat, train_labels, _ = detector.prepare_data(data)
+    detector.train(train_feat, train_labels)
+    detector.fit_reference(test_feat)
+    return detector
+
+def test_psi_and_ks():
+    """
+    The reference sample shows no drift; a shifted feature is flagged.
+    """
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(20_000, 3))
+    probabilities = rng.random(20_000)
+    reference = build_reference(features, probabilities, ['a', 'b', 'c'])
+    assert [len(e) for e in reference.edges] == [9, 9, 9]
+
+    monitor = DriftMonitor(reference)
+    monitor.update(features, probabilities)
+    report = monitor.report()
+    assert report['rows'] == 20_000 and report['drifted'] == []
+    assert max(stats['psi'] for stats in report['features'].values()) == pytest.approx(0, abs=1e-9)
+
+    monitor.reset()
+    shifted = rng.normal(size=(5_000, 3))
+    shifted[:, 1] += 1.0
+    monitor.update(shifted, rng.random(5_000))
+    report = monitor.report()
+    assert report['drifted'] == ['b']
+    assert report['features']['b']['ks'] > 0.3
+    assert report['features']['a']['psi'] < 0.05 and report['probability']['psi'] < 0.05
+
+def test_reconstructed_reference():
+    """
+    With a tolerance, flags reconstructed with rounding noise bin like the
+    exact live values.
+    """
+    rng = np.random.default_rng(2)
+    flags = (rng.random((4000, 1)) < 0.3).astype(np.float64)
+    noisy = flags + 4.7e-10
+    probabilities = rng.random(4000)
+
+    exact = DriftMonitor(build_reference(noisy, probabilities, ['flag'], tolerance=[1e-8]))
+    exact.update(flags, probabilities)
+    assert exact.report()['features']['flag']['psi'] == pytest.approx(0, abs=1e-9)
+
+    naive = DriftMonitor(build_reference(noisy, probabilities, ['flag']))
+    naive.update(flags, probabilities)
+    assert naive.report()['drifted'] == ['flag']
+
+def test_bounded_state():
+    """
+    Counts stay the same size however much is scored, and columns are
+    matched by name.
+    """
+    rng = np.random.default_rng(1)
+    reference = build_reference(rng.normal(size=(1000, 2)), rng.random(1000), ['a', 'b'])
+    monitor = DriftMonitor(reference)
+    batch = rng.normal(size=(1000, 2))
+    for _ in range(20):
+        monitor.update(batch, rng.random(1000))
+    counts, probability_counts = monitor.snapshot()
+    assert [len(c) for c in counts] == [10, 10] and len(probability_counts) == 10
+    assert monitor.rows == 20_000
+
+    swapped = DriftMonitor(reference)
+    swapped.update(batch[:, ::-1], np.zeros(1000), columns=['b', 'a'])
+    np.testing.assert_array_equal(swapped.snapshot()[0][0] * 20, counts[0])
+
+    restored = DriftReference.from_dict(json.loads(json.dumps(reference.to_dict())))
+    np.testing.assert_array_equal(restored.edges[1], reference.edges[1])
+
+def test_scoring_paths_feed_monitor(monitored, paysim_raw, tmp_path):
+    """
+    The reference survives save/load, and predict_proba, score_many and
+    score_file all count into the monitor.
+    """
+    features = feature_frame(clean_data(paysim_raw)).drop(columns=['isFraud'])
+    records = paysim_raw.to_dict('records')
+    for path in (str(tmp_path / 'model.pkl'), str(tmp_path / 'artifact')):
+        monitored.save_model(path)
+        loaded = FraudDetector()
+        loaded.load_model(path)
+        assert loaded.reference.feature_names == monitored.reference.feature_names
+        np.testing.assert_array_equal(loaded.reference.probability_counts,
+                                      monitored.reference.probability_counts)
+
+        monitor = loaded.start_monitoring()
+        loaded.predict_proba(features)
+        loaded.score_many(records)
+        assert monitor.rows == 2 * len(features)
+        # Both paths see the same rows, so the counts double exactly
+        by_frame = DriftMonitor(loaded.reference)
+        by_frame.update(features[loaded.reference.feature_names].to_numpy(),
+                        np.zeros(len(features)))
+        np.testing.assert_array_equal(monitor.snapshot()[0][0], 2 * by_frame.snapshot()[0][0])
+
+    input_csv = tmp_path / 'input.csv'
+    paysim_raw.to_csv(input_csv, index=False)
+    monitor = DriftMonitor(monitored.reference)
+    score_file(str(tmp_path / 'model.pkl'), str(input_csv), str(tmp_path / 'scores.csv'),
+               chunksize=500, monitor=monitor)
+    report = monitor.report()
+    assert report['rows'] == len(features)
+    # The reference is the test split of the same data, unscaled from float32
+    assert report['drifted'] == []
+    assert set(report['features']) == set(FEATURE_COLUMNS) & set(monitored.reference.feature_names)
+
+    path = tmp_path / 'reports' / 'drift.json'
+    write_drift_report(report, str(path))
+    assert json.loads(path.read_text(encoding='utf-8'))['rows'] == len(features)
+
+def test_start_monitoring_requires_reference(trained_detector):
+    """
+    Models trained without a reference cannot be monitored.
+    """
+    with pytest.raises(ValueError):
+        FraudDetector().start_monitoring()
+    assert trained_detector.monitor is None
@@ -0,0 +1,66 @@
+"""
+Tests for parallel featurization into shared memory.
+"""
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import pytest
+from src import parallel
+from src.data_loader import clean_data
+from src.features import feature_frame
+from src.parallel import _scratch_root, csv_shards, featurize_parallel, SharedFeatures
+from src.scoring import score_file
+
+def test_featurize_parallel(paysim_raw, tmp_path):
+    """
+    Sharded featurization matches the serial path row for row, with null
+    rows dropped and source row numbers kept.
+    """
+    raw = paysim_raw.copy()
+    raw.loc[[0, 700, 1999], 'amount'] = np.nan
+    path = str(tmp_path / 'input.csv')
+    raw.to_csv(path, index=False)
+    shards = csv_shards(path, shard_bytes=20_000)
+    assert len(shards) > 4
+    assert all(stop == start for (_, stop), (start, _) in zip(shards, shards[1:]))
+
+    cleaned = clean_data(pd.read_csv(path))
+    expected = feature_frame(cleaned)
+    with featurize_parallel(path, workers=2, shard_bytes=20_000, chunksize=100,
+                            directory=str(tmp_path)) as shared:
+        data = shared.frame()
+        np.testing.assert_array_equal(shared.ids, cleaned.index.to_numpy())
+        directory = shared.directory
+    assert not os.path.exists(directory)
+    # The frame stays usable after the files are removed
+    pd.testing.assert_frame_equal(data, expected, check_dtype=False)
+    assert data['isFraud'].sum() == raw.loc[cleaned.index, 'isFraud'].sum()
+
+def test_score_file_shared(model_path, paysim_raw, tmp_path):
+    """
+    Scoring slices of the shared matrix gives the same output as the pool
+    of pickled chunks.
+    """
+    path = str(tmp_path / 'input.csv')
+    paysim_raw.drop(columns=['isFraud']).to_csv(path, index=False)
+    pooled = str(tmp_path / 'pooled.csv')
+    shared = str(tmp_path / 'shared.csv')
+    score_file(model_path, path, pooled, chunksize=300, workers=2)
+    assert score_file(model_path, path, shared, chunksize=300, workers=2, shared=True) == 2000
+    pd.testing.assert_frame_equal(pd.read_csv(pooled), pd.read_csv(shared))
+
+def test_scratch_root_falls_back(monkeypatch):
+    """
+    A /dev/shm too small for the arrays is passed over for the temporary directory.
+    """
+    if not os.path.isdir('/dev/shm'):
+        pytest.skip("no /dev/shm")
+    free = os.statvfs('/dev/shm')
+    free = free.f_bavail * free.f_frsize
+    assert _scratch_root(free // 2) == '/dev/shm'
+    assert _scratch_root(free + 1) is None
+
+    monkeypatch.setattr(parallel, '_scratch_root', lambda nbytes: None)
+    with SharedFeatures.allocate(10) as shared:
+        assert os.path.dirname(shared.directory) == tempfile.gettempdir()
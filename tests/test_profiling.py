@@ -0,0 +1,96 @@
+"""
+Tests for timing spans, stage profiling and the audit summary.
+"""
+import json
+import logging
+import os
+import numpy as np
+import pytest
+from src.profiling import (
+    enable_profiling, format_summary, read_spans, span, summarize, traced
+)
+from src.utils import LOGGER_NAME
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.spans = []
+
+    def emit(self, record):
+        if hasattr(record, 'span'):
+            self.spans.append(record.span)
+
+@pytest.fixture(name="captured")
+def fixture_captured():
+    """
+    Span records logged while the test runs.
+    """
+    logit = logging.getLogger(LOGGER_NAME)
+    handler = _Capture()
+    level = logit.level
+    logit.addHandler(handler)
+    logit.setLevel(logging.INFO)
+    yield handler.spans
+    logit.removeHandler(handler)
+    logit.setLevel(level)
+    enable_profiling(())
+
+@traced('double')
+def _double(values):
+    return np.concatenate([values, values])
+
+def test_span_fields(captured):
+    """
+    Spans record timings, rows and memory, with the enclosing span as parent.
+    """
+    with span('outer', rows_in=3) as outer:
+        _double(np.zeros(5))
+        outer.rows_out = 2
+    with pytest.raises(ValueError):
+        with span('broken'):
+            raise ValueError("boom")
+
+    inner, outer, broken = captured
+    assert inner['stage'] == 'double' and inner['parent'] == 'outer'
+    assert (inner['rows_in'], inner['rows_out']) == (5, 10)
+    assert (outer['rows_in'], outer['rows_out'], outer['parent']) == (3, 2, None)
+    assert outer['wall_s'] >= inner['wall_s'] >= 0
+    assert outer['peak_rss_mb'] > 0 and outer['peak_rss_delta_mb'] >= 0
+    assert broken['failed'] and not outer['failed']
+
+@pytest.mark.parametrize("mode, suffix", [('cprofile', '.prof'), ('tracemalloc', '.tracemalloc')])
+def test_stage_profiling(captured, tmp_path, mode, suffix):
+    """
+    Only the requested stages are profiled, and their output is written.
+    """
+    enable_profiling(['double'], mode=mode, directory=str(tmp_path))
+    with span('outer'):
+        _double(np.zeros(1000))
+
+    inner, outer = captured
+    assert inner['profile'].endswith(suffix) and os.path.exists(inner['profile'])
+    assert 'profile' not in outer
+
+def test_summary(captured, tmp_path):
+    """
+    The summary adds up repeated stages and reports top-level shares.
+    """
+    with span('run'):
+        for _ in range(3):
+            _double(np.zeros(4))
+    with span('other'):
+        pass
+
+    path = tmp_path / 'audit.json'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("not json\n")
+        for record in captured:
+            f.write(json.dumps({'message': 'x', 'span': record}) + "\n")
+
+    summary = {entry['stage']: entry for entry in summarize(read_spans(str(path)))}
+    assert summary['double']['calls'] == 3
+    assert summary['double']['rows_out'] == 24
+    assert summary['double']['share'] is None
+    assert summary['run']['share'] + summary['other']['share'] == pytest.approx(1.0)
+    table = format_summary(list(summary.values()))
+    assert table.splitlines()[2].strip().startswith('double')
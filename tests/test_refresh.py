@@ -0,0 +1,123 @@
+"""
+Tests for incremental model refresh.
+"""
+import copy
+import numpy as np
+import pytest
+from src.data_loader import clean_data
+from src.features import feature_frame
+from src.model import FraudDetector
+from src.refresh import rescale_model, retire_trees
+import src.model
+
+@pytest.fixture(scope="module", name="windows")
+def fixture_windows(paysim_raw):
+    """
+    The featurized sample split by step into history and a new window.
+    """
+    data = feature_frame(clean_data(paysim_raw))
+    cut = data['step'].quantile(0.7)
+    return data[data['step'] <= cut], data[data['step'] > cut]
+
+def _trained(model_type, history):
+    params = {'n_estimators': 20, 'verbose': 0} if model_type == 'rf' else {'n_estimators': 20}
+    detector = FraudDetector(model_type=model_type, params=params)
+    train_features, _, train_labels, _ = detector.prepare_data(history)
+    detector.train(train_features, train_labels)
+    return detector
+
+@pytest.mark.parametrize("model_type", ['rf', 'xgb'])
+def test_rescaled_trees(windows, model_type):
+    """
+    Forest trees rescaled to new scaler statistics score rows as before.
+    """
+    history, window = windows
+    detector = _trained(model_type, history)
+    features = window.drop(columns=['isFraud'])
+    scaler = copy.deepcopy(detector.scaler).partial_fit(features)
+    assert not np.allclose(scaler.mean_, detector.scaler.mean_)
+
+    rescaled, changed = rescale_model(detector.model, model_type, detector.scaler, scaler,
+                                      features)
+    if model_type == 'rf':
+        # sklearn thresholds sit between training values
+        assert changed == 0
+        before = detector.model.predict_proba(detector.scaler.transform(features))[:, 1]
+        after = rescaled.predict_proba(scaler.transform(features))[:, 1]
+        np.testing.assert_array_equal(before, after)
+    assert rescaled is not detector.model
+    # Unchanged statistics leave every threshold in place
+    assert rescale_model(detector.model, model_type, detector.scaler, detector.scaler,
+                         features)[1] == 0
+
+def test_update_forest(windows, tmp_path):
+    """
+    A forest update adds trees, retires old ones by age and is saved with its history.
+    """
+    history, window = windows
+    detector = _trained('rf', history)
+    features = window.drop(columns=['isFraud'])
+    first, last = int(window['step'].min()), int(window['step'].max())
+    detector.update(features, window['isFraud'], n_estimators=5)
+    assert len(detector.model.estimators_) == 25
+    assert detector.refresh['tree_steps'] == [first - 1] * 20 + [last] * 5
+    assert detector.refresh['history'][0]['rows'] == len(window)
+
+    detector.update(features, window['isFraud'], n_estimators=5, max_tree_age=last - first)
+    assert len(detector.model.estimators_) == 10
+    assert detector.refresh['history'][-1]['trees_retired'] == 20
+    # Each refresh draws its own seed rather than repeating the first one's trees
+    seeds = [tree.random_state for tree in detector.model.estimators_]
+    assert set(seeds[:5]).isdisjoint(seeds[5:])
+    expected = detector.predict_proba(features)[:, 1]
+
+    for path in (str(tmp_path / 'model.pkl'), str(tmp_path / 'artifact')):
+        detector.save_model(path)
+        loaded = FraudDetector()
+        loaded.load_model(path)
+        assert loaded.refresh == detector.refresh
+        np.testing.assert_allclose(loaded.predict_proba(features)[:, 1], expected, atol=1e-6)
+    # Scalers restored from an artifact can be updated again
+    loaded.update(features, window['isFraud'], n_estimators=2)
+    assert loaded.compiled.n_trees == 12
+
+def test_update_xgb(windows, monkeypatch):
+    """
+    An XGBoost update boosts extra rounds, keeping the old scaler when
+    rescaling would change the existing trees' scores.
+    """
+    history, window = windows
+    detector = _trained('xgb', history)
+    features = window.drop(columns=['isFraud'])
+    scaler = detector.scaler
+
+    def changes_scores(model, model_type, old_scaler, new_scaler, X):
+        return rescale_model(model, model_type, old_scaler, new_scaler, X)[0], 1
+    monkeypatch.setattr(src.model, 'rescale_model', changes_scores)
+    detector.update(features, window['isFraud'], n_estimators=7)
+    assert detector.model.get_booster().num_boosted_rounds() == 27
+    assert detector.scaler is scaler
+    assert not detector.refresh['history'][0]['scaler_updated']
+    assert detector.model.get_params()['max_delta_step'] == 1.0
+    probabilities = detector.predict_proba(features)[:, 1]
+    assert probabilities[window['isFraud'].to_numpy() == 1].mean() > 0.5
+
+def test_update_rejects(windows):
+    """
+    Windows without both classes and downsampled models are refused.
+    """
+    history, window = windows
+    detector = _trained('rf', history)
+    legitimate = window[window['isFraud'] == 0]
+    with pytest.raises(ValueError):
+        detector.update(legitimate.drop(columns=['isFraud']), legitimate['isFraud'])
+    detector.sampling = {'negative_rates': {}, 'negatives_kept': 1, 'negatives_seen': 2}
+    with pytest.raises(ValueError):
+        detector.update(window.drop(columns=['isFraud']), window['isFraud'])
+
+def test_retire_trees():
+    """
+    Trees older than the maximum age are dropped; no age keeps every tree.
+    """
+    assert retire_trees([10, 10, 40, 50], 50, 20) == [2, 3]
+    assert retire_trees([10, 50], 50, None) == [0, 1]
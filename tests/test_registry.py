@@ -0,0 +1,68 @@
+"""
+Tests for the file-based model registry.
+"""
+import copy
+import json
+import os
+import numpy as np
+import pytest
+from src.features import FEATURE_COLUMNS
+from src.registry import ModelRegistry
+
+@pytest.fixture(name="registry")
+def fixture_registry(tmp_path):
+    """
+    An empty registry in a temporary directory.
+    """
+    return ModelRegistry(str(tmp_path / 'registry'))
+
+def test_register_promote_rollback(trained_detector, paysim_raw, registry):
+    """
+    Versions are numbered in order, promoted on registration and rolled back
+    by promoting an older one; every move is kept in the history.
+    """
+    assert registry.versions() == [] and registry.current() is None
+    with pytest.raises(ValueError):
+        registry.model_path()
+
+    detector = copy.copy(trained_detector)
+    first = registry.register(detector, metrics={'auc': 0.9}, data_fingerprint='abc')
+    second = registry.register(detector, promote=False)
+    assert (first, second) == ('v0001', 'v0002')
+    assert registry.versions() == [first, second] and registry.current() == first
+
+    registry.promote(second)
+    registry.promote(first)
+    assert registry.current() == first
+    with open(os.path.join(registry.root, 'history.jsonl'), encoding='utf-8') as f:
+        moves = [(entry['previous'], entry['version']) for entry in map(json.loads, f)]
+    assert moves == [(None, first), (first, second), (second, first)]
+    with pytest.raises(ValueError):
+        registry.promote('v0042')
+
+    loaded = registry.load(second)
+    sample = paysim_raw.iloc[:50]
+    np.testing.assert_allclose(loaded.score_many(json.loads(sample.to_json(orient='records'))),
+                               trained_detector.score_many(
+                                   json.loads(sample.to_json(orient='records'))), atol=1e-6)
+
+def test_metadata_and_immutability(trained_detector, registry):
+    """
+    Metadata records the schema, metrics and data fingerprint; version files are read-only.
+    """
+    version = registry.register(copy.copy(trained_detector), metrics={'auc': 0.9},
+                                data_fingerprint='abc', data='paysim.csv')
+    metadata = registry.metadata(version)
+    assert metadata['version'] == version
+    assert metadata['feature_names'] == FEATURE_COLUMNS
+    assert metadata['metrics'] == {'auc': 0.9}
+    assert metadata['data_fingerprint'] == 'abc' and metadata['data'] == 'paysim.csv'
+    assert metadata['parent'] is None
+
+    directory = os.path.dirname(registry.model_path(version))
+    for parent, _, files in os.walk(directory):
+        for name in files:
+            assert not os.stat(os.path.join(parent, name)).st_mode & 0o222
+    # Staging directories never show up as versions
+    assert not [name for name in os.listdir(registry.versions_dir) if name.startswith('.')]
+    assert registry.metadata(registry.register(copy.copy(trained_detector)))['parent'] == version
@@ -0,0 +1,106 @@
+"""
+Tests for the time-ordered replay harness.
+"""
+import json
+import time
+import numpy as np
+import pytest
+from src.replay import LatencyHistogram, iter_steps, replay
+
+@pytest.fixture(name="paysim_csv")
+def fixture_paysim_csv(paysim_raw, tmp_path):
+    """
+    The synthetic sample written as a raw PaySim CSV (sorted by step).
+    """
+    path = tmp_path / 'paysim.csv'
+    paysim_raw.to_csv(path, index=False)
+    return str(path)
+
+def test_latency_histogram():
+    """
+    Percentiles are exact below 256us and within 1/128 of the true value above.
+    """
+    histogram = LatencyHistogram()
+    values = np.random.default_rng(0).lognormal(-7, 1.5, 20000)
+    for value in values:
+        histogram.record(value)
+    for percent in (50, 90, 99, 99.9):
+        expected = np.percentile((values * 1e6).astype(int), percent, method='inverted_cdf')
+        assert expected <= histogram.percentile(percent) <= expected * (1 + 1 / 128)
+    assert histogram.percentile(100) == histogram.max == int(values.max() * 1e6)
+
+    small = LatencyHistogram()
+    for micros in (3, 7, 7, 250):
+        small.record(micros / 1e6)
+    assert [small.percentile(p) for p in (25, 50, 75, 100)] == [3, 7, 7, 250]
+    lines = small.percentile_distribution().splitlines()
+    assert lines[-3].split()[:3] == ['0.250', '1.000000000000', '4']
+
+def test_iter_steps(paysim_csv, paysim_raw, tmp_path):
+    """
+    Steps come out whole and in order across chunk boundaries; unsorted files are refused.
+    """
+    steps = [(step, len(frame)) for step, frame in iter_steps(paysim_csv, chunksize=97)]
+    counts = paysim_raw['step'].value_counts().sort_index()
+    assert steps == list(zip(counts.index, counts))
+
+    unsorted = tmp_path / 'unsorted.csv'
+    paysim_raw.iloc[::-1].to_csv(unsorted, index=False)
+    with pytest.raises(ValueError):
+        list(iter_steps(str(unsorted), chunksize=97))
+
+def test_replay(trained_detector, paysim_csv, tmp_path):
+    """
+    A maximum-speed and a paced replay score every transaction and write the
+    report and histogram.
+    """
+    report_path = tmp_path / 'replay.json'
+    report = replay(trained_detector, paysim_csv, report_path=str(report_path),
+                    in_flight=64, max_rows=500, interval=0.05, max_wait_ms=1.0)
+    assert report['outcomes'] == {'sent': 500, 'scored': 500, 'shed': 0, 'rejected': 0,
+                                  'failed': 0}
+    assert report['end_to_end'] == report['service'] and report['end_to_end']['count'] == 500
+    assert report['batching']['transactions'] == 500
+    assert sum(window['scored'] for window in report['windows']) == 500
+    assert json.loads(report_path.read_text()) == report
+    assert (tmp_path / 'replay.hgrm').read_text().startswith('       Value')
+
+    # 40 steps (simulated hours) a second
+    start = time.perf_counter()
+    report = replay(trained_detector, paysim_csv, report_path=str(report_path),
+                    speed=3600 * 40, max_rows=100, max_wait_ms=1.0)
+    elapsed = time.perf_counter() - start
+    assert report['outcomes']['scored'] == 100
+    steps = report['steps'][1] - report['steps'][0]
+    assert elapsed >= steps / 40 * 0.9
+
+def test_replay_backpressure(paysim_csv, tmp_path):
+    """
+    A scorer slower than the offered load fills the replayer's in-flight
+    limit or, with a shorter server queue, sheds requests.
+    """
+    class SlowDetector:
+        """Stand-in detector taking 20ms per batch."""
+        model_type = 'stub'
+        monitor = None
+
+        @staticmethod
+        def score_many(records):
+            """Returns 0.1 for every record after sleeping."""
+            time.sleep(0.02)
+            return [0.1] * len(records)
+
+    report_path = str(tmp_path / 'replay.json')
+    report = replay(SlowDetector(), paysim_csv, report_path=report_path, in_flight=16,
+                    max_rows=100, max_batch=4, max_queue=16)
+    assert report['outcomes']['scored'] == 100
+    assert report['backpressure']['counts']['in_flight_limit'] > 0
+    assert [episode['kind'] for episode in report['backpressure']['episodes']] == \
+        ['in_flight_limit']
+
+    report = replay(SlowDetector(), paysim_csv, report_path=report_path, in_flight=16,
+                    max_rows=300, max_batch=4, max_queue=4)
+    outcomes = report['outcomes']
+    assert outcomes['shed'] > 0 and outcomes['scored'] + outcomes['shed'] == 300
+    assert report['backpressure']['counts']['shed'] == outcomes['shed']
+    assert sum(window['shed'] for window in report['windows']) == outcomes['shed']
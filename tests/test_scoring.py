@@ -0,0 +1,74 @@
+"""
+Tests for bulk batch scoring.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_loader import clean_data
+from src.features import feature_frame
+from src.scoring import score_file, OUTPUT_COLUMNS
+
+@pytest.fixture(name="input_csv")
+def fixture_input_csv(paysim_raw, tmp_path):
+    """
+    The raw sample as a CSV with one row missing a value.
+    """
+    raw = paysim_raw.copy()
+    raw.loc[5, 'amount'] = np.nan
+    path = tmp_path / 'input.csv'
+    raw.to_csv(path, index=False)
+    return str(path)
+
+def test_score_file(trained_detector, model_path, input_csv, tmp_path):
+    """
+    Scoring streams every valid row, in input order, matching predict_proba.
+    """
+    output = str(tmp_path / 'scores.csv')
+    rows = score_file(model_path, input_csv, output, chunksize=300)
+    scores = pd.read_csv(output)
+
+    assert scores.columns.tolist() == OUTPUT_COLUMNS
+    assert rows == len(scores) == 1999
+    assert 5 not in scores['id'].values
+    assert scores['id'].is_monotonic_increasing
+
+    expected_data = feature_frame(clean_data(pd.read_csv(input_csv)))
+    expected = trained_detector.predict_proba(expected_data.drop(columns=['isFraud']))[:, 1]
+    np.testing.assert_allclose(scores['probability'], expected, atol=1e-5)
+    assert (scores['label'] == (scores['probability'] >= 0.5)).all()
+
+def test_score_file_pool(model_path, input_csv, tmp_path):
+    """
+    The process pool produces the same output as in-process scoring.
+    """
+    serial = str(tmp_path / 'serial.csv')
+    pooled = str(tmp_path / 'pooled.csv')
+    score_file(model_path, input_csv, serial, chunksize=300)
+    score_file(model_path, input_csv, pooled, chunksize=300, workers=2)
+    pd.testing.assert_frame_equal(pd.read_csv(serial), pd.read_csv(pooled))
+
+def test_score_file_parquet(model_path, input_csv, tmp_path):
+    """
+    Parquet output holds the same rows as CSV output.
+    """
+    pytest.importorskip('pyarrow')
+    output = str(tmp_path / 'scores.parquet')
+    rows = score_file(model_path, input_csv, output, chunksize=300)
+    assert len(pd.read_parquet(output)) == rows
+
+def test_score_file_loads_once(trained_detector, model_path, input_csv, tmp_path, monkeypatch):
+    """
+    Serial scoring loads the model once, or not at all when the caller passes it in.
+    """
+    import src.scoring # pylint: disable=import-outside-toplevel
+    loads = []
+    load_detector = src.scoring._load_detector # pylint: disable=protected-access
+    def counting_load(*args, **kwargs):
+        loads.append(args)
+        return load_detector(*args, **kwargs)
+    monkeypatch.setattr(src.scoring, '_load_detector', counting_load)
+    score_file(model_path, input_csv, str(tmp_path / 'scores.csv'), chunksize=300)
+    assert len(loads) == 1
+    score_file(model_path, input_csv, str(tmp_path / 'scores.csv'), chunksize=300,
+               detector=trained_detector)
+    assert len(loads) == 1
@@ -0,0 +1,193 @@
+"""
+Tests for the micro-batching scoring server.
+"""
+import asyncio
+import copy
+import json
+import time
+import pytest
+from src.data_loader import clean_data
+from src.features import feature_frame, FEATURE_COLUMNS
+from src.monitoring import build_reference
+from src.registry import ModelRegistry
+from src.server import ScoringServer
+
+async def _request(address, method, path, payload=None):
+    """
+    Sends one HTTP request and returns (status, decoded JSON body).
+    """
+    reader, writer = await asyncio.open_connection(*address)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+class SlowDetector:
+    """
+    Stand-in detector whose batches take a fixed time, to exercise queueing.
+    """
+    model_type = 'stub'
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def score_many(self, records):
+        """Returns 0.9 for every record after sleeping."""
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(records))
+        return [0.9] * len(records)
+
+@pytest.fixture(name="records")
+def fixture_records(paysim_raw):
+    """
+    A few raw transactions as JSON-ready dicts.
+    """
+    return json.loads(paysim_raw.iloc[:20].to_json(orient='records'))
+
+def test_score_and_health(trained_detector, records):
+    """
+    Single and list requests are scored like score_many; bad input is rejected.
+    """
+    async def scenario():
+        server = ScoringServer(trained_detector, max_wait_ms=1.0)
+        await server.start(port=0)
+        try:
+            status, single = await _request(server.address, 'POST', '/score', records[0])
+            assert status == 200
+            assert single['probability'] == pytest.approx(trained_detector.score_one(records[0]))
+
+            status, many = await _request(server.address, 'POST', '/score', records[:5])
+            assert status == 200 and len(many) == 5
+
+            status, error = await _request(server.address, 'POST', '/score', {'type': 'PAYMENT'})
+            assert status == 400 and 'step' in error['error']
+
+            # Unknown types, NaN/Infinity (which json.loads accepts) and
+            # integers beyond the float range are rejected
+            status, error = await _request(server.address, 'POST', '/score',
+                                           {**records[0], 'type': 'TRANSFR'})
+            assert status == 400 and 'type' in error['error']
+            for value in (float('nan'), float('inf'), 10**400):
+                status, error = await _request(server.address, 'POST', '/score',
+                                               [records[1], {**records[0], 'amount': value}])
+                assert status == 400 and 'amount' in error['error']
+
+            status, health = await _request(server.address, 'GET', '/health')
+            assert status == 200 and health['status'] == 'ok'
+            assert health['transactions'] == 6
+
+            # No drift reference was recorded for this detector
+            status, _ = await _request(server.address, 'GET', '/drift')
+            assert status == 404
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+def test_micro_batching_and_shedding(records):
+    """
+    Concurrent requests share batches, and a full queue sheds load with 503.
+    """
+    async def scenario():
+        detector = SlowDetector(delay=0.05)
+        server = ScoringServer(detector, max_batch=64, max_wait_ms=20.0, max_queue=8)
+        await server.start(port=0)
+        try:
+            results = await asyncio.gather(*[
+                _request(server.address, 'POST', '/score', records[i % len(records)])
+                for i in range(30)
+            ])
+        finally:
+            await server.stop()
+        statuses = [status for status, _ in results]
+        assert statuses.count(200) >= 8
+        assert 503 in statuses
+        assert max(detector.batch_sizes) > 1
+        assert server.batcher.stats['shed'] == statuses.count(503)
+
+    asyncio.run(scenario())
+
+def test_drift_endpoint(trained_detector, paysim_raw, records):
+    """
+    With a monitor attached, GET /drift reports over the rows served.
+    """
+    async def scenario():
+        detector = copy.copy(trained_detector)
+        features = feature_frame(clean_data(paysim_raw))[FEATURE_COLUMNS]
+        detector.reference = build_reference(
+            features.to_numpy(), detector.predict_proba(features)[:, 1], FEATURE_COLUMNS
+        )
+        detector.start_monitoring()
+        server = ScoringServer(detector, max_wait_ms=1.0)
+        await server.start(port=0)
+        try:
+            await _request(server.address, 'POST', '/score', records[:5])
+            status, report = await _request(server.address, 'GET', '/drift')
+        finally:
+            await server.stop()
+        assert status == 200 and report['rows'] == 5
+        assert set(report['features']) == set(FEATURE_COLUMNS)
+
+    asyncio.run(scenario())
+
+def test_hot_swap(trained_detector, records, tmp_path):
+    """
+    POST /model swaps in a registry version under live traffic without
+    failing a request; a candidate that disagrees too much is rejected.
+    """
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    registry.register(copy.copy(trained_detector))
+    # Same trees, but every transaction is labelled fraud
+    flagging = copy.copy(trained_detector)
+    flagging.threshold = 0.0
+    registry.register(flagging, promote=False)
+
+    async def scenario(max_disagreement):
+        server = ScoringServer(registry.load('v0001'), registry=registry, version='v0001',
+                               swap_options={'shadow_rows': 20,
+                                             'max_disagreement': max_disagreement},
+                               max_wait_ms=1.0)
+        await server.start(port=0)
+        responses = []
+        stop = asyncio.Event()
+
+        async def traffic():
+            while not stop.is_set():
+                responses.append(await _request(server.address, 'POST', '/score', records[:4]))
+
+        try:
+            client = asyncio.create_task(traffic())
+            status, swap = await _request(server.address, 'POST', '/model', {'version': 'v0002'})
+            assert status == 202 and swap['candidate_version'] == 'v0002'
+            assert (await _request(server.address, 'POST', '/model',
+                                   {'version': 'v0002'}))[0] == 409
+            assert (await _request(server.address, 'POST', '/model',
+                                   {'version': 'v0042'}))[0] == 400
+            for _ in range(500):
+                _, status = await _request(server.address, 'GET', '/model')
+                if status['swap']['state'] not in ('loading', 'warming', 'shadow'):
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            stop.set()
+            await client
+            _, health = await _request(server.address, 'GET', '/health')
+        finally:
+            await server.stop()
+        assert [code for code, _ in responses] == [200] * len(responses)
+        assert status['history'][-1]['shadow']['rows'] >= 20
+        return status, health, [result['label'] for _, body in responses for result in body]
+
+    status, health, labels = asyncio.run(scenario(None))
+    assert status['version'] == health['model_version'] == 'v0002'
+    assert status['swap']['state'] == 'swapped' and labels[-4:] == [1] * 4
+    assert 0 in labels
+
+    status, health, labels = asyncio.run(scenario(0.0))
+    assert status['swap']['state'] == 'rejected'
+    assert status['version'] == health['model_version'] == 'v0001' and 0 in labels[-4:]
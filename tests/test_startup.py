@@ -0,0 +1,64 @@
+"""
+Start-up cost of the CLI entry point and side-effect-free imports.
+"""
+import os
+import subprocess
+import sys
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative `-X importtime` of `import main`, in seconds. Importing the
+# plotting stack or xgboost on this path adds well over a second.
+STARTUP_BUDGET = 2.5
+
+# Modules that only training (or an uncompiled XGBoost model) may pull in
+TRAINING_ONLY = ['matplotlib', 'seaborn', 'xgboost', 'sklearn.ensemble', 'sklearn.model_selection',
+                 'sklearn.metrics']
+
+def _run(code, cwd=REPO_ROOT, flags=()):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code], cwd=cwd, env=env,
+        capture_output=True, text=True, check=True
+    )
+
+def _import_seconds(stderr, module):
+    """Cumulative import time of a top-level ``module`` from `-X importtime` output."""
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+@pytest.mark.parametrize("modules", [
+    ['main'], ['main', 'src.scoring'], ['main', 'src.server']
+])
+def test_scoring_paths_skip_training_imports(modules):
+    """
+    The predict, score and serve paths do not import plotting or training libraries.
+    """
+    code = (f"import sys; import {', '.join(modules)}; "
+            f"print(' '.join(m for m in {TRAINING_ONLY!r} if m in sys.modules))")
+    assert _run(code).stdout.strip() == ''
+
+def test_startup_budget():
+    """
+    Cold start of the entry point stays within the import-time budget.
+    """
+    # Warm the page cache and bytecode so only import work is measured
+    _run('import main')
+    seconds = _import_seconds(_run('import main', flags=('-X', 'importtime')).stderr, 'main')
+    assert seconds < STARTUP_BUDGET, f"import main took {seconds:.2f}s (budget {STARTUP_BUDGET}s)"
+
+def test_logging_setup_is_explicit_and_idempotent(tmp_path):
+    """
+    Importing src.utils creates no log files; setup_logging attaches handlers once.
+    """
+    code = (
+        "import os; from src.utils import setup_logging, logger; "
+        "assert not os.path.exists('logs'); "
+        "first = setup_logging(); second = setup_logging(); "
+        "assert first is second is logger; print(len(logger.handlers), len(os.listdir('logs')))"
+    )
+    assert _run(code, str(tmp_path)).stdout.split() == ['2', '1']
@@ -0,0 +1,117 @@
+"""
+Tests for out-of-core training.
+"""
+import os
+import numpy as np
+import pytest
+from sklearn.metrics import roc_auc_score
+from src.data_loader import clean_data
+from src.features import feature_frame, FEATURE_COLUMNS
+from src.model import FraudDetector
+from src.training import (
+    spill_features, load_sample, train_out_of_core, parse_negative_rate
+)
+
+@pytest.fixture(scope="module", name="csv_path")
+def fixture_csv_path(paysim_raw, tmp_path_factory):
+    """
+    The synthetic sample written as a raw PaySim CSV.
+    """
+    path = str(tmp_path_factory.mktemp("data") / "paysim.csv")
+    paysim_raw.to_csv(path, index=False)
+    return path
+
+def test_spill_and_sample(csv_path, tmp_path):
+    """
+    Spilling fits the scaler in one pass; samples are exact-size and uniform.
+    """
+    detector = FraudDetector()
+    dataset = spill_features(csv_path, str(tmp_path), detector.scaler, chunksize=300)
+    assert dataset.rows['train'] + dataset.rows['test'] == 2000
+    assert len(dataset.chunks['train']) == 7
+
+    full, labels = load_sample(dataset, 'train', 10_000, detector.scaler)
+    assert full.shape == (dataset.rows['train'], len(FEATURE_COLUMNS))
+    assert labels.sum() == dataset.positives['train']
+    # Scaled with statistics of exactly these rows
+    np.testing.assert_allclose(full.mean(axis=0)[:6], 0, atol=1e-4)
+
+    sample, _ = load_sample(dataset, 'train', 500, detector.scaler)
+    assert sample.shape == (500, len(FEATURE_COLUMNS))
+    full_rows = {row.tobytes() for row in full}
+    assert all(row.tobytes() in full_rows for row in sample)
+
+@pytest.mark.parametrize("model_type", ['rf', 'xgb'])
+def test_train_out_of_core(csv_path, paysim_raw, tmp_path, model_type):
+    """
+    Out-of-core training produces a detector that scores like an in-memory one.
+    """
+    detector, test_features, test_labels = train_out_of_core(
+        csv_path, model_type=model_type, chunksize=400, max_rows=1000, spill_dir=str(tmp_path)
+    )
+    assert not os.listdir(tmp_path)
+    assert len(test_labels) <= 1000
+    assert roc_auc_score(test_labels, detector.model.predict_proba(test_features)[:, 1]) > 0.9
+
+    probs = detector.score_many(paysim_raw.iloc[:50].to_dict('records'))
+    assert probs.shape == (50,)
+
+    detector.compile()
+    np.testing.assert_allclose(
+        detector.score_many(paysim_raw.iloc[:50].to_dict('records')), probs, atol=1e-6
+    )
+
+def test_parse_negative_rate():
+    """
+    A bare rate applies to every type not listed explicitly.
+    """
+    rates = parse_negative_rate('0.05,TRANSFER=1,CASH_OUT=0.5')
+    assert rates == {'CASH_IN': 0.05, 'CASH_OUT': 0.5, 'DEBIT': 0.05,
+                     'PAYMENT': 0.05, 'TRANSFER': 1.0}
+    assert set(parse_negative_rate('0.1').values()) == {0.1}
+    with pytest.raises(ValueError):
+        parse_negative_rate('WIRE=0.5')
+    with pytest.raises(ValueError):
+        parse_negative_rate('0')
+
+def test_negative_downsampling(csv_path, paysim_raw, tmp_path):
+    """
+    Downsampling keeps every fraud and the test split; the rates travel with
+    the model and every scoring path applies the same correction.
+    """
+    (tmp_path / 'full').mkdir()
+    (tmp_path / 'sampled').mkdir()
+    full = spill_features(csv_path, str(tmp_path / 'full'), FraudDetector().scaler)
+    sampled = spill_features(csv_path, str(tmp_path / 'sampled'), FraudDetector().scaler,
+                             negative_rate=0.25)
+    assert sampled.rows['test'] == full.rows['test']
+    assert sampled.positives['train'] == full.positives['train']
+    assert sampled.negatives_seen == full.rows['train'] - full.positives['train']
+    kept = sampled.rows['train'] - sampled.positives['train']
+    assert 0.2 < kept / sampled.negatives_seen < 0.3
+
+    rate = {'default': 0.2, 'TRANSFER': 1.0, 'CASH_OUT': 0.5}
+    detector, _, _ = train_out_of_core(csv_path, model_type='xgb', negative_rate=rate,
+                                       spill_dir=str(tmp_path))
+    assert detector.sampling['negative_rates']['TRANSFER'] == 1.0
+
+    records = paysim_raw.iloc[:300].to_dict('records')
+    features = feature_frame(clean_data(paysim_raw.iloc[:300])).drop(columns=['isFraud'])
+    calibrated = detector.predict_proba(features)[:, 1]
+    uncalibrated = detector.model.predict_proba(detector.scaler.transform(features))[:, 1]
+    types = paysim_raw['type'].iloc[:300].to_numpy()
+    # TRANSFER negatives were kept at more than the average rate, so their
+    # odds go up; types kept at the default 0.2 (below average) go down
+    transfers, others = types == 'TRANSFER', ~np.isin(types, ['TRANSFER', 'CASH_OUT'])
+    assert np.all(calibrated[transfers] >= uncalibrated[transfers] - 1e-9)
+    assert np.all(calibrated[others] <= uncalibrated[others] + 1e-9)
+    np.testing.assert_allclose(detector.score_many(records), calibrated, atol=1e-6)
+    np.testing.assert_array_equal(detector.predict(features), (calibrated >= 0.5).astype(int))
+
+    for path in (str(tmp_path / 'model.pkl'), str(tmp_path / 'artifact')):
+        detector.save_model(path)
+        loaded = FraudDetector()
+        loaded.load_model(path)
+        assert loaded.sampling == detector.sampling
+        np.testing.assert_allclose(loaded.predict_proba(features)[:, 1], calibrated, atol=1e-6)
+        np.testing.assert_allclose(loaded.score_many(records), calibrated, atol=1e-6)
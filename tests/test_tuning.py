@@ -0,0 +1,75 @@
+"""
+Tests for the successive halving hyperparameter search.
+"""
+import json
+import pytest
+from src.data_loader import clean_data
+from src.features import feature_frame
+from src.model import FraudDetector
+from src.tuning import rungs, sample_configs, successive_halving, TrialJournal
+import src.tuning
+
+@pytest.fixture(scope="module", name="featurized")
+def fixture_featurized(paysim_raw):
+    """
+    The synthetic sample, featurized.
+    """
+    return feature_frame(clean_data(paysim_raw))
+
+def test_schedule():
+    """
+    Each rung keeps 1/eta of the trials on eta times more rows, ending at all rows.
+    """
+    assert rungs(27, 3) == [(27, 1 / 27), (9, 1 / 9), (3, 1 / 3), (1, 1.0)]
+    assert rungs(10, 3) == [(10, 1 / 9), (3, 1 / 3), (1, 1.0)]
+    assert rungs(27, 3, min_fraction=0.2) == [(27, 1 / 3), (9, 1.0)]
+    assert rungs(1, 3) == [(1, 1.0)]
+
+    configs = sample_configs('rf', 20, seed=1)
+    assert len({json.dumps(c, sort_keys=True) for c in configs}) == 20
+    assert configs == sample_configs('rf', 20, seed=1)
+    assert len(sample_configs('rf', 10_000)) == 4 * 4 * 4 * 3
+
+def test_detector_params():
+    """
+    Detector parameters apply to its estimator, under per-call overrides.
+    """
+    detector = FraudDetector(model_type='rf', params={'n_estimators': 7, 'max_depth': 4})
+    model = detector.make_estimator(90, 10, {'max_depth': 5})
+    assert model.n_estimators == 7 and model.max_depth == 5
+
+def test_successive_halving(featurized, tmp_path, monkeypatch):
+    """
+    Pooled and in-process searches agree, and rerunning with the journal
+    runs no trial twice.
+    """
+    kwargs = {'n_trials': 4, 'eta': 2, 'n_folds': 2, 'cache_dir': str(tmp_path),
+              'report_dir': str(tmp_path)}
+    serial = successive_halving(featurized, 'rf', cpu_budget=1,
+                                journal_path=str(tmp_path / 'serial.jsonl'), **kwargs)
+    pooled = successive_halving(featurized, 'rf', cpu_budget=2,
+                                journal_path=str(tmp_path / 'pooled.jsonl'), **kwargs)
+    assert [rung['trials'] for rung in serial['rungs']] == [4, 2, 1]
+    assert serial['trials_run'] == 7
+    assert serial['best']['params'] == pooled['best']['params']
+    assert serial['best']['fraction'] == 1.0
+
+    def no_trial(task):
+        raise AssertionError(f"trial {task[0]} rerun")
+    monkeypatch.setattr(src.tuning, 'run_trial', no_trial)
+    resumed = successive_halving(featurized, 'rf', cpu_budget=1,
+                                 journal_path=str(tmp_path / 'serial.jsonl'), **kwargs)
+    assert resumed['best'] == serial['best']
+
+    with pytest.raises(ValueError):
+        successive_halving(featurized, 'rf', cpu_budget=1, seed=1,
+                           journal_path=str(tmp_path / 'serial.jsonl'), **kwargs)
+
+def test_journal_tolerates_partial_search(tmp_path):
+    """
+    Trials recorded before an interruption are found again.
+    """
+    path = str(tmp_path / 'journal.jsonl')
+    search = {'model_type': 'rf', 'configs': [{'n_estimators': 10}]}
+    TrialJournal(path, search).record({'trial': 0, 'rung': 0, 'expected_cost': 1.0})
+    assert list(TrialJournal(path, search).trials) == [(0, 0)]
@@ -0,0 +1,92 @@
+"""
+Tests for walk-forward validation.
+"""
+import json
+import os
+import numpy as np
+import pytest
+from src.data_loader import clean_data
+from src.features import feature_frame
+from src.validation import walk_forward, walk_forward_windows, FoldCache, load_fold
+
+@pytest.fixture(scope="module", name="featurized")
+def fixture_featurized(paysim_raw):
+    """
+    The synthetic sample, featurized.
+    """
+    return feature_frame(clean_data(paysim_raw))
+
+def test_windows():
+    """
+    Validation windows follow their training windows in time and hold
+    similar row counts.
+    """
+    steps = np.repeat(np.arange(1, 101), np.linspace(50, 5, 100).astype(int))
+    windows = walk_forward_windows(steps, n_folds=3, train_window=20, gap=2)
+    assert [w['fold'] for w in windows] == [0, 1, 2]
+    for window, following in zip(windows, windows[1:]):
+        assert window['valid'][1] == following['valid'][0]
+    valid_rows = []
+    for window in windows:
+        assert window['train'][1] + 2 == window['valid'][0]
+        assert window['train'][1] - window['train'][0] <= 20
+        valid_rows.append(np.count_nonzero((steps >= window['valid'][0]) &
+                                           (steps < window['valid'][1])))
+    assert max(valid_rows) < 1.5 * min(valid_rows)
+
+    with pytest.raises(ValueError):
+        walk_forward_windows(np.ones(100), n_folds=3)
+
+def test_fold_cache(featurized, tmp_path, monkeypatch):
+    """
+    Folds are built once per data and windows, and hold each window's rows.
+    """
+    windows = walk_forward_windows(featurized['step'], n_folds=2)
+    cache = FoldCache(str(tmp_path))
+    directory = cache.directory(featurized, windows)
+    for window in windows:
+        for split in ('train', 'valid'):
+            features, labels = load_fold(directory, window['fold'], split)
+            low, high = window[split]
+            expected = featurized[(featurized['step'] >= low) & (featurized['step'] < high)]
+            assert len(features) == len(labels) == len(expected)
+            assert labels.sum() == expected['isFraud'].sum()
+            assert features.dtype == np.float32
+
+    # Building other folds evicts the least recently used entry, not the cache
+    three = cache.directory(featurized, walk_forward_windows(featurized['step'], n_folds=3))
+    assert os.path.isdir(directory)
+    os.utime(three, (0, 0))
+    four = cache.directory(featurized, walk_forward_windows(featurized['step'], n_folds=4))
+    assert not os.path.exists(three)
+    assert sorted(os.listdir(os.path.dirname(directory))) == sorted(
+        os.path.basename(entry) for entry in (directory, four)
+    )
+
+    def no_rebuild(*args):
+        raise AssertionError("fold cache rebuilt")
+    monkeypatch.setattr(FoldCache, '_build', staticmethod(no_rebuild))
+    assert cache.directory(featurized, windows) == directory
+    with pytest.raises(AssertionError):
+        cache.directory(featurized, walk_forward_windows(featurized['step'], n_folds=3))
+
+def test_walk_forward_report(featurized, tmp_path):
+    """
+    Pooled runs give the same per-fold metrics as in-process runs, and the
+    report aggregates them per configuration.
+    """
+    configs = [{'model_type': 'rf', 'params': {'n_estimators': 10}}, {'model_type': 'xgb'}]
+    kwargs = {'n_folds': 2, 'cache_dir': str(tmp_path), 'report_dir': str(tmp_path)}
+    serial = walk_forward(featurized, configs, workers=1, **kwargs)
+    pooled = walk_forward(featurized, configs, workers=2, **kwargs)
+
+    assert len(serial['results']) == 4 and len(serial['summary']) == 2
+    for one, other in zip(serial['results'], pooled['results']):
+        assert (one['model_type'], one['fold']) == (other['model_type'], other['fold'])
+        assert one['auc'] == pytest.approx(other['auc'])
+        assert one['fit_seconds'] > 0
+    rf_summary = next(row for row in serial['summary'] if row['model_type'] == 'rf')
+    assert rf_summary['params'] == {'n_estimators': 10} and rf_summary['folds'] == 2
+
+    with open(tmp_path / 'walk_forward.json', encoding='utf-8') as f:
+        assert json.load(f)['windows'] == serial['windows']